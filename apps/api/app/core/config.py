@@ -1,7 +1,7 @@
 """
 Application configuration using Pydantic settings.
 """
-from typing import List
+from typing import Dict, List
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -18,11 +18,95 @@ class Settings(BaseSettings):
     # LLM Providers
     OPENAI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
-    DEFAULT_LLM_PROVIDER: str = "openai"
+    DEFAULT_LLM_PROVIDER: str = "openai"  # "openai", "anthropic" or "local"
     DEFAULT_LLM_MODEL: str = "gpt-4o-mini"
+    LLM_WINDOW_MAX_TOKENS: int = 12000  # Prompt plus transcript per window
+    LLM_WINDOW_OVERLAP_TOKENS: int = 800  # Transcript repeated between windows
+    LLM_WINDOW_CONCURRENCY: int = 8  # Windows in flight per detection
+    HIGHLIGHT_MERGE_IOU: float = 0.5  # Overlap at which two highlights are the same moment
+    LLM_MAX_CONCURRENCY: int = 16  # Calls in flight per provider and process
+    LLM_DEFAULT_RPM: int = 500  # Requests per minute per model and process
+    LLM_DEFAULT_TPM: int = 200000  # Tokens per minute per model and process
+    # Per "provider" or "provider:model" overrides, e.g. {"openai:gpt-4o": {"rpm": 500, "tpm": 30000}}
+    LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = {}
+    LLM_MAX_RETRIES: int = 5  # On 429, 5xx and connection errors
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+    LLM_RETRY_MAX_SECONDS: float = 60.0
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "./llm_cache.sqlite3"
+    LLM_CACHE_MAX_MB: float = 512.0
+    LLM_PROMPT_CACHING: bool = True  # Transcript as a provider-cached prompt prefix
+    LLM_CALL_LOGGING: bool = True  # Store every call in llm_calls
+    LLM_METRICS_WINDOW: int = 1000  # Recent calls per model for latency percentiles
+    # USD per million tokens, keyed by "provider:model"
+    LLM_PRICES: Dict[str, Dict[str, float]] = {
+        "openai:gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+        "openai:gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+        "anthropic:claude-3-5-sonnet-20241022": {"input": 3.00, "cached_input": 0.30, "output": 15.00},
+    }
+    LLM_BATCH_DISCOUNT: float = 0.5  # Batch API price relative to interactive calls
+    LLM_BATCH_MAX_REQUESTS: int = 10000  # Requests per provider batch
+    LLM_BATCH_MAX_MB: float = 150.0  # Batch file size; OpenAI takes up to 200 MB, Anthropic 256 MB
+    LLM_BATCH_POLL_SECONDS: float = 300.0  # Between checks of a submitted batch
+    # Offline stand-in for the batch APIs
+    LLM_LOCAL_BATCH_DIR: str = "./llm_batches"
+    LLM_LOCAL_BATCH_SECONDS: float = 0.0  # Until a local batch completes
+    # Local, deterministic provider "local" for load tests and offline runs
+    LLM_LOCAL_LATENCY_MS: float = 500.0  # Average time to the first streamed text
+    LLM_LOCAL_STREAM_MS: float = 1000.0  # Average time from first to last streamed text
+    LLM_LOCAL_ERROR_RATE: float = 0.0  # Share of calls that fail with a retryable error
+    LLM_LOCAL_SEED: int = 0
 
     # ML Models
     HUGGINGFACE_TOKEN: str = ""
+    TRANSCRIPTION_CHUNK_SECONDS: float = 600.0
+    SEGMENT_INSERT_BATCH_SIZE: int = 200
+    DIARIZATION_CHUNK_SECONDS: float = 600.0
+    DIARIZATION_CHUNK_OVERLAP_SECONDS: float = 30.0
+    DIARIZATION_WORKERS: int = 2
+    DIARIZATION_CLUSTER_THRESHOLD: float = 0.5  # Max cosine distance to merge speakers
+    SPEAKER_MATCH_THRESHOLD: float = 0.75  # Min cosine similarity to a known person
+    SPEAKER_INDEX_TTL_SECONDS: float = 300.0  # Reload to see other processes' confirmations
+
+    # YouTube
+    YOUTUBE_METADATA_TTL_SECONDS: float = 3600.0
+    YOUTUBE_METADATA_CACHE_SIZE: int = 10000  # Videos whose metadata is kept in memory
+    BULK_INGEST_MAX_VIDEOS: int = 1000  # Per bulk-ingest request
+    BULK_INGEST_RESOLVE_CONCURRENCY: int = 8  # Concurrent yt-dlp lookups
+
+    # Uploads and local files
+    UPLOAD_DIR: str = "./uploads"
+    UPLOAD_MAX_GB: float = 20.0
+    UPLOAD_SESSION_TTL_HOURS: float = 24.0  # Unfinished uploads idle this long are deleted
+    LOCAL_INGEST_ROOTS: List[str] = []  # Directories server-local files may be ingested from
+
+    # Media store
+    MEDIA_STORE_DIR: str = "./downloads"
+    MEDIA_STORE_QUOTA_GB: float = 50.0
+    MEDIA_PIN_TTL_SECONDS: int = 6 * 3600  # Pins held by crashed workers expire
+
+    # Clip rendering
+    CLIP_RENDER_WORKERS: int = 4  # ffmpeg processes per render job
+    CLIP_MIN_COPY_SECONDS: float = 2.0  # Shorter keyframe spans are re-encoded whole
+
+    # Processing pipeline
+    AUDIO_INGEST_MODE: str = "stream"  # "stream" (decode while downloading) or "file"
+    PIPELINE_WORK_DIR: str = "./work"  # Per-episode stage checkpoints
+    FINGERPRINT_MAX_BIT_ERROR: float = 0.25  # Max share of differing bits for the same recording
+    FINGERPRINT_MIN_COVERAGE: float = 0.9  # Min overlap with both recordings to reuse results
+
+    # Progress events (SSE)
+    EVENTS_POLL_INTERVAL_SECONDS: float = 1.0
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # Job queue and workers
+    JOB_QUEUE_BACKEND: str = "supabase"  # "supabase" or "local" (SQLite stand-in)
+    JOB_QUEUE_SQLITE_PATH: str = "./jobs.sqlite3"
+    JOB_LEASE_SECONDS: int = 300
+    JOB_RETRY_BASE_SECONDS: float = 30.0
+    WORKER_CPU_CONCURRENCY: int = 1
+    WORKER_IO_CONCURRENCY: int = 4
+    WORKER_POLL_INTERVAL_SECONDS: float = 2.0
 
     # App Config
     ENVIRONMENT: str = "development"
@@ -0,0 +1,129 @@
+"""Episode-related Pydantic models."""
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, HttpUrl
+
+
+class EpisodeCreate(BaseModel):
+    """Model for creating a new episode."""
+
+    youtube_url: str
+    title: Optional[str] = None
+    recorded_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+
+
+class EpisodeIngest(BaseModel):
+    """Model for ingesting and processing an episode."""
+
+    youtube_url: str
+    auto_detect_highlights: bool = False
+    prompt_ids: Optional[list[str]] = None
+
+
+class EpisodeLocalIngest(BaseModel):
+    """Model for ingesting a media file already on the server (e.g. a studio share)."""
+
+    path: str
+    title: Optional[str] = None
+    auto_detect_highlights: bool = False
+    prompt_ids: Optional[list[str]] = None
+
+
+class EpisodeUploadIngest(BaseModel):
+    """Model for ingesting a finished resumable upload."""
+
+    upload_id: str
+    title: Optional[str] = None
+    auto_detect_highlights: bool = False
+    prompt_ids: Optional[list[str]] = None
+
+
+class EpisodeBulkIngest(BaseModel):
+    """Model for ingesting many episodes from playlists, channels or URLs."""
+
+    urls: list[str]
+    max_videos_per_url: Optional[int] = None
+    auto_detect_highlights: bool = False
+    prompt_ids: Optional[list[str]] = None
+
+
+class EpisodeUpdate(BaseModel):
+    """Model for updating an episode."""
+
+    title: Optional[str] = None
+    description: Optional[str] = None
+    raw_video_link: Optional[str] = None
+    recorded_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+    status: Optional[str] = None
+
+
+class EpisodeResponse(BaseModel):
+    """Episode response model."""
+
+    id: str
+    youtube_url: Optional[str] = None
+    youtube_video_id: Optional[str] = None
+    source_type: str = "youtube"
+    title: str
+    duration_seconds: int
+    description: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    raw_video_link: Optional[str] = None
+    recorded_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+    full_transcript: Optional[str] = None
+    status: str
+    processing_stage: Optional[str] = None
+    progress_percent: int = 0
+    completed_stages: list[str] = []
+    reused_from_episode_id: Optional[str] = None
+    comments_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SegmentResponse(BaseModel):
+    """Segment response model."""
+
+    id: str
+    episode_id: str
+    start_s: float
+    end_s: float
+    text: str
+    confidence: float
+    speakers: list[str] = []
+
+    class Config:
+        from_attributes = True
+
+
+
+class WordResponse(BaseModel):
+    """Word timing response model."""
+
+    word: str
+    start_s: float
+    end_s: float
+    score: float
+
+
+class BulkIngestSkip(BaseModel):
+    """A video a bulk ingest did not create an episode for."""
+
+    url: str
+    reason: str
+    episode_id: Optional[str] = None
+
+
+class BulkIngestResponse(BaseModel):
+    """Bulk ingest response model."""
+
+    created: list[EpisodeResponse]
+    skipped: list[BulkIngestSkip]
+    queued_jobs: int
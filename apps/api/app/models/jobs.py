@@ -0,0 +1,34 @@
+"""Job queue Pydantic models."""
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+class JobResponse(BaseModel):
+    """Job response model."""
+
+    id: str
+    kind: str
+    resource: str
+    episode_id: Optional[str] = None
+    payload: dict[str, Any] = {}
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    locked_by: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class QueueDepth(BaseModel):
+    """Number of queued or running jobs for a resource, kind and status."""
+
+    resource: str
+    kind: str
+    status: str
+    count: int
@@ -0,0 +1,109 @@
+"""LLM usage Pydantic models."""
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+class LLMCacheModelStats(BaseModel):
+    """Cached completions of one provider and model."""
+
+    provider: str
+    model: str
+    entries: int
+    size_bytes: int
+    hits: int
+
+
+class LLMCacheStats(BaseModel):
+    """LLM response cache size and hit rate."""
+
+    max_bytes: int
+    used_bytes: int
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    models: list[LLMCacheModelStats]
+
+
+class LLMModelMetrics(BaseModel):
+    """Calls to one provider and model since the process started."""
+
+    provider: str
+    model: str
+    calls: int
+    errors: int
+    cached: int
+    error_rate: float
+    retries: int
+    parse_failures: int
+    estimated_input_tokens: int
+    input_tokens: int
+    cached_input_tokens: int
+    output_tokens: int
+    cost_usd: float
+    latency_p50_ms: Optional[int] = None
+    latency_p95_ms: Optional[int] = None
+    first_token_p50_ms: Optional[int] = None
+    queue_p95_ms: Optional[int] = None
+
+
+class LLMUsageSummary(BaseModel):
+    """Totals of stored LLM calls."""
+
+    calls: int
+    errors: int
+    cached: int
+    retries: int
+    parse_failures: int
+    input_tokens: int
+    cached_input_tokens: int
+    output_tokens: int
+    cost_usd: float
+    latency_p50_ms: Optional[int] = None
+    latency_p95_ms: Optional[int] = None
+
+
+class LLMPromptUsage(LLMUsageSummary):
+    """LLM usage of one prompt on an episode."""
+
+    prompt_id: Optional[str] = None
+
+
+class LLMEpisodeUsage(LLMUsageSummary):
+    """LLM usage of an episode, in total and per prompt."""
+
+    episode_id: str
+    prompts: list[LLMPromptUsage]
+
+
+class LLMBatchCreate(BaseModel):
+    """Highlight detection to submit to a provider batch API."""
+
+    episode_ids: list[str]
+    prompt_ids: list[str]
+    # 'openai', 'anthropic' or 'local'; defaults to the configured provider
+    provider: Optional[str] = None
+    model: Optional[str] = None
+
+
+class LLMBatchResponse(BaseModel):
+    """A provider batch of highlight detection requests."""
+
+    id: str
+    provider: str
+    model: str
+    # None until the provider has accepted the batch
+    provider_batch_id: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+    request_count: int
+    failed_requests: int
+    highlights_count: int
+    input_tokens: int
+    output_tokens: int
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    items: Optional[dict[str, dict[str, Any]]] = None
@@ -0,0 +1,21 @@
+"""Media store Pydantic models."""
+from pydantic import BaseModel
+
+
+class MediaKindStats(BaseModel):
+    """Stored files of one media kind."""
+
+    kind: str
+    files: int
+    size_bytes: int
+    hits: int
+
+
+class MediaStats(BaseModel):
+    """Media store disk usage against its quota."""
+
+    quota_bytes: int
+    used_bytes: int
+    files: int
+    pinned_files: int
+    kinds: list[MediaKindStats]
@@ -0,0 +1,18 @@
+"""Resumable upload Pydantic models."""
+from pydantic import BaseModel
+
+
+class UploadCreate(BaseModel):
+    """Model for starting a resumable upload."""
+
+    filename: str
+    size_bytes: int
+
+
+class UploadStatus(BaseModel):
+    """Progress of a resumable upload."""
+
+    upload_id: str
+    filename: str
+    size_bytes: int
+    offset: int
@@ -1,44 +1,57 @@
 """Episode endpoints."""
-from typing import List
+import asyncio
+from pathlib import Path
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from app.models.episodes import (
+    BulkIngestResponse,
+    EpisodeBulkIngest,
     EpisodeCreate,
     EpisodeIngest,
+    EpisodeLocalIngest,
     EpisodeResponse,
     EpisodeUpdate,
+    EpisodeUploadIngest,
     SegmentResponse,
+    WordResponse,
 )
 from app.services.episode_service import EpisodeService
+from app.services.job_queue import build_job, get_job_queue
+from app.services.progress_broker import format_sse, progress_broker
+from app.services.upload_service import UploadService
+from app.services.word_timing_service import WordTimingService
 
 router = APIRouter()
 episode_service = EpisodeService()
+word_timing_service = WordTimingService()
+upload_service = UploadService()
+job_queue = get_job_queue()
 
 
 @router.post("/ingest", response_model=EpisodeResponse)
-async def ingest_episode(
-    data: EpisodeIngest,
-    background_tasks: BackgroundTasks,
-) -> EpisodeResponse:
+async def ingest_episode(data: EpisodeIngest) -> EpisodeResponse:
     """
     Ingest a YouTube video: download, transcribe, and diarize.
-    Processing happens in the background.
+    Processing is queued and runs in the worker pool.
     """
     try:
         print(f"Creating episode for URL: {data.youtube_url}")
         episode = await episode_service.create_episode(data.youtube_url)
         print(f"Episode created with ID: {episode['id']}")
         
-        # Add background task for processing
-        background_tasks.add_task(
-            episode_service.process_episode,
+        job = job_queue.enqueue(
+            "download_audio",
             episode["id"],
-            data.auto_detect_highlights,
-            data.prompt_ids,
+            {
+                "auto_detect_highlights": data.auto_detect_highlights,
+                "prompt_ids": data.prompt_ids,
+            },
         )
         
-        print(f"Background task added for episode: {episode['id']}")
+        print(f"Job {job['id']} queued for episode: {episode['id']}")
         return EpisodeResponse(**episode)
     except ValueError as e:
         # Handle duplicate URL error
@@ -51,6 +64,123 @@ async def ingest_episode(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _queue_file_processing(
+    episode: dict, auto_detect_highlights: bool, prompt_ids: Optional[List[str]]
+) -> None:
+    """Queue the same processing a YouTube ingest gets; the download stage reads the file."""
+    job = job_queue.enqueue(
+        "download_audio",
+        episode["id"],
+        {"auto_detect_highlights": auto_detect_highlights, "prompt_ids": prompt_ids},
+    )
+    print(f"Job {job['id']} queued for episode: {episode['id']}")
+
+
+@router.post("/upload", response_model=EpisodeResponse)
+async def upload_episode(request: Request) -> EpisodeResponse:
+    """
+    Ingest a media file sent as multipart/form-data.
+    The ``file`` part is streamed to disk as it arrives. Optional fields:
+    ``title``, ``auto_detect_highlights`` and ``prompt_ids`` (repeated or
+    comma-separated). Use ``/api/uploads`` for resumable uploads.
+    """
+    try:
+        fields, stored = await upload_service.receive_multipart(
+            request.headers.get("content-type", ""), request.stream()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    title = (fields.get("title") or [None])[0]
+    auto_detect = (fields.get("auto_detect_highlights") or ["false"])[0].lower() in ("1", "true", "on")
+    prompt_ids = [p.strip() for value in fields.get("prompt_ids", []) for p in value.split(",") if p.strip()]
+    try:
+        episode = await episode_service.create_file_episode(
+            "upload", stored["path"], title or Path(stored["filename"]).stem, stored["key"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    _queue_file_processing(episode, auto_detect, prompt_ids or None)
+    return EpisodeResponse(**episode)
+
+
+@router.post("/ingest-upload", response_model=EpisodeResponse)
+async def ingest_upload(data: EpisodeUploadIngest) -> EpisodeResponse:
+    """Ingest a finished resumable upload."""
+    try:
+        stored = await asyncio.to_thread(upload_service.complete_session, data.upload_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    try:
+        episode = await episode_service.create_file_episode(
+            "upload", stored["path"], data.title or Path(stored["filename"]).stem, stored["key"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    _queue_file_processing(episode, data.auto_detect_highlights, data.prompt_ids)
+    return EpisodeResponse(**episode)
+
+
+@router.post("/ingest-local", response_model=EpisodeResponse)
+async def ingest_local_file(data: EpisodeLocalIngest) -> EpisodeResponse:
+    """
+    Ingest a file already on the server, e.g. on the studio share.
+    The file is processed in place; it must be under ``LOCAL_INGEST_ROOTS``.
+    """
+    try:
+        path = upload_service.resolve_local_path(data.path)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        episode = await episode_service.create_file_episode("local", path, data.title)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    _queue_file_processing(episode, data.auto_detect_highlights, data.prompt_ids)
+    return EpisodeResponse(**episode)
+
+
+@router.post("/bulk-ingest", response_model=BulkIngestResponse)
+async def bulk_ingest_episodes(data: EpisodeBulkIngest) -> BulkIngestResponse:
+    """
+    Ingest every video of playlists, channels or a list of URLs.
+    Episodes are created in one insert and their processing is queued;
+    the worker pool's slots bound how many run at once.
+    """
+    try:
+        result = await episode_service.bulk_create_episodes(data.urls, data.max_videos_per_url)
+        created = result["created"]
+        payload = {
+            "auto_detect_highlights": data.auto_detect_highlights,
+            "prompt_ids": data.prompt_ids,
+        }
+        jobs = job_queue.enqueue_many([
+            build_job("download_audio", episode["id"], payload) for episode in created
+        ])
+        
+        print(f"📥 Bulk ingest queued {len(jobs)} jobs")
+        return BulkIngestResponse(
+            created=[EpisodeResponse(**episode) for episode in created],
+            skipped=result["skipped"],
+            queued_jobs=len(jobs),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error in bulk_ingest_episodes: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("", response_model=List[EpisodeResponse])
 async def list_episodes(
     status: str | None = None,
@@ -71,6 +201,44 @@ async def get_episode(episode_id: str) -> EpisodeResponse:
     return EpisodeResponse(**episode)
 
 
+@router.get("/{episode_id}/events")
+async def stream_episode_events(
+    episode_id: str,
+    request: Request,
+    last_event_id: int | None = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    """
+    Stream processing progress as Server-Sent Events.
+    Starts with a ``snapshot`` of the episode, then pushes ``progress``
+    (stage, percent, status), ``segments`` (newly persisted segments) and
+    ``highlights`` (newly detected highlights) events as they happen.
+    """
+    episode = await episode_service.get_episode(episode_id)
+    if not episode:
+        raise HTTPException(status_code=404, detail="Episode not found")
+
+    async def events():
+        yield format_sse({
+            "type": "snapshot",
+            "data": {
+                "status": episode["status"],
+                "stage": episode.get("processing_stage"),
+                "percent": episode.get("progress_percent", 0),
+                "completed_stages": episode.get("completed_stages") or [],
+            },
+        })
+        async for event in progress_broker.subscribe(episode_id, last_event_id):
+            if await request.is_disconnected():
+                break
+            yield ": keep-alive\n\n" if event is None else format_sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{episode_id}/segments", response_model=List[SegmentResponse])
 async def get_episode_segments(episode_id: str) -> List[SegmentResponse]:
     """Get all segments for an episode."""
@@ -78,6 +246,21 @@ async def get_episode_segments(episode_id: str) -> List[SegmentResponse]:
     return [SegmentResponse(**seg) for seg in segments]
 
 
+@router.get("/{episode_id}/words", response_model=List[WordResponse])
+async def get_episode_words(
+    episode_id: str,
+    start_s: float = Query(..., ge=0),
+    end_s: float = Query(..., ge=0),
+) -> List[WordResponse]:
+    """Get word-level timings for a time range of an episode."""
+    if end_s < start_s:
+        raise HTTPException(status_code=400, detail="end_s must not be before start_s")
+    words = word_timing_service.get_words(episode_id, start_s, end_s)
+    if words is None:
+        raise HTTPException(status_code=404, detail="Word timings not found")
+    return [WordResponse(**w) for w in words]
+
+
 @router.put("/{episode_id}", response_model=EpisodeResponse)
 async def update_episode(episode_id: str, data: EpisodeUpdate) -> EpisodeResponse:
     """Update episode metadata."""
@@ -88,18 +271,25 @@ async def update_episode(episode_id: str, data: EpisodeUpdate) -> EpisodeRespons
 
 
 @router.post("/{episode_id}/detect-highlights")
-async def detect_highlights(
-    episode_id: str,
-    prompt_ids: List[str],
-    background_tasks: BackgroundTasks,
-) -> dict[str, str]:
-    """Detect highlights for an episode using specified prompts."""
-    background_tasks.add_task(
-        episode_service.detect_highlights,
-        episode_id,
-        prompt_ids,
-    )
-    return {"message": "Highlight detection started", "episode_id": episode_id}
+async def detect_highlights(episode_id: str, prompt_ids: List[str]) -> dict[str, str]:
+    """Queue highlight detection for an episode using specified prompts."""
+    job = job_queue.enqueue("detect_highlights", episode_id, {"prompt_ids": prompt_ids})
+    return {
+        "message": "Highlight detection queued",
+        "episode_id": episode_id,
+        "job_id": job["id"],
+    }
+
+
+@router.post("/{episode_id}/render-clips")
+async def render_clips(episode_id: str, highlight_ids: List[str] | None = None) -> dict[str, str]:
+    """Queue clip rendering for an episode's approved (or the given) highlights."""
+    job = job_queue.enqueue("render_clips", episode_id, {"highlight_ids": highlight_ids})
+    return {
+        "message": "Clip rendering queued",
+        "episode_id": episode_id,
+        "job_id": job["id"],
+    }
 
 
 @router.delete("/{episode_id}")
@@ -2,9 +2,11 @@
 from typing import List
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
 
 from app.models.highlights import HighlightFilters, HighlightResponse, HighlightUpdate
 from app.services.highlight_service import HighlightService
+from app.services.media_store import media_store
 
 router = APIRouter()
 highlight_service = HighlightService()
@@ -39,6 +41,15 @@ async def get_highlight(highlight_id: str) -> HighlightResponse:
     return HighlightResponse(**highlight)
 
 
+@router.get("/{highlight_id}/clip")
+async def get_highlight_clip(highlight_id: str) -> FileResponse:
+    """Download a highlight's rendered clip."""
+    path = media_store.get("clip", highlight_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Clip not rendered (or evicted); render it again")
+    return FileResponse(path, media_type="video/mp4", filename=f"{highlight_id}.mp4")
+
+
 @router.put("/{highlight_id}", response_model=HighlightResponse)
 async def update_highlight(highlight_id: str, data: HighlightUpdate) -> HighlightResponse:
     """Update highlight metadata and status."""
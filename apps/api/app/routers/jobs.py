@@ -0,0 +1,26 @@
+"""Job queue endpoints."""
+from typing import List
+
+from fastapi import APIRouter, Query
+
+from app.models.jobs import JobResponse, QueueDepth
+from app.services.job_queue import get_job_queue
+
+router = APIRouter()
+job_queue = get_job_queue()
+
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(
+    episode_id: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+) -> List[JobResponse]:
+    """List recent jobs, optionally for one episode."""
+    jobs = job_queue.list_jobs(episode_id=episode_id, limit=limit)
+    return [JobResponse(**job) for job in jobs]
+
+
+@router.get("/stats", response_model=List[QueueDepth])
+async def queue_stats() -> List[QueueDepth]:
+    """Queue depth: queued and running jobs per resource and kind."""
+    return [QueueDepth(**row) for row in job_queue.stats()]
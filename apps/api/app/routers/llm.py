@@ -0,0 +1,71 @@
+"""LLM usage endpoints."""
+from typing import List
+
+from fastapi import APIRouter, HTTPException
+
+from app.models.llm import (
+    LLMBatchCreate,
+    LLMBatchResponse,
+    LLMCacheStats,
+    LLMEpisodeUsage,
+    LLMModelMetrics,
+)
+from app.services.episode_service import EpisodeService
+from app.services.job_queue import get_job_queue
+from app.services.llm_cache import llm_cache
+from app.services.llm_metrics import llm_metrics
+
+router = APIRouter()
+episode_service = EpisodeService()
+job_queue = get_job_queue()
+
+
+@router.get("/cache/stats", response_model=LLMCacheStats)
+async def cache_stats() -> LLMCacheStats:
+    """Response cache size against its limit, and its hit rate."""
+    return LLMCacheStats(**llm_cache.stats())
+
+
+@router.delete("/cache")
+async def clear_cache() -> dict[str, str]:
+    """Drop every cached completion, e.g. after changing response parsing."""
+    llm_cache.clear()
+    return {"message": "LLM cache cleared"}
+
+
+@router.get("/metrics", response_model=List[LLMModelMetrics])
+async def metrics() -> List[LLMModelMetrics]:
+    """Calls, tokens, cost, error rate and latency percentiles per model, since startup."""
+    return [LLMModelMetrics(**m) for m in llm_metrics.snapshot()]
+
+
+@router.get("/episodes/{episode_id}/usage", response_model=LLMEpisodeUsage)
+async def episode_usage(episode_id: str) -> LLMEpisodeUsage:
+    """LLM calls made for an episode, summarized per prompt."""
+    return LLMEpisodeUsage(**llm_metrics.episode_summary(episode_id))
+
+
+@router.post("/batches")
+async def create_batch(data: LLMBatchCreate) -> dict[str, str]:
+    """Queue highlight detection for many episodes through a provider batch API."""
+    if not data.episode_ids or not data.prompt_ids:
+        raise HTTPException(status_code=400, detail="Episodes and prompts are required")
+    if data.provider is not None and data.provider not in episode_service.llm_service.providers:
+        raise HTTPException(status_code=400, detail=f"Unknown provider: {data.provider}")
+    job = job_queue.enqueue("submit_highlight_batch", None, data.model_dump())
+    return {"message": "Highlight batch queued", "job_id": job["id"]}
+
+
+@router.get("/batches", response_model=List[LLMBatchResponse])
+async def list_batches(limit: int = 50) -> List[LLMBatchResponse]:
+    """Recent highlight batches with their progress and token usage."""
+    return [LLMBatchResponse(**b) for b in await episode_service.list_highlight_batches(limit)]
+
+
+@router.get("/batches/{batch_id}", response_model=LLMBatchResponse)
+async def get_batch(batch_id: str) -> LLMBatchResponse:
+    """A highlight batch with the episode, prompt and window of each request."""
+    batch = await episode_service.get_highlight_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return LLMBatchResponse(**batch)
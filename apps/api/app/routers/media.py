@@ -0,0 +1,13 @@
+"""Media store endpoints."""
+from fastapi import APIRouter
+
+from app.models.media import MediaStats
+from app.services.media_store import media_store
+
+router = APIRouter()
+
+
+@router.get("/stats", response_model=MediaStats)
+async def media_stats() -> MediaStats:
+    """Disk usage of cached media per kind, against the quota."""
+    return MediaStats(**media_store.stats())
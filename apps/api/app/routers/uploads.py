@@ -0,0 +1,59 @@
+"""Resumable upload endpoints."""
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from app.models.uploads import UploadCreate, UploadStatus
+from app.services.upload_service import UploadService
+
+router = APIRouter()
+upload_service = UploadService()
+
+
+@router.post("", response_model=UploadStatus)
+async def create_upload(data: UploadCreate) -> UploadStatus:
+    """
+    Start a resumable upload. Send the file in chunks with
+    ``PATCH /api/uploads/{upload_id}``, then ingest it with
+    ``POST /api/episodes/ingest-upload``.
+    """
+    try:
+        return UploadStatus(**upload_service.create_session(data.filename, data.size_bytes))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{upload_id}", response_model=UploadStatus)
+async def get_upload(upload_id: str) -> UploadStatus:
+    """Get how many bytes were received, to resume after a dropped connection."""
+    try:
+        return UploadStatus(**upload_service.get_session(upload_id))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.patch("/{upload_id}", response_model=UploadStatus)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+) -> UploadStatus:
+    """
+    Append a chunk sent as the raw request body, starting at ``Upload-Offset``.
+    The body is written to disk as it arrives.
+    """
+    try:
+        session = await upload_service.append_chunk(upload_id, upload_offset, request.stream())
+        return UploadStatus(**session)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.delete("/{upload_id}")
+async def cancel_upload(upload_id: str) -> dict[str, str]:
+    """Discard an unfinished upload."""
+    try:
+        upload_service.cancel_session(upload_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": "Upload cancelled"}
@@ -0,0 +1,281 @@
+"""Highlight clip rendering with keyframe-aware ffmpeg cuts."""
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.database import supabase
+from app.services.media_store import media_store
+from app.services.youtube_service import YouTubeService, episode_media_key
+
+# Codecs whose stream-copied and re-encoded parts can be joined
+SMART_CUT_CODECS = ("h264",)
+ENCODE_ARGS = [
+    "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p",
+    "-c:a", "aac", "-b:a", "192k",
+]
+
+Range = Tuple[float, float]
+
+
+def probe_video(video_path: str) -> Dict[str, Any]:
+    """
+    Get a video's codec and keyframe timestamps.
+
+    Only keyframes are decoded (``-skip_frame nokey``), so probing a
+    two-hour episode takes seconds.
+
+    Returns:
+        ``codec`` name and sorted ``keyframes`` in seconds
+    """
+    codec = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "stream=codec_name", "-of", "csv=p=0", video_path],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    frames = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+         "-show_entries", "frame=pts_time", "-of", "csv=p=0", video_path],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    keyframes = np.sort(np.asarray([float(t) for t in frames if t != "N/A"], np.float64))
+    return {"codec": codec, "keyframes": keyframes}
+
+
+def merge_ranges(ranges: List[Range], max_gap_s: float = 0.05) -> List[Range]:
+    """Join consecutive ranges that touch, keeping the given order."""
+    merged: List[Range] = []
+    for start, end in ranges:
+        if merged and 0 <= start - merged[-1][1] <= max_gap_s:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def plan_cut(
+    start_s: float, end_s: float, keyframes: np.ndarray, min_copy_s: float
+) -> List[Tuple[float, float, str]]:
+    """
+    Split a range into re-encoded boundaries and a stream-copied middle.
+
+    Stream copy can only start on a keyframe, so the part before the first
+    keyframe inside the range and the part after the last one are
+    re-encoded, and everything between them is copied untouched.
+
+    Args:
+        start_s: Range start in seconds
+        end_s: Range end in seconds
+        keyframes: Sorted keyframe timestamps
+        min_copy_s: Shortest middle worth copying; shorter ranges are
+            re-encoded whole
+
+    Returns:
+        ``(start, end, mode)`` parts in order, with mode "copy" or "encode"
+    """
+    first = int(np.searchsorted(keyframes, start_s, side="left"))
+    last = int(np.searchsorted(keyframes, end_s, side="right")) - 1
+    if first >= len(keyframes) or last < first or keyframes[last] - keyframes[first] < min_copy_s:
+        return [(start_s, end_s, "encode")]
+
+    copy_start, copy_end = float(keyframes[first]), float(keyframes[last])
+    parts = []
+    if copy_start > start_s:
+        parts.append((start_s, copy_start, "encode"))
+    parts.append((copy_start, copy_end, "copy"))
+    if end_s > copy_end:
+        parts.append((copy_end, end_s, "encode"))
+    return parts
+
+
+def render_clip(
+    video_path: str,
+    ranges: List[Range],
+    keyframes: np.ndarray,
+    codec: str,
+    output_path: str,
+) -> str:
+    """
+    Render one clip from ordered time ranges of a video.
+
+    Runs in a worker process. Each part is cut to MPEG-TS, then all parts
+    are joined with the concat protocol without another encode.
+
+    Returns:
+        Path to the rendered MP4
+    """
+    smart = codec in SMART_CUT_CODECS
+    parts: List[Tuple[float, float, str]] = []
+    for start_s, end_s in ranges:
+        if smart:
+            parts.extend(plan_cut(start_s, end_s, keyframes, settings.CLIP_MIN_COPY_SECONDS))
+        else:
+            parts.append((start_s, end_s, "encode"))
+
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(output_path))
+    try:
+        files = []
+        for i, (start_s, end_s, mode) in enumerate(parts):
+            part = os.path.join(work_dir, f"part_{i:04d}.ts")
+            codec_args = ["-c", "copy", "-bsf:v", "h264_mp4toannexb"] if mode == "copy" else ENCODE_ARGS
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-ss", f"{start_s:.3f}", "-i", video_path,
+                 "-t", f"{end_s - start_s:.3f}", "-map", "0:v:0", "-map", "0:a:0?",
+                 *codec_args, "-avoid_negative_ts", "make_zero", part],
+                check=True,
+            )
+            files.append(part)
+
+        tmp_output = os.path.join(work_dir, "clip.mp4")
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", "concat:" + "|".join(files),
+             "-c", "copy", "-bsf:a", "aac_adtstoasc", "-movflags", "+faststart", tmp_output],
+            check=True,
+        )
+        os.replace(tmp_output, output_path)
+        return output_path
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class ClipService:
+    """Service for rendering highlight clips from episode videos."""
+
+    def __init__(self, youtube_service: Optional[YouTubeService] = None):
+        """
+        Initialize clip service.
+
+        Args:
+            youtube_service: Service used to fetch (cached) episode videos
+        """
+        self.youtube_service = youtube_service or YouTubeService()
+
+    @staticmethod
+    def clip_link(highlight_id: str) -> str:
+        """Get the API path a rendered clip is served from."""
+        return f"/api/highlights/{highlight_id}/clip"
+
+    def get_clip_ranges(self, highlights: List[Dict[str, Any]]) -> Dict[str, List[Range]]:
+        """
+        Get each highlight's time ranges from its ordered segments.
+
+        Highlights without linked segments use their own start and end.
+
+        Args:
+            highlights: Highlights with id, start_s and end_s
+
+        Returns:
+            Ordered, merged ranges per highlight ID
+        """
+        rows: List[Dict[str, Any]] = []
+        ids = [h["id"] for h in highlights]
+        batch_size = 100
+        for i in range(0, len(ids), batch_size):
+            result = (
+                supabase.table("highlight_segments")
+                .select("highlight_id, sequence_order, segments(start_s, end_s)")
+                .in_("highlight_id", ids[i:i + batch_size])
+                .order("sequence_order")
+                .execute()
+            )
+            rows.extend(result.data)
+
+        by_highlight: Dict[str, List[Range]] = {}
+        for row in rows:
+            segment = row["segments"]
+            by_highlight.setdefault(row["highlight_id"], []).append(
+                (segment["start_s"], segment["end_s"])
+            )
+        return {
+            h["id"]: merge_ranges(by_highlight.get(h["id"]) or [(h["start_s"], h["end_s"])])
+            for h in highlights
+        }
+
+    async def render_episode_clips(
+        self,
+        episode_id: str,
+        highlight_ids: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Render clips for an episode's highlights in parallel.
+
+        The episode video is fetched once (from the media store when
+        cached; uploaded and local files are read in place) and probed for
+        keyframes; clips are then rendered in a process pool and each
+        highlight's ``raw_video_link`` is written as soon as its clip is done.
+
+        Args:
+            episode_id: Episode whose highlights to render
+            highlight_ids: Highlights to render; defaults to all approved ones
+            max_workers: Number of ffmpeg worker processes
+
+        Returns:
+            ``rendered`` highlights with their link, and ``failed`` ones
+            with the error
+        """
+        query = supabase.table("highlights").select("id, start_s, end_s").eq("episode_id", episode_id)
+        if highlight_ids:
+            query = query.in_("id", highlight_ids)
+        else:
+            query = query.eq("status", "approved")
+        highlights = query.execute().data
+        if not highlights:
+            return {"rendered": [], "failed": []}
+
+        episode = (
+            supabase.table("episodes")
+            .select("id, youtube_url, source_type, source_path, source_key")
+            .eq("id", episode_id)
+            .execute()
+        ).data[0]
+        if (episode.get("source_type") or "youtube") == "youtube":
+            video_path = await asyncio.to_thread(
+                self.youtube_service.download_video, episode["youtube_url"], episode_id
+            )
+        else:
+            video_path = episode["source_path"]
+        ranges = self.get_clip_ranges(highlights)
+        probe = await asyncio.to_thread(probe_video, video_path)
+        print(f"🎬 Rendering {len(highlights)} clips for episode {episode_id} "
+              f"({probe['codec']}, {len(probe['keyframes'])} keyframes)")
+
+        rendered: List[Dict[str, Any]] = []
+        failed: List[Dict[str, Any]] = []
+        loop = asyncio.get_running_loop()
+        key = episode_media_key(episode)
+        owner = f"clips:{episode_id}:{os.getpid()}"
+
+        with media_store.pinned([("video", key)], owner), \
+                ProcessPoolExecutor(max_workers=max_workers or settings.CLIP_RENDER_WORKERS) as pool:
+
+            async def render(highlight_id: str) -> Tuple[str, Optional[str], Optional[Exception]]:
+                try:
+                    path = await loop.run_in_executor(
+                        pool, render_clip, video_path, ranges[highlight_id], probe["keyframes"],
+                        probe["codec"], str(media_store.path_for("clip", highlight_id, "mp4")),
+                    )
+                    return highlight_id, path, None
+                except Exception as e:
+                    return highlight_id, None, e
+
+            for task in asyncio.as_completed([render(h["id"]) for h in highlights]):
+                highlight_id, path, error = await task
+                if error is not None:
+                    print(f"❌ Clip for highlight {highlight_id} failed: {error}")
+                    failed.append({"highlight_id": highlight_id, "error": str(error)})
+                    continue
+
+                media_store.put("clip", highlight_id, path)
+                link = self.clip_link(highlight_id)
+                supabase.table("highlights").update({"raw_video_link": link}).eq("id", highlight_id).execute()
+                rendered.append({"highlight_id": highlight_id, "raw_video_link": link})
+
+        print(f"✅ Rendered {len(rendered)} clips for episode {episode_id} ({len(failed)} failed)")
+        return {"rendered": rendered, "failed": failed}
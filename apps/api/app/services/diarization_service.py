@@ -1,11 +1,16 @@
 """Speaker diarization service using Pyannote."""
-from typing import Dict, List, Any
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
 
 # Note: pyannote.audio needs to be installed and configured
 # pip install pyannote.audio
 # Requires HuggingFace token for model access
 try:
-    from pyannote.audio import Pipeline
+    from pyannote.audio import Audio, Pipeline
+    from pyannote.core import Segment
     PYANNOTE_AVAILABLE = True
 except ImportError:
     PYANNOTE_AVAILABLE = False
@@ -13,6 +18,49 @@ except ImportError:
 
 from app.core.config import settings
 
+PIPELINE_NAME = "pyannote/speaker-diarization-3.1"
+SAMPLE_RATE = 16000
+# Overlaps shorter than this (seconds) are treated as boundary touches
+MIN_OVERLAP_S = 1e-6
+
+# Per-process pipeline used by chunk workers (loaded once per worker)
+_worker_pipeline = None
+
+
+def _init_chunk_worker(hf_token: str) -> None:
+    """Load the diarization pipeline once in each worker process."""
+    global _worker_pipeline
+    _worker_pipeline = Pipeline.from_pretrained(PIPELINE_NAME, use_auth_token=hf_token)
+
+
+def _diarize_chunk(audio_path: str, start_s: float, end_s: float) -> Dict[str, Any]:
+    """
+    Diarize a single window of an audio file in a worker process.
+
+    Only the requested window is decoded, so memory stays bounded by the
+    chunk length regardless of episode duration.
+
+    Returns:
+        Turns as (start, end, local_label) in episode time, plus one
+        embedding per local label
+    """
+    audio = Audio(sample_rate=SAMPLE_RATE, mono="downmix")
+    waveform, sample_rate = audio.crop(audio_path, Segment(start_s, end_s))
+    annotation, embeddings = _worker_pipeline(
+        {"waveform": waveform, "sample_rate": sample_rate},
+        return_embeddings=True,
+    )
+
+    local_labels = annotation.labels()
+    turns = [
+        (start_s + turn.start, start_s + turn.end, local_labels.index(label))
+        for turn, _, label in annotation.itertracks(yield_label=True)
+    ]
+    return {
+        'turns': turns,
+        'embeddings': np.asarray(embeddings[:len(local_labels)], dtype=np.float32),
+    }
+
 
 class DiarizationService:
     """Service for speaker diarization using Pyannote."""
@@ -30,16 +78,18 @@ class DiarizationService:
             raise RuntimeError("HUGGINGFACE_TOKEN is required for Pyannote")
         
         self.pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization-3.1",
+            PIPELINE_NAME,
             use_auth_token=settings.HUGGINGFACE_TOKEN
         )
 
-    def diarize(self, audio_path: str) -> Dict[str, Any]:
+    def diarize(self, audio_path: str, chunked: Optional[bool] = None) -> Dict[str, Any]:
         """
         Perform speaker diarization on audio file.
         
         Args:
             audio_path: Path to audio file
+            chunked: Force windowed mode on or off. By default, files longer
+                than one chunk are diarized in windows.
             
         Returns:
             Diarization result with speaker segments
@@ -52,12 +102,18 @@ class DiarizationService:
                     {'label': 'SPEAKER_01', 'segments': [(5.0, 10.0), (15.0, 20.0)]},
                 ]
             }
+
+        if chunked is None:
+            duration = Audio().get_duration(audio_path)
+            chunked = duration > settings.DIARIZATION_CHUNK_SECONDS
+        if chunked:
+            return self.diarize_chunked(audio_path)
         
         if self.pipeline is None:
             self.load_pipeline()
         
         # Run diarization
-        diarization = self.pipeline(audio_path)
+        diarization, embeddings = self.pipeline(audio_path, return_embeddings=True)
         
         # Format results
         speakers = {}
@@ -66,48 +122,277 @@ class DiarizationService:
                 speakers[speaker] = []
             speakers[speaker].append((turn.start, turn.end))
         
+        # Embeddings are ordered like diarization.labels()
+        embedding_of = dict(zip(diarization.labels(), embeddings))
         return {
             'speakers': [
-                {'label': label, 'segments': segments}
+                {
+                    'label': label,
+                    'segments': segments,
+                    'embedding': np.asarray(embedding_of[label]).tolist(),
+                }
                 for label, segments in speakers.items()
             ]
         }
 
+    def diarize_chunked(
+        self,
+        audio_path: str,
+        chunk_s: Optional[float] = None,
+        overlap_s: Optional[float] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Diarize audio in fixed-length overlapping windows across processes.
+
+        Each window is diarized independently, then every local speaker
+        embedding is re-clustered globally so labels are consistent across
+        the whole episode.
+
+        Args:
+            audio_path: Path to audio file
+            chunk_s: Window length in seconds
+            overlap_s: Overlap between consecutive windows in seconds
+            max_workers: Number of worker processes
+
+        Returns:
+            Diarization result with speaker segments and a centroid
+            embedding per speaker
+        """
+        if not PYANNOTE_AVAILABLE:
+            raise RuntimeError("Pyannote is not installed")
+
+        if not settings.HUGGINGFACE_TOKEN:
+            raise RuntimeError("HUGGINGFACE_TOKEN is required for Pyannote")
+
+        chunk_s = chunk_s or settings.DIARIZATION_CHUNK_SECONDS
+        overlap_s = settings.DIARIZATION_CHUNK_OVERLAP_SECONDS if overlap_s is None else overlap_s
+        max_workers = max_workers or settings.DIARIZATION_WORKERS or os.cpu_count() or 1
+
+        duration = Audio().get_duration(audio_path)
+        windows = self.plan_chunks(duration, chunk_s, overlap_s)
+
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(windows)),
+            initializer=_init_chunk_worker,
+            initargs=(settings.HUGGINGFACE_TOKEN,),
+        ) as executor:
+            chunk_results = list(executor.map(
+                _diarize_chunk,
+                [audio_path] * len(windows),
+                [start for start, _ in windows],
+                [end for _, end in windows],
+            ))
+
+        return self.merge_chunks(windows, chunk_results, overlap_s)
+
+    def plan_chunks(
+        self, duration_s: float, chunk_s: float, overlap_s: float
+    ) -> List[Tuple[float, float]]:
+        """
+        Split a duration into overlapping windows.
+
+        Args:
+            duration_s: Total audio duration in seconds
+            chunk_s: Window length in seconds
+            overlap_s: Overlap between consecutive windows in seconds
+
+        Returns:
+            List of (start, end) windows covering the whole duration
+        """
+        if overlap_s >= chunk_s:
+            raise ValueError("Chunk overlap must be shorter than the chunk length")
+
+        windows = []
+        start = 0.0
+        while True:
+            end = min(start + chunk_s, duration_s)
+            windows.append((start, end))
+            if end >= duration_s:
+                return windows
+            start = end - overlap_s
+
+    def merge_chunks(
+        self,
+        windows: List[Tuple[float, float]],
+        chunk_results: List[Dict[str, Any]],
+        overlap_s: float,
+    ) -> Dict[str, Any]:
+        """
+        Stitch per-window diarizations into one episode-wide result.
+
+        Each window keeps the turns inside its own core region (its span
+        minus half the overlap on each shared edge), and local speakers are
+        mapped to global clusters of their embeddings.
+
+        Args:
+            windows: The (start, end) windows that were diarized
+            chunk_results: Per-window turns and local speaker embeddings
+            overlap_s: Overlap between consecutive windows in seconds
+
+        Returns:
+            Diarization result with speaker segments and centroid embeddings
+        """
+        embeddings = []
+        owners = []
+        for chunk_idx, chunk in enumerate(chunk_results):
+            for local_idx, embedding in enumerate(chunk['embeddings']):
+                embeddings.append(embedding)
+                owners.append((chunk_idx, local_idx))
+
+        if not embeddings:
+            return {'speakers': []}
+
+        cluster_ids = self.cluster_speaker_embeddings(
+            np.stack(embeddings), [chunk_idx for chunk_idx, _ in owners]
+        )
+        global_of = dict(zip(owners, cluster_ids))
+
+        half = overlap_s / 2
+        turns_by_cluster: Dict[int, List[Tuple[float, float]]] = {}
+        for chunk_idx, ((win_start, win_end), chunk) in enumerate(zip(windows, chunk_results)):
+            core_start = win_start + half if chunk_idx > 0 else win_start
+            core_end = win_end - half if chunk_idx < len(windows) - 1 else win_end
+            for turn_start, turn_end, local_idx in chunk['turns']:
+                start, end = max(turn_start, core_start), min(turn_end, core_end)
+                if end > start:
+                    cluster = global_of[(chunk_idx, local_idx)]
+                    turns_by_cluster.setdefault(cluster, []).append((start, end))
+
+        # Label clusters in order of first appearance, joining turns split by window edges
+        ordered = sorted(turns_by_cluster, key=lambda c: min(t[0] for t in turns_by_cluster[c]))
+        embeddings_array = np.stack(embeddings)
+        cluster_array = np.asarray(cluster_ids)
+        speakers = []
+        for label_idx, cluster in enumerate(ordered):
+            merged: List[Tuple[float, float]] = []
+            for start, end in sorted(turns_by_cluster[cluster]):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            centroid = embeddings_array[cluster_array == cluster].mean(axis=0)
+            speakers.append({
+                'label': f"SPEAKER_{label_idx:02d}",
+                'segments': merged,
+                'embedding': centroid.tolist(),
+            })
+
+        return {'speakers': speakers}
+
+    def cluster_speaker_embeddings(
+        self,
+        embeddings: np.ndarray,
+        chunk_ids: List[int],
+        threshold: Optional[float] = None,
+    ) -> List[int]:
+        """
+        Agglomeratively cluster local speaker embeddings by cosine distance.
+
+        Uses average linkage and never merges two speakers from the same
+        window, since the window-level pipeline already separated them.
+
+        Args:
+            embeddings: Array of shape (num_local_speakers, dim)
+            chunk_ids: Window index of each embedding
+            threshold: Maximum average cosine distance to merge clusters
+
+        Returns:
+            Cluster id for each embedding
+        """
+        threshold = settings.DIARIZATION_CLUSTER_THRESHOLD if threshold is None else threshold
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        unit = embeddings / np.where(norms == 0, 1.0, norms)
+        distance = 1.0 - unit @ unit.T
+
+        chunks = np.asarray(chunk_ids)
+        cannot_link = chunks[:, None] == chunks[None, :]
+
+        clusters = [[i] for i in range(len(embeddings))]
+        while len(clusters) > 1:
+            best, best_pair = np.inf, None
+            for a in range(len(clusters)):
+                for b in range(a + 1, len(clusters)):
+                    if cannot_link[np.ix_(clusters[a], clusters[b])].any():
+                        continue
+                    d = distance[np.ix_(clusters[a], clusters[b])].mean()
+                    if d < best:
+                        best, best_pair = d, (a, b)
+            if best_pair is None or best > threshold:
+                break
+            a, b = best_pair
+            clusters[a].extend(clusters.pop(b))
+
+        cluster_ids = [0] * len(embeddings)
+        for cluster_id, members in enumerate(clusters):
+            for member in members:
+                cluster_ids[member] = cluster_id
+        return cluster_ids
+
     def assign_speakers_to_segments(
         self,
         segments: List[Dict[str, Any]],
-        diarization: Dict[str, Any]
+        diarization: Dict[str, Any],
+        dominant_only: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Assign speakers to transcription segments based on diarization.
-        
+
+        For each speaker, the summed overlap of its turns with ``[0, t]`` is
+        ``G(t) = sum(t - start for starts < t) - sum(t - end for ends < t)``,
+        which ``searchsorted`` over sorted starts and ends and their prefix
+        sums give for every segment edge at once. A segment's overlap with the
+        speaker is ``G(end) - G(start)``, so the cost is
+        O(speakers x (segments + turns) log turns) however long the turns are.
+        A turn that only touches a segment boundary has zero overlap and is
+        not counted.
+
         Args:
             segments: List of transcription segments
             diarization: Diarization result
-            
+            dominant_only: Keep only the speaker with the longest overlap
+
         Returns:
-            List of segments with assigned speakers
+            List of segments with assigned speakers, ordered by overlap duration
         """
+        if not segments:
+            return []
+
+        labels = [speaker_info['label'] for speaker_info in diarization['speakers']]
+        seg_starts = np.fromiter((s['start_s'] for s in segments), np.float64, len(segments))
+        seg_ends = np.fromiter((s['end_s'] for s in segments), np.float64, len(segments))
+
+        def covered_until(times: np.ndarray, edges: np.ndarray) -> np.ndarray:
+            """Sum of ``t - edge`` over the edges before each ``t``."""
+            count = np.searchsorted(edges, times, side='left')
+            prefix = np.concatenate(([0.0], np.cumsum(edges)))
+            return count * times - prefix[count]
+
+        durations = np.zeros((len(segments), len(labels)))
+        for label_idx, speaker_info in enumerate(diarization['speakers']):
+            if not speaker_info['segments']:
+                continue
+            turns = np.asarray(speaker_info['segments'], dtype=np.float64)
+            turn_starts = np.sort(turns[:, 0])
+            turn_ends = np.sort(turns[:, 1])
+            durations[:, label_idx] = (
+                covered_until(seg_ends, turn_starts) - covered_until(seg_ends, turn_ends)
+                - covered_until(seg_starts, turn_starts) + covered_until(seg_starts, turn_ends)
+            )
+        # Prefix sums leave rounding residue where the exact overlap is zero
+        durations[durations < MIN_OVERLAP_S] = 0.0
+
         result = []
-        
-        for segment in segments:
-            segment_start = segment['start_s']
-            segment_end = segment['end_s']
-            segment_speakers = set()
-            
-            # Find overlapping speakers
-            for speaker_info in diarization['speakers']:
-                speaker_label = speaker_info['label']
-                for turn_start, turn_end in speaker_info['segments']:
-                    # Check for overlap
-                    if not (turn_end < segment_start or turn_start > segment_end):
-                        segment_speakers.add(speaker_label)
-            
+        for segment, row in zip(segments, durations):
+            ranked = [int(i) for i in np.argsort(-row, kind='stable') if row[i] > 0]
+            if dominant_only:
+                ranked = ranked[:1]
             result.append({
                 **segment,
-                'speakers': list(segment_speakers)
+                'speakers': [labels[i] for i in ranked]
             })
-        
+
         return result
 
     def extract_unique_speakers(self, diarization: Dict[str, Any]) -> List[str]:
@@ -1,70 +1,365 @@
 """Episode service for business logic."""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
 from typing import Any, Optional
+import numpy as np
 import yt_dlp
 
+from app.core.config import settings
 from app.services.database import supabase
+from app.services.clip_service import ClipService
+from app.services.diarization_service import DiarizationService
+from app.services.fingerprint_service import FingerprintService
+from app.services.llm_batch import split_batches
+from app.services.llm_metrics import call_labels
+from app.services.llm_service import LLMService
+from app.services.processing_pipeline import ProcessingPipeline
+from app.services.speaker_service import SpeakerService
+from app.services.transcript_windows import TranscriptWindow, render_transcript
+from app.services.transcription_service import TranscriptionService
+from app.services.upload_service import probe_duration
+from app.services.word_timing_service import WordTimings, WordTimingService
+from app.services.youtube_service import YouTubeService, extract_video_id
+
+FALLBACK_METADATA = {
+    'title': 'Unknown Title',
+    'duration_seconds': 0,
+    'description': '',
+}
+
+
+def _is_unique_violation(error: Exception) -> bool:
+    """Whether a database error is a unique index violation (PostgreSQL 23505)."""
+    return getattr(error, "code", None) == "23505"
 
 
 class EpisodeService:
     """Service for episode-related operations."""
 
-    def fetch_youtube_metadata(self, youtube_url: str) -> dict[str, Any]:
-        """Fetch metadata from YouTube using yt-dlp."""
+    def __init__(self):
+        """Initialize episode service and its processing collaborators."""
+        self.youtube_service = YouTubeService()
+        self.transcription_service = TranscriptionService()
+        self.diarization_service = DiarizationService()
+        self.speaker_service = SpeakerService()
+        self.word_timing_service = WordTimingService()
+        self.fingerprint_service = FingerprintService()
+        self.llm_service = LLMService()
+        self.clip_service = ClipService(self.youtube_service)
+        # Video ID -> (fetched at, metadata)
+        self._metadata_cache: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._metadata_inflight: dict[str, asyncio.Task] = {}
+        self._creating: dict[str, asyncio.Task] = {}
+
+    def _extract_youtube_metadata(self, youtube_url: str) -> dict[str, Any]:
+        """Fetch metadata from YouTube using yt-dlp, raising on failure."""
         ydl_opts = {
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
         }
         
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(youtube_url, download=False)
+            description = info.get('description', '')
+            print(f"✅ Fetched metadata - Title: {info.get('title', 'Untitled')}")
+            print(f"✅ Description length: {len(description)} characters")
+            print(f"✅ Description preview: {description[:200]}..." if description else "⚠️ No description found")
+            
+            return {
+                'title': info.get('title', 'Untitled'),
+                'duration_seconds': int(info.get('duration', 0)),
+                'description': description,
+                'thumbnail_url': info.get('thumbnail'),
+                'upload_date': info.get('upload_date'),  # Format: YYYYMMDD
+            }
+
+    def fetch_youtube_metadata(self, youtube_url: str) -> dict[str, Any]:
+        """Fetch metadata from YouTube using yt-dlp."""
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(youtube_url, download=False)
-                description = info.get('description', '')
-                print(f"✅ Fetched metadata - Title: {info.get('title', 'Untitled')}")
-                print(f"✅ Description length: {len(description)} characters")
-                print(f"✅ Description preview: {description[:200]}..." if description else "⚠️ No description found")
-                
-                return {
-                    'title': info.get('title', 'Untitled'),
-                    'duration_seconds': int(info.get('duration', 0)),
-                    'description': description,
-                    'thumbnail_url': info.get('thumbnail'),
-                    'upload_date': info.get('upload_date'),  # Format: YYYYMMDD
-                }
+            return self._extract_youtube_metadata(youtube_url)
         except Exception as e:
             print(f"❌ Error fetching YouTube metadata: {e}")
             import traceback
             traceback.print_exc()
-            return {
-                'title': 'Unknown Title',
-                'duration_seconds': 0,
-                'description': '',
-            }
+            return dict(FALLBACK_METADATA)
+
+    async def resolve_youtube_metadata(self, youtube_url: str) -> dict[str, Any]:
+        """
+        Resolve video metadata without blocking the event loop.
+        
+        Results are cached by video ID for ``YOUTUBE_METADATA_TTL_SECONDS``,
+        up to ``YOUTUBE_METADATA_CACHE_SIZE`` videos, and concurrent lookups of the same video share one extraction.
+        Failed lookups fall back to placeholder metadata and are not cached.
+        
+        Args:
+            youtube_url: YouTube video URL
+            
+        Returns:
+            Video metadata
+        """
+        key = extract_video_id(youtube_url) or youtube_url
+        cached = self._metadata_cache.get(key)
+        if cached and time.monotonic() - cached[0] < settings.YOUTUBE_METADATA_TTL_SECONDS:
+            return dict(cached[1])
+        
+        task = self._metadata_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                asyncio.to_thread(self._extract_youtube_metadata, youtube_url)
+            )
+            self._metadata_inflight[key] = task
+            task.add_done_callback(lambda _: self._metadata_inflight.pop(key, None))
+        
+        try:
+            metadata = await asyncio.shield(task)
+        except Exception as e:
+            print(f"❌ Error fetching YouTube metadata: {e}")
+            return dict(FALLBACK_METADATA)
+        
+        # Entries are kept in fetch order, so the first is the oldest
+        self._metadata_cache.pop(key, None)
+        self._metadata_cache[key] = (time.monotonic(), metadata)
+        while len(self._metadata_cache) > settings.YOUTUBE_METADATA_CACHE_SIZE:
+            del self._metadata_cache[next(iter(self._metadata_cache))]
+        return dict(metadata)
+
+    async def find_episode_by_video_id(self, video_id: str) -> Optional[dict[str, Any]]:
+        """Get the episode for a YouTube video ID, if it was ingested."""
+        result = (
+            supabase.table("episodes")
+            .select("*")
+            .eq("youtube_video_id", video_id)
+            .limit(1)
+            .execute()
+        )
+        return result.data[0] if result.data else None
 
     async def create_episode(self, youtube_url: str) -> dict[str, Any]:
         """Create a new episode."""
-        # Check if episode already exists
-        existing = supabase.table("episodes").select("*").eq("youtube_url", youtube_url).execute()
-        if existing.data:
-            raise ValueError(f"Episode already exists for this YouTube URL. Episode ID: {existing.data[0]['id']}")
+        video_id = extract_video_id(youtube_url)
+        key = video_id or youtube_url
+        
+        # A concurrent ingest of the same video wins; this one reports the duplicate
+        pending = self._creating.get(key)
+        if pending is not None:
+            episode = await asyncio.shield(pending)
+            raise ValueError(f"Episode already exists for this YouTube URL. Episode ID: {episode['id']}")
+        
+        task = asyncio.create_task(self._create_episode(youtube_url, video_id))
+        self._creating[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._creating.pop(key, None)
+
+    async def _create_episode(self, youtube_url: str, video_id: Optional[str]) -> dict[str, Any]:
+        # Check if episode already exists; URLs that aren't a recognizable video match verbatim
+        if video_id:
+            existing = await self.find_episode_by_video_id(video_id)
+        else:
+            result = supabase.table("episodes").select("*").eq("youtube_url", youtube_url).execute()
+            existing = result.data[0] if result.data else None
+        if existing:
+            raise ValueError(f"Episode already exists for this YouTube URL. Episode ID: {existing['id']}")
         
         # Fetch YouTube metadata
         print(f"Fetching YouTube metadata for: {youtube_url}")
-        metadata = self.fetch_youtube_metadata(youtube_url)
+        metadata = await self.resolve_youtube_metadata(youtube_url)
         print(f"Metadata fetched - Title: {metadata['title']}, Duration: {metadata['duration_seconds']}s")
         
         data = {
             "youtube_url": youtube_url,
+            "youtube_video_id": video_id,
             "title": metadata['title'],
             "duration_seconds": metadata['duration_seconds'],
             "description": metadata['description'],
             "thumbnail_url": metadata.get('thumbnail_url'),
             "status": "pending",
         }
-        result = supabase.table("episodes").insert(data).execute()
+        try:
+            result = supabase.table("episodes").insert(data).execute()
+        except Exception as e:
+            # Another process created it since the check above
+            if video_id and _is_unique_violation(e):
+                existing = await self.find_episode_by_video_id(video_id) or {}
+                raise ValueError(
+                    f"Episode already exists for this YouTube URL. Episode ID: {existing.get('id')}"
+                ) from e
+            raise
         print(f"Episode created successfully: {result.data[0]['id']}")
         return result.data[0]
 
+    async def create_file_episode(
+        self,
+        source_type: str,
+        path: str,
+        title: Optional[str] = None,
+        source_key: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Create an episode from an uploaded or server-local media file.
+
+        Args:
+            source_type: "upload" or "local"
+            path: File the pipeline reads instead of downloading
+            title: Episode title; defaults to the file name
+            source_key: Content hash of an uploaded file, used to reject
+                duplicate uploads and to key the decoded audio
+
+        Returns:
+            The created episode
+        """
+        if source_key:
+            result = supabase.table("episodes").select("id").eq("source_key", source_key).limit(1).execute()
+        else:
+            result = supabase.table("episodes").select("id").eq("source_path", path).limit(1).execute()
+        if result.data:
+            raise ValueError(f"Episode already exists for this file. Episode ID: {result.data[0]['id']}")
+
+        duration = await asyncio.to_thread(probe_duration, path)
+        data = {
+            "youtube_url": None,
+            "source_type": source_type,
+            "source_path": path,
+            "source_key": source_key,
+            "title": title or Path(path).stem,
+            "duration_seconds": int(duration),
+            "description": "",
+            "status": "pending",
+        }
+        try:
+            result = supabase.table("episodes").insert(data).execute()
+        except Exception as e:
+            if source_key and _is_unique_violation(e):
+                raise ValueError("Episode already exists for this file") from e
+            raise
+        print(f"Episode created from {source_type} file: {result.data[0]['id']}")
+        return result.data[0]
+
+    async def bulk_create_episodes(
+        self, sources: list[str], limit: Optional[int] = None
+    ) -> dict[str, list[dict[str, Any]]]:
+        """
+        Create episodes for every video in a set of playlists, channels or URLs.
+        
+        Playlists and channels are listed with flat extraction, videos are
+        deduplicated by video ID within the request and against existing
+        episodes, and all new episodes are created in one insert.
+        
+        Args:
+            sources: Playlist, channel or video URLs
+            limit: Maximum number of videos to take from each source
+            
+        Returns:
+            ``created`` episodes, and ``skipped`` videos with the reason
+            and, for duplicates, the existing episode ID
+            
+        Raises:
+            ValueError: If more than ``BULK_INGEST_MAX_VIDEOS`` new videos are found
+        """
+        semaphore = asyncio.Semaphore(settings.BULK_INGEST_RESOLVE_CONCURRENCY)
+        skipped: list[dict[str, Any]] = []
+        
+        async def list_source(source: str) -> list[dict[str, Any]]:
+            video_id = extract_video_id(source)
+            if video_id:
+                return [{'video_id': video_id, 'url': source, 'title': None, 'duration_seconds': 0}]
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(self.youtube_service.list_videos, source, limit)
+                except Exception as e:
+                    print(f"❌ Error listing {source}: {e}")
+                    skipped.append({'url': source, 'reason': f"could not be listed: {e}"})
+                    return []
+        
+        listed = await asyncio.gather(*(list_source(source) for source in sources))
+        videos: dict[str, dict[str, Any]] = {}
+        for video in (v for source_videos in listed for v in source_videos):
+            if video['video_id'] in videos:
+                skipped.append({'url': video['url'], 'reason': 'duplicate in request'})
+            else:
+                videos[video['video_id']] = video
+        
+        for episode in await self._find_episodes_by_video_ids(list(videos)):
+            video = videos.pop(episode['youtube_video_id'])
+            skipped.append({'url': video['url'], 'reason': 'already ingested', 'episode_id': episode['id']})
+        
+        if len(videos) > settings.BULK_INGEST_MAX_VIDEOS:
+            raise ValueError(
+                f"Bulk ingest found {len(videos)} new videos; the limit is {settings.BULK_INGEST_MAX_VIDEOS}"
+            )
+        
+        # Listings usually carry title and duration; resolve only the videos that don't
+        async def complete(video: dict[str, Any]) -> dict[str, Any]:
+            if video['title']:
+                return {'title': video['title'], 'duration_seconds': video['duration_seconds'], 'description': ''}
+            async with semaphore:
+                return await self.resolve_youtube_metadata(video['url'])
+        
+        metadata = await asyncio.gather(*(complete(video) for video in videos.values()))
+        rows = [
+            {
+                "youtube_url": video['url'],
+                "youtube_video_id": video['video_id'],
+                "title": meta['title'],
+                "duration_seconds": meta['duration_seconds'],
+                "description": meta.get('description', ''),
+                "thumbnail_url": meta.get('thumbnail_url')
+                or f"https://i.ytimg.com/vi/{video['video_id']}/hqdefault.jpg",
+                "status": "pending",
+            }
+            for video, meta in zip(videos.values(), metadata)
+        ]
+        
+        created = await self._insert_new_episodes(rows, skipped)
+        print(f"✅ Bulk ingest: {len(created)} episodes created, {len(skipped)} skipped")
+        return {"created": created, "skipped": skipped}
+
+    async def _insert_new_episodes(
+        self, rows: list[dict[str, Any]], skipped: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """
+        Insert bulk-ingested episodes in one insert.
+
+        If another process ingested some of the videos meanwhile, they are
+        moved to ``skipped`` and the rest are inserted again.
+        """
+        if not rows:
+            return []
+        try:
+            return supabase.table("episodes").insert(rows).execute().data
+        except Exception as e:
+            if not _is_unique_violation(e):
+                raise
+        existing = {
+            episode['youtube_video_id']: episode['id']
+            for episode in await self._find_episodes_by_video_ids([r['youtube_video_id'] for r in rows])
+        }
+        for row in rows:
+            if row['youtube_video_id'] in existing:
+                skipped.append({'url': row['youtube_url'], 'reason': 'already ingested',
+                                'episode_id': existing[row['youtube_video_id']]})
+        rows = [row for row in rows if row['youtube_video_id'] not in existing]
+        return supabase.table("episodes").insert(rows).execute().data if rows else []
+
+    async def _find_episodes_by_video_ids(self, video_ids: list[str]) -> list[dict[str, Any]]:
+        """Get existing episodes for many video IDs, querying in batches."""
+        episodes: list[dict[str, Any]] = []
+        batch_size = 200  # Keep the PostgREST query string short
+        for i in range(0, len(video_ids), batch_size):
+            result = (
+                supabase.table("episodes")
+                .select("id, youtube_video_id")
+                .in_("youtube_video_id", video_ids[i:i + batch_size])
+                .execute()
+            )
+            episodes.extend(result.data)
+        return episodes
+
     async def list_episodes(
         self,
         status: Optional[str] = None,
@@ -189,34 +484,604 @@ class EpisodeService:
     async def process_episode(
         self,
         episode_id: str,
-        auto_detect_highlights: bool = False,
+        until: Optional[str] = None,
         prompt_ids: Optional[list[str]] = None,
+        restart: bool = False,
     ) -> None:
         """
-        Process an episode: download, transcribe, and diarize.
-        This runs as a background task.
+        Process an episode through the checkpointed pipeline:
+        download → decode → transcribe ‖ diarize → merge speakers → persist
+        → detect highlights. Runs in a worker process.
         
-        For now, this is a placeholder. Use the /api/seed/seed-mock-data/{episode_id}
-        endpoint to populate with mock data, or install WhisperX/Pyannote for real processing.
+        Completed stages are checkpointed and recorded on the episode, so a
+        rerun resumes after the last completed stage. Segments are written
+        in batches as each transcription chunk finishes, so the first part
+        of an episode can be reviewed while the rest is still transcribing.
+        
+        Errors are re-raised so the job queue can retry; the worker then
+        records the outcome with ``record_processing_failure``.
         """
         try:
-            # Update status to show it's queued for processing
-            await self.update_episode(episode_id, {"status": "pending"})
-            print(f"Episode {episode_id} created and queued for processing.")
-            print("To populate with mock data, use: POST /api/seed/seed-mock-data/{episode_id}")
-            
+            await ProcessingPipeline(self).run(
+                episode_id, until=until, prompt_ids=prompt_ids, restart=restart
+            )
         except Exception as e:
             print(f"Error in process_episode: {e}")
+            raise
+
+    async def record_processing_failure(self, episode_id: str, retrying: bool) -> None:
+        """
+        Show a failed processing attempt on the episode.
+
+        Args:
+            episode_id: Episode ID
+            retrying: Whether the job queue will run the episode again; if
+                so the episode waits as pending, otherwise it is failed
+        """
+        if retrying:
+            await self.update_episode(episode_id, {"status": "pending", "processing_stage": "retrying"})
+        else:
             await self.update_episode(episode_id, {"status": "failed"})
 
+    async def _set_progress(
+        self,
+        episode_id: str,
+        stage: str,
+        percent: int,
+        status: Optional[str] = None,
+    ) -> None:
+        """Record the current processing stage and overall progress."""
+        data: dict[str, Any] = {"processing_stage": stage, "progress_percent": percent}
+        if status:
+            data["status"] = status
+        await self.update_episode(episode_id, data)
+
+    async def _insert_segments(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Bulk insert segment rows in batches and return the inserted rows."""
+        inserted = []
+        batch_size = settings.SEGMENT_INSERT_BATCH_SIZE
+        for i in range(0, len(rows), batch_size):
+            result = supabase.table("segments").insert(rows[i:i + batch_size]).execute()
+            inserted.extend(result.data)
+        return inserted
+
+    async def _persist_speakers(
+        self,
+        episode_id: str,
+        diarization: dict[str, Any],
+        assignments: list[dict[str, Any]],
+    ) -> None:
+        """
+        Create speakers and link them to persisted segments.
+        
+        Args:
+            episode_id: Episode ID
+            diarization: Diarization result
+            assignments: Speaker labels per segment ID
+        """
+        speakers = await self.speaker_service.create_speakers(episode_id, diarization)
+        speaker_ids = {s["speaker_label"]: s["id"] for s in speakers}
+        
+        links = [
+            {"segment_id": assignment["segment_id"], "speaker_id": speaker_ids[label]}
+            for assignment in assignments
+            for label in assignment["speakers"]
+            if label in speaker_ids
+        ]
+        
+        batch_size = settings.SEGMENT_INSERT_BATCH_SIZE
+        for i in range(0, len(links), batch_size):
+            supabase.table("segment_speakers").insert(links[i:i + batch_size]).execute()
+
+    async def copy_processed_episode(
+        self, source_id: str, target_id: str, offset_s: float = 0.0
+    ) -> int:
+        """
+        Copy another episode's segments, speakers and word timings.
+
+        Used when a new ingest is the same recording as an already
+        processed episode, so transcription and diarization are skipped.
+
+        Args:
+            source_id: Processed episode with the same audio
+            target_id: Episode to fill in
+            offset_s: Seconds to add to the source's timestamps
+
+        Returns:
+            Number of segments copied
+        """
+        source = await self.get_episode(source_id)
+        segments = (
+            supabase.table("segments")
+            .select("*")
+            .eq("episode_id", source_id)
+            .order("start_s")
+            .execute()
+        ).data
+        segments = [s for s in segments if s["end_s"] + offset_s > 0]
+
+        # Idempotent on resume: earlier partial copies are replaced
+        supabase.table("segments").delete().eq("episode_id", target_id).execute()
+        supabase.table("speakers").delete().eq("episode_id", target_id).execute()
+
+        copied = await self._insert_segments([
+            {
+                "episode_id": target_id,
+                "start_s": max(0.0, s["start_s"] + offset_s),
+                "end_s": s["end_s"] + offset_s,
+                "text": s["text"],
+                "confidence": s["confidence"],
+            }
+            for s in segments
+        ])
+        segment_ids = {old["id"]: new["id"] for old, new in zip(segments, copied)}
+
+        speakers = supabase.table("speakers").select("*").eq("episode_id", source_id).execute().data
+        speaker_ids: dict[str, str] = {}
+        if speakers:
+            new_speakers = supabase.table("speakers").insert([
+                {
+                    "episode_id": target_id,
+                    "speaker_label": s["speaker_label"],
+                    "mapped_name": s.get("mapped_name"),
+                    "embedding": s.get("embedding"),
+                    "known_speaker_id": s.get("known_speaker_id"),
+                }
+                for s in speakers
+            ]).execute().data
+            speaker_ids = {old["id"]: new["id"] for old, new in zip(speakers, new_speakers)}
+
+        links = []
+        old_ids = list(segment_ids)
+        batch_size = 100
+        for i in range(0, len(old_ids), batch_size):
+            result = (
+                supabase.table("segment_speakers")
+                .select("segment_id, speaker_id")
+                .in_("segment_id", old_ids[i:i + batch_size])
+                .execute()
+            )
+            links.extend(
+                {"segment_id": segment_ids[row["segment_id"]], "speaker_id": speaker_ids[row["speaker_id"]]}
+                for row in result.data
+                if row["speaker_id"] in speaker_ids
+            )
+        batch_size = settings.SEGMENT_INSERT_BATCH_SIZE
+        for i in range(0, len(links), batch_size):
+            supabase.table("segment_speakers").insert(links[i:i + batch_size]).execute()
+
+        timings = await asyncio.to_thread(self.word_timing_service.load, source_id)
+        if timings is not None:
+            shifted = WordTimings(
+                offsets=timings.offsets,
+                starts=np.maximum(timings.starts + offset_s, 0).astype(np.float32),
+                ends=np.maximum(timings.ends + offset_s, 0).astype(np.float32),
+                scores=timings.scores,
+                text=timings.text,
+            )
+            await asyncio.to_thread(self.word_timing_service.save, target_id, shifted)
+
+        await self.update_episode(target_id, {
+            "full_transcript": (source or {}).get("full_transcript"),
+            "reused_from_episode_id": source_id,
+            "status": "completed",
+            "processing_stage": None,
+            "progress_percent": 100,
+        })
+        print(f"♻️ Episode {target_id}: copied {len(copied)} segments from {source_id} "
+              f"(offset {offset_s:+.2f}s)")
+        return len(copied)
+
     async def detect_highlights(
         self, episode_id: str, prompt_ids: list[str]
-    ) -> None:
-        """Detect highlights using LLM prompts."""
-        # TODO: Implement highlight detection
-        # 1. Get episode transcript
-        # 2. Get prompts
-        # 3. Run LLM inference
-        # 4. Store highlights
-        pass
+    ) -> list[dict[str, Any]]:
+        """
+        Detect highlights with several prompts at once.
+
+        The transcript is loaded and rendered once and shared by every
+        prompt; the prompts run concurrently (within the LLM rate limits),
+        and each highlight is stored, and so pushed to clients watching the
+        episode, as soon as the streamed response contains it. A prompt
+        that fails does not discard the others' results, nor its own
+        pending highlights from an earlier run; each prompt's timing and
+        token usage is recorded in highlight_runs.
+
+        Args:
+            episode_id: Processed episode
+            prompt_ids: Prompts to run
+
+        Returns:
+            One run record per prompt
+        """
+        segments = await self.get_segments(episode_id)
+        if not segments:
+            raise ValueError(f"Episode {episode_id} has no transcript")
+
+        prompts = supabase.table("prompts").select("*").in_("id", prompt_ids).execute().data
+        missing = set(prompt_ids) - {p["id"] for p in prompts}
+        if missing:
+            print(f"⚠️ Unknown prompts skipped: {', '.join(sorted(missing))}")
+
+        transcript = render_transcript(segments)
+
+        async def run(prompt: dict[str, Any]) -> dict[str, Any]:
+            usage: dict[str, int] = {}
+            started = time.monotonic()
+            stored, error = 0, None
+            replaced = False
+
+            def replace_earlier() -> None:
+                # Unreviewed highlights of an earlier run are replaced, so
+                # retrying a detection does not duplicate them; only once
+                # this run has something to show, so a failed run keeps them
+                nonlocal replaced
+                if not replaced:
+                    replaced = True
+                    (
+                        supabase.table("highlights")
+                        .delete()
+                        .eq("episode_id", episode_id)
+                        .eq("prompt_id", prompt["id"])
+                        .eq("status", "pending")
+                        .execute()
+                    )
+
+            async def store(highlight: dict[str, Any]) -> None:
+                nonlocal stored
+                replace_earlier()
+                if await self._store_highlight(episode_id, prompt["id"], highlight, segments):
+                    stored += 1
+                    if stored == 1:
+                        print(f"⚡ Prompt {prompt['name']}: first highlight after "
+                              f"{time.monotonic() - started:.1f}s")
+
+            try:
+                with call_labels(episode_id=episode_id, prompt_id=prompt["id"]):
+                    await self.llm_service.detect_highlights_windowed(
+                        segments, prompt["template_text"], transcript=transcript, usage=usage,
+                        on_highlight=store,
+                    )
+                # A run that found nothing replaces the earlier highlights too
+                replace_earlier()
+            except Exception as e:
+                error = str(e)
+                print(f"❌ Prompt {prompt['name']} failed on episode {episode_id}: {e}")
+            record = {
+                "episode_id": episode_id,
+                "prompt_id": prompt["id"],
+                "status": "failed" if error else "completed",
+                "error": error,
+                "highlights_count": stored,
+                "duration_ms": int((time.monotonic() - started) * 1000),
+                "calls": usage.get("calls", 0),
+                "cached_calls": usage.get("cached_calls", 0),
+                "input_tokens": usage.get("input_tokens", 0),
+                "cached_input_tokens": usage.get("cached_input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+            }
+            supabase.table("highlight_runs").insert(record).execute()
+            print(f"✨ Prompt {prompt['name']}: {stored} highlights in {record['duration_ms']} ms, "
+                  f"{record['input_tokens']}+{record['output_tokens']} tokens "
+                  f"({record['cached_input_tokens']} input tokens from the provider cache)")
+            return record
+
+        runs = await asyncio.gather(*(run(p) for p in prompts))
+        if runs and all(r["status"] == "failed" for r in runs):
+            raise RuntimeError(f"Every prompt failed on episode {episode_id}: {runs[0]['error']}")
+        return list(runs)
 
+    async def _store_highlight(
+        self,
+        episode_id: str,
+        prompt_id: str,
+        highlight: dict[str, Any],
+        segments: list[dict[str, Any]],
+    ) -> bool:
+        """
+        Insert one highlight with the segments it spans.
+
+        Returns:
+            Whether the highlight was stored
+        """
+        return await self._store_highlights(episode_id, prompt_id, [highlight], segments) == 1
+
+    async def _store_highlights(
+        self,
+        episode_id: str,
+        prompt_id: str,
+        highlights: list[dict[str, Any]],
+        segments: list[dict[str, Any]],
+    ) -> int:
+        """
+        Insert highlights with the segments they span, in two inserts.
+
+        Highlights come as segment index ranges, so each maps straight to
+        its highlight_segments rows.
+
+        Returns:
+            Number of highlights stored
+        """
+        spans = [
+            span for h in highlights
+            if (span := range(h["start_segment"], min(h["end_segment"], len(segments) - 1) + 1))
+        ]
+        if not spans:
+            return 0
+        rows = supabase.table("highlights").insert([
+            {
+                "episode_id": episode_id,
+                "prompt_id": prompt_id,
+                "start_s": segments[span[0]]["start_s"],
+                "end_s": segments[span[-1]]["end_s"],
+                "transcript": " ".join(segments[i]["text"].strip() for i in span),
+            }
+            for span in spans
+        ]).execute().data
+        supabase.table("highlight_segments").insert([
+            {"highlight_id": row["id"], "segment_id": segments[index]["id"], "sequence_order": order}
+            for row, span in zip(rows, spans)
+            for order, index in enumerate(span)
+        ]).execute()
+        return len(rows)
+
+    async def submit_highlight_batch(
+        self,
+        episode_ids: list[str],
+        prompt_ids: list[str],
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        submission_key: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Submit highlight detection for many episodes to a provider batch API.
+
+        Every window of every episode is one request per prompt, laid out
+        as in interactive detection. Requests are split into batches of at
+        most ``LLM_BATCH_MAX_REQUESTS`` requests and ``LLM_BATCH_MAX_MB``
+        (the providers cap batch file sizes), each tracked in llm_batches
+        until ``poll_highlight_batch`` ingests its results. A batch's row is
+        recorded before it is submitted, so a retry with the same
+        ``submission_key`` only submits the batches the provider lacks.
+
+        Args:
+            episode_ids: Processed episodes
+            prompt_ids: Prompts to run on each episode
+            provider: 'openai', 'anthropic' or 'local', uses default if None
+            model: Model to use, uses the provider's default if None
+            submission_key: Identifies the submission across retries, e.g.
+                the job's ID; a new one is made if None
+
+        Returns:
+            The llm_batches rows, one per provider batch
+        """
+        provider = provider or settings.DEFAULT_LLM_PROVIDER
+        model = model or self.llm_service.default_model(provider)
+        prompts = supabase.table("prompts").select("*").in_("id", prompt_ids).execute().data
+        if not prompts:
+            raise ValueError("None of the prompts exist")
+
+        requests: list[tuple[str, dict[str, Any]]] = []
+        items: dict[str, dict[str, Any]] = {}
+        for episode_id in episode_ids:
+            segments = await self.get_segments(episode_id)
+            if not segments:
+                print(f"⚠️ Episode {episode_id} has no transcript, not batched")
+                continue
+            transcript = render_transcript(segments)
+            for prompt in prompts:
+                for window in self.llm_service.windows(segments, prompt["template_text"], transcript):
+                    custom_id = f"r{len(requests)}"
+                    requests.append((custom_id, self.llm_service.batch_request(
+                        provider, model, window.text, prompt["template_text"]
+                    )))
+                    items[custom_id] = {
+                        "episode_id": episode_id,
+                        "prompt_id": prompt["id"],
+                        "first_segment": window.first_segment,
+                        "last_segment": window.last_segment,
+                    }
+        if not requests:
+            raise ValueError("None of the episodes has a transcript")
+
+        submission_key = submission_key or str(uuid.uuid4())
+        recorded = {
+            row["submission_key"]: row
+            for row in supabase.table("llm_batches").select("*")
+            .like("submission_key", f"{submission_key}:%").execute().data
+        }
+        batches = []
+        chunks = split_batches(
+            requests, settings.LLM_BATCH_MAX_REQUESTS, int(settings.LLM_BATCH_MAX_MB * 1024 * 1024)
+        )
+        for n, chunk in enumerate(chunks):
+            key = f"{submission_key}:{n}"
+            batch = recorded.get(key)
+            if batch and batch["provider_batch_id"]:
+                # Submitted by an earlier attempt
+                batches.append(batch)
+                continue
+            if batch is None:
+                batch = supabase.table("llm_batches").insert({
+                    "provider": provider,
+                    "model": model,
+                    "status": "submitting",
+                    "submission_key": key,
+                    "request_count": len(chunk),
+                    "items": {custom_id: items[custom_id] for custom_id, _ in chunk},
+                }).execute().data[0]
+            try:
+                provider_batch_id = await self.llm_service.submit_batch(provider, chunk)
+            except Exception as e:
+                supabase.table("llm_batches").update(
+                    {"status": "failed", "error": f"Submission failed: {e}"[:2000]}
+                ).eq("id", batch["id"]).execute()
+                raise
+            batches.append(supabase.table("llm_batches").update({
+                "provider_batch_id": provider_batch_id,
+                "status": "in_progress",
+                "error": None,
+            }).eq("id", batch["id"]).execute().data[0])
+        print(f"📦 Submitted {len(requests)} highlight requests ({len(prompts)} prompts) "
+              f"in {len(batches)} {provider} batches")
+        return batches
+
+    async def poll_highlight_batch(self, batch_id: str) -> bool:
+        """
+        Check a highlight batch and ingest its results once it has ended.
+
+        Args:
+            batch_id: llm_batches row
+
+        Returns:
+            Whether the batch is finished, so needs no more polling
+        """
+        result = supabase.table("llm_batches").select("*").eq("id", batch_id).execute()
+        if not result.data:
+            raise ValueError(f"Batch {batch_id} not found")
+        batch = result.data[0]
+        if batch["status"] == "ingesting":
+            # An earlier ingest was interrupted; it resumes where it stopped
+            await self._ingest_highlight_batch(batch)
+            return True
+        if batch["status"] != "in_progress":
+            return True
+
+        status = await self.llm_service.batch_status(batch["provider"], batch["provider_batch_id"])
+        if status == "in_progress":
+            return False
+        if status == "failed":
+            supabase.table("llm_batches").update({
+                "status": "failed",
+                "error": "Provider batch failed",
+                "completed_at": datetime.now(timezone.utc).isoformat(),
+            }).eq("id", batch_id).execute()
+            print(f"❌ Highlight batch {batch_id} failed at {batch['provider']}")
+            return True
+        claimed = (
+            supabase.table("llm_batches")
+            .update({"status": "ingesting"})
+            .eq("id", batch_id)
+            .eq("status", "in_progress")
+            .execute()
+        )
+        if claimed.data:
+            await self._ingest_highlight_batch(batch)
+        return True
+
+    async def _ingest_highlight_batch(self, batch: dict[str, Any]) -> None:
+        """
+        Store the highlights of a completed batch, per episode and prompt.
+
+        Each episode's windows are merged as in interactive detection and
+        replace the prompt's unreviewed highlights. An episode and prompt
+        whose requests all failed keeps its highlights. Episodes and prompts
+        that already have a run for this batch were ingested by an earlier,
+        interrupted attempt and are only counted.
+        """
+        items = batch["items"]
+        results = await self.llm_service.batch_results(
+            batch["provider"], batch["model"], batch["provider_batch_id"],
+            labels={
+                custom_id: {"episode_id": item["episode_id"], "prompt_id": item["prompt_id"]}
+                for custom_id, item in items.items()
+            },
+        )
+        runs: dict[tuple[str, str], list[str]] = {}
+        for custom_id, item in items.items():
+            runs.setdefault((item["episode_id"], item["prompt_id"]), []).append(custom_id)
+        ingested = {
+            (run["episode_id"], run["prompt_id"]): run
+            for run in supabase.table("highlight_runs")
+            .select("episode_id, prompt_id, highlights_count")
+            .eq("batch_id", batch["id"]).execute().data
+        }
+
+        created_at = datetime.fromisoformat(batch["created_at"])
+        duration_ms = int((datetime.now(timezone.utc) - created_at).total_seconds() * 1000)
+        totals = {"failed_requests": 0, "highlights_count": 0, "input_tokens": 0, "output_tokens": 0}
+        segments_by_episode: dict[str, list[dict[str, Any]]] = {}
+        for (episode_id, prompt_id), custom_ids in runs.items():
+            if episode_id not in segments_by_episode:
+                segments_by_episode[episode_id] = await self.get_segments(episode_id)
+            segments = segments_by_episode[episode_id]
+            found = []
+            errors = []
+            usage = {"input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0}
+            for custom_id in custom_ids:
+                highlights, call = results.get(custom_id, ([], None))
+                if call is None or call.status == "error":
+                    errors.append(call.error if call else "No result returned")
+                    continue
+                for name in usage:
+                    usage[name] += getattr(call, name)
+                item = items[custom_id]
+                if item["last_segment"] >= len(segments):
+                    errors.append("Transcript changed since the batch was submitted")
+                    continue
+                window = TranscriptWindow(
+                    index=len(found),
+                    first_segment=item["first_segment"],
+                    last_segment=item["last_segment"],
+                    start_s=segments[item["first_segment"]]["start_s"],
+                    end_s=segments[item["last_segment"]]["end_s"],
+                )
+                found.append((window, highlights))
+
+            if (episode_id, prompt_id) in ingested:
+                stored = ingested[(episode_id, prompt_id)]["highlights_count"]
+            else:
+                stored = 0
+                if found:
+                    (
+                        supabase.table("highlights")
+                        .delete()
+                        .eq("episode_id", episode_id)
+                        .eq("prompt_id", prompt_id)
+                        .eq("status", "pending")
+                        .execute()
+                    )
+                    merged = self.llm_service.merge_window_highlights(found, segments)
+                    stored = await self._store_highlights(episode_id, prompt_id, merged, segments)
+                supabase.table("highlight_runs").upsert({
+                    "episode_id": episode_id,
+                    "prompt_id": prompt_id,
+                    "batch_id": batch["id"],
+                    "status": "completed" if found else "failed",
+                    "error": errors[0] if errors else None,
+                    "highlights_count": stored,
+                    "duration_ms": duration_ms,
+                    "calls": len(custom_ids),
+                    "cached_calls": 0,
+                    **usage,
+                }, on_conflict="batch_id,episode_id,prompt_id", ignore_duplicates=True).execute()
+            totals["failed_requests"] += len(errors)
+            totals["highlights_count"] += stored
+            totals["input_tokens"] += usage["input_tokens"]
+            totals["output_tokens"] += usage["output_tokens"]
+
+        supabase.table("llm_batches").update({
+            "status": "completed",
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+            **totals,
+        }).eq("id", batch["id"]).execute()
+        print(f"📦 Batch {batch['id']}: {totals['highlights_count']} highlights for {len(runs)} "
+              f"episode prompts ({totals['failed_requests']} of {len(items)} requests failed)")
+
+    async def list_highlight_batches(self, limit: int = 50) -> list[dict[str, Any]]:
+        """List recent highlight batches, without their request items."""
+        columns = ("id, provider, model, provider_batch_id, status, error, request_count, "
+                   "failed_requests, highlights_count, input_tokens, output_tokens, "
+                   "created_at, completed_at")
+        result = (
+            supabase.table("llm_batches")
+            .select(columns)
+            .order("created_at", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return result.data
+
+    async def get_highlight_batch(self, batch_id: str) -> Optional[dict[str, Any]]:
+        """Get a highlight batch with its request items."""
+        result = supabase.table("llm_batches").select("*").eq("id", batch_id).execute()
+        return result.data[0] if result.data else None
@@ -0,0 +1,278 @@
+"""Audio fingerprints for recognizing re-uploaded recordings."""
+import wave
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.database import supabase
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 4096  # 256 ms analysis window
+HOP_SIZE = 256  # 16 ms between sub-fingerprints
+HOP_S = HOP_SIZE / SAMPLE_RATE
+# 33 log-spaced bands between 300 Hz and 2 kHz give 32 bits per frame
+BAND_EDGES_HZ = np.geomspace(300.0, 2000.0, 34)
+# The index holds the low KEY_BITS of sub-fingerprints whose key is a
+# multiple of INDEX_SAMPLING: short keys survive a few flipped bits, and
+# content-based sampling picks the same frames in both recordings
+KEY_BITS = 20
+INDEX_SAMPLING = 64
+MAX_QUERY_KEYS = 2000
+MIN_VOTES = 4
+BLOCK_FRAMES = 2048
+
+
+def _band_bins() -> np.ndarray:
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1.0 / SAMPLE_RATE)
+    return np.searchsorted(freqs, BAND_EDGES_HZ)
+
+
+def fingerprint_samples(samples: np.ndarray) -> np.ndarray:
+    """
+    Compute 32-bit sub-fingerprints from 16 kHz mono samples.
+
+    Each bit is the sign of the change, from one frame to the next, of
+    the energy difference between adjacent frequency bands (Haitsma &
+    Kalker). The result is robust to re-encoding and volume changes.
+
+    Args:
+        samples: Mono float or int16 samples at 16 kHz
+
+    Returns:
+        One uint32 per hop (16 ms)
+    """
+    if len(samples) < FRAME_SIZE + HOP_SIZE:
+        return np.zeros(0, np.uint32)
+
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    bins = _band_bins()
+    frame_count = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    energies = np.empty((frame_count, len(bins) - 1), np.float32)
+
+    # Bounded memory: frame and transform a block of frames at a time
+    for first in range(0, frame_count, BLOCK_FRAMES):
+        count = min(BLOCK_FRAMES, frame_count - first)
+        starts = (first + np.arange(count)) * HOP_SIZE
+        frames = samples[starts[:, None] + np.arange(FRAME_SIZE)].astype(np.float32) * window
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+        cumulative = np.concatenate([np.zeros((count, 1)), np.cumsum(power, axis=1)], axis=1)
+        energies[first:first + count] = cumulative[:, bins[1:]] - cumulative[:, bins[:-1]]
+
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    weights = (1 << np.arange(32, dtype=np.uint64)).astype(np.uint64)
+    return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+
+def fingerprint_wav(wav_path: str) -> np.ndarray:
+    """
+    Fingerprint a 16 kHz mono 16-bit WAV file, as written by the decode stage.
+
+    The samples are memory-mapped rather than read, so a multi-hour
+    episode is fingerprinted in bounded memory.
+    """
+    with wave.open(wav_path, "rb") as wav:
+        if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError("Fingerprinting needs 16 kHz mono 16-bit PCM")
+        frame_count = wav.getnframes()
+
+    # Find the data chunk; ffmpeg may write LIST chunks before it
+    with open(wav_path, "rb") as f:
+        f.seek(12)
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("WAV file has no data chunk")
+            chunk_id, size = header[:4], int.from_bytes(header[4:], "little")
+            if chunk_id == b"data":
+                offset = f.tell()
+                break
+            f.seek(size + (size & 1), 1)
+
+    samples = np.memmap(wav_path, dtype="<i2", mode="r", offset=offset, shape=(frame_count,))
+    return fingerprint_samples(samples)
+
+
+def compare(
+    query: np.ndarray, reference: np.ndarray, delta: int
+) -> Tuple[float, int]:
+    """
+    Compare two fingerprints aligned so ``query[i]`` matches ``reference[i + delta]``.
+
+    Returns:
+        Bit error rate over the overlap, and the overlap length in frames
+    """
+    q_start = max(0, -delta)
+    q_end = min(len(query), len(reference) - delta)
+    if q_end <= q_start:
+        return 1.0, 0
+    diff = query[q_start:q_end] ^ reference[q_start + delta:q_end + delta]
+    errors = np.unpackbits(diff.view(np.uint8)).sum()
+    overlap = q_end - q_start
+    return float(errors) / (overlap * 32), overlap
+
+
+def index_keys(fingerprint: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the sub-fingerprints that go into the hash index.
+
+    Returns:
+        Frame numbers and their keys
+    """
+    keys = fingerprint & np.uint32((1 << KEY_BITS) - 1)
+    frames = np.flatnonzero(keys % INDEX_SAMPLING == 0)
+    return frames, keys[frames]
+
+
+def _to_bytea(fingerprint: np.ndarray) -> str:
+    return "\\x" + fingerprint.astype("<u4").tobytes().hex()
+
+
+def _from_bytea(value: str) -> np.ndarray:
+    # PostgREST returns bytea as a "\x"-prefixed hex string
+    return np.frombuffer(bytes.fromhex(value[2:]), dtype="<u4")
+
+
+class FingerprintService:
+    """Service for storing audio fingerprints and finding re-uploads."""
+
+    def save(self, episode_id: str, fingerprint: np.ndarray) -> None:
+        """
+        Store an episode's fingerprint and index a sample of it.
+
+        Args:
+            episode_id: Episode ID
+            fingerprint: Sub-fingerprints from ``fingerprint_samples``
+        """
+        supabase.table("audio_fingerprints").upsert({
+            "episode_id": episode_id,
+            "frame_count": len(fingerprint),
+            "hop_s": HOP_S,
+            "data": _to_bytea(fingerprint),
+        }).execute()
+
+        supabase.table("fingerprint_hashes").delete().eq("episode_id", episode_id).execute()
+        frames, keys = index_keys(fingerprint)
+        rows = [
+            {"hash": int(key), "episode_id": episode_id, "frame": int(frame)}
+            for frame, key in zip(frames, keys)
+        ]
+        batch_size = settings.SEGMENT_INSERT_BATCH_SIZE
+        for i in range(0, len(rows), batch_size):
+            supabase.table("fingerprint_hashes").insert(rows[i:i + batch_size]).execute()
+
+    def load(self, episode_id: str) -> Optional[np.ndarray]:
+        """Load an episode's stored fingerprint."""
+        result = (
+            supabase.table("audio_fingerprints")
+            .select("data")
+            .eq("episode_id", episode_id)
+            .execute()
+        )
+        return _from_bytea(result.data[0]["data"]) if result.data else None
+
+    def _candidates(self, episode_id: str, fingerprint: np.ndarray) -> List[Tuple[str, int, int]]:
+        """
+        Vote for (episode, frame offset) pairs from key hits in the index.
+
+        Recordings that are not hop-aligned split their votes between two
+        neighbouring offsets, so each offset is scored with its neighbours.
+        """
+        frames, keys = index_keys(fingerprint)
+        if len(frames) > MAX_QUERY_KEYS:
+            spread = np.linspace(0, len(frames) - 1, MAX_QUERY_KEYS).astype(int)
+            frames, keys = frames[spread], keys[spread]
+        positions: Dict[int, List[int]] = {}
+        for frame, key in zip(frames, keys):
+            positions.setdefault(int(key), []).append(int(frame))
+
+        votes: Counter = Counter()
+        hashes = list(positions)
+        batch_size = 200
+        for i in range(0, len(hashes), batch_size):
+            result = (
+                supabase.table("fingerprint_hashes")
+                .select("hash, episode_id, frame")
+                .in_("hash", hashes[i:i + batch_size])
+                .neq("episode_id", episode_id)
+                .execute()
+            )
+            for row in result.data:
+                for frame in positions[row["hash"]]:
+                    votes[(row["episode_id"], row["frame"] - frame)] += 1
+
+        scores = {
+            (candidate, delta): votes[(candidate, delta - 1)] + count + votes[(candidate, delta + 1)]
+            for (candidate, delta), count in votes.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        candidates: List[Tuple[str, int, int]] = []
+        for (candidate, delta), score in ranked:
+            if score < MIN_VOTES or len(candidates) == 5:
+                break
+            if any(c == candidate and abs(d - delta) <= 1 for c, d, _ in candidates):
+                continue
+            candidates.append((candidate, delta, score))
+        return candidates
+
+    def _processed(self, episode_ids: List[str]) -> Set[str]:
+        """
+        Of these episodes, those whose transcript can be copied.
+
+        An episode is fingerprinted before it is transcribed, so the index
+        also holds episodes still processing or that failed; only completed
+        episodes with a transcript of their own, or copied from another,
+        can be reused.
+        """
+        if not episode_ids:
+            return set()
+        result = (
+            supabase.table("episodes")
+            .select("id")
+            .in_("id", episode_ids)
+            .eq("status", "completed")
+            .or_("full_transcript.not.is.null,reused_from_episode_id.not.is.null")
+            .execute()
+        )
+        return {row["id"] for row in result.data}
+
+    def find_match(self, episode_id: str, fingerprint: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Find an already processed episode with the same recording.
+
+        Candidates from the hash index that are fully processed are
+        verified against the full fingerprint: the bit error rate over the aligned overlap must be
+        below ``FINGERPRINT_MAX_BIT_ERROR`` and the overlap must cover
+        ``FINGERPRINT_MIN_COVERAGE`` of both recordings.
+
+        Args:
+            episode_id: Episode being processed (excluded from results)
+            fingerprint: Its sub-fingerprints
+
+        Returns:
+            The matching ``episode_id``, ``offset_s`` to add to its
+            timestamps, and ``bit_error_rate``; or None
+        """
+        if len(fingerprint) == 0:
+            return None
+
+        candidates = self._candidates(episode_id, fingerprint)
+        processed = self._processed(list({candidate for candidate, _, _ in candidates}))
+        for candidate, delta, votes in candidates:
+            if candidate not in processed:
+                print(f"⏭️ Fingerprint candidate {candidate} is not processed yet")
+                continue
+            reference = self.load(candidate)
+            if reference is None:
+                continue
+            ber, overlap, delta = min(
+                compare(fingerprint, reference, d) + (d,) for d in (delta - 1, delta, delta + 1)
+            )
+            coverage = overlap / max(len(fingerprint), len(reference))
+            print(f"🔎 Fingerprint candidate {candidate}: {votes} votes, "
+                  f"BER {ber:.3f}, coverage {coverage:.0%}")
+            if ber <= settings.FINGERPRINT_MAX_BIT_ERROR and coverage >= settings.FINGERPRINT_MIN_COVERAGE:
+                return {"episode_id": candidate, "offset_s": -delta * HOP_S, "bit_error_rate": ber}
+        return None
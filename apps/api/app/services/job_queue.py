@@ -0,0 +1,378 @@
+"""Durable job queue for episode processing."""
+import json
+import random
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.services.database import supabase
+
+# Job kinds: the resource class they compete for and how often they may run
+JOB_KINDS: Dict[str, Dict[str, Any]] = {
+    "download_audio": {"resource": "io", "max_attempts": 4},
+    "process_episode": {"resource": "cpu", "max_attempts": 2},
+    "detect_highlights": {"resource": "io", "max_attempts": 3},
+    "render_clips": {"resource": "cpu", "max_attempts": 2},
+    "submit_highlight_batch": {"resource": "io", "max_attempts": 2},
+    "poll_highlight_batch": {"resource": "io", "max_attempts": 5},
+}
+
+RESOURCES = ("cpu", "io")
+
+
+class LeaseLostError(Exception):
+    """The job's lease expired and another worker claimed it; the update was not applied."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with full jitter."""
+    base = settings.JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=random.uniform(base / 2, base))
+
+
+def build_job(
+    kind: str,
+    episode_id: Optional[str] = None,
+    payload: Optional[Dict[str, Any]] = None,
+    delay_seconds: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Build a job row for ``enqueue_many`` with the kind's resource and retry limit.
+
+    A job with ``delay_seconds`` is not claimed before that time has passed.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = {
+        "kind": kind,
+        "resource": JOB_KINDS[kind]["resource"],
+        "episode_id": episode_id,
+        "payload": payload or {},
+        "max_attempts": JOB_KINDS[kind]["max_attempts"],
+    }
+    if delay_seconds > 0:
+        job["run_after"] = (_utcnow() + timedelta(seconds=delay_seconds)).isoformat()
+    return job
+
+
+class JobQueue:
+    """Job queue backed by the Supabase ``jobs`` table."""
+
+    def __init__(self):
+        """Initialize job queue."""
+        self.db = supabase
+
+    def enqueue(
+        self,
+        kind: str,
+        episode_id: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        delay_seconds: float = 0.0,
+    ) -> Dict[str, Any]:
+        """Add a job to the queue, runnable after ``delay_seconds``."""
+        return self.enqueue_many([build_job(kind, episode_id, payload, delay_seconds)])[0]
+
+    def enqueue_many(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add several jobs built with the same fields as ``enqueue``."""
+        if not jobs:
+            return []
+        result = self.db.table("jobs").insert(jobs).execute()
+        return result.data
+
+    def claim(self, resource: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Claim the next runnable job for a resource class, if any."""
+        result = self.db.rpc("claim_job", {
+            "p_resource": resource,
+            "p_worker": worker_id,
+            "p_lease_seconds": settings.JOB_LEASE_SECONDS,
+        }).execute()
+        return result.data[0] if result.data else None
+
+    def heartbeat(self, job_id: str, worker_id: str) -> None:
+        """Extend the lease on a running job."""
+        (
+            self.db.table("jobs")
+            .update({"locked_at": _utcnow().isoformat()})
+            .eq("id", job_id)
+            .eq("locked_by", worker_id)
+            .execute()
+        )
+
+    def complete(self, job: Dict[str, Any]) -> None:
+        """
+        Mark a job as succeeded.
+
+        Raises:
+            LeaseLostError: If the worker no longer holds the job
+        """
+        result = (
+            self.db.table("jobs")
+            .update({"status": "succeeded", "locked_by": None, "last_error": None})
+            .eq("id", job["id"])
+            .eq("locked_by", job["locked_by"])
+            .execute()
+        )
+        if not result.data:
+            raise LeaseLostError(job["id"])
+
+    def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """
+        Record a failed attempt, scheduling a retry if attempts remain.
+
+        Returns:
+            True if the job will be retried
+
+        Raises:
+            LeaseLostError: If the worker no longer holds the job
+        """
+        retry = job["attempts"] < job["max_attempts"]
+        data: Dict[str, Any] = {"locked_by": None, "last_error": error[:2000]}
+        if retry:
+            data["status"] = "queued"
+            data["run_after"] = (_utcnow() + _retry_delay(job["attempts"])).isoformat()
+        else:
+            data["status"] = "failed"
+        result = (
+            self.db.table("jobs")
+            .update(data)
+            .eq("id", job["id"])
+            .eq("locked_by", job["locked_by"])
+            .execute()
+        )
+        if not result.data:
+            raise LeaseLostError(job["id"])
+        return retry
+
+    def list_jobs(
+        self, episode_id: Optional[str] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """List recent jobs, optionally for one episode."""
+        query = self.db.table("jobs").select("*")
+        if episode_id:
+            query = query.eq("episode_id", episode_id)
+        return query.order("created_at", desc=True).limit(limit).execute().data
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Queued and running job counts per resource, kind and status."""
+        return self.db.table("job_queue_depth").select("*").execute().data
+
+
+class LocalJobQueue:
+    """
+    SQLite stand-in for ``JobQueue`` for local development.
+
+    Shares the same interface, so the API and workers can run on one
+    machine without the Supabase ``claim_job`` function.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize local job queue.
+
+        Args:
+            path: SQLite database file shared by the API and workers
+        """
+        self.path = path or settings.JOB_QUEUE_SQLITE_PATH
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    resource TEXT NOT NULL,
+                    episode_id TEXT,
+                    payload TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    run_after TEXT NOT NULL,
+                    locked_by TEXT,
+                    locked_at TEXT,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(resource, status, run_after)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def enqueue(
+        self,
+        kind: str,
+        episode_id: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        delay_seconds: float = 0.0,
+    ) -> Dict[str, Any]:
+        """Add a job to the queue, runnable after ``delay_seconds``."""
+        return self.enqueue_many([build_job(kind, episode_id, payload, delay_seconds)])[0]
+
+    def enqueue_many(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add several jobs built with the same fields as ``enqueue``."""
+        now = _utcnow().isoformat()
+        rows = [
+            {
+                **job,
+                "id": str(uuid.uuid4()),
+                "payload": json.dumps(job["payload"]),
+                "run_after": job.get("run_after", now),
+                "created_at": now,
+            }
+            for job in jobs
+        ]
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO jobs (id, kind, resource, episode_id, payload, max_attempts, "
+                "run_after, created_at) VALUES (:id, :kind, :resource, :episode_id, :payload, "
+                ":max_attempts, :run_after, :created_at)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        return [{**row, "payload": job["payload"], "status": "queued", "attempts": 0}
+                for row, job in zip(rows, jobs)]
+
+    def claim(self, resource: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim the next runnable job for a resource class, if any.
+
+        Running jobs whose lease expired are reclaimed while attempts
+        remain, and marked failed otherwise.
+        """
+        now = _utcnow()
+        stale = (now - timedelta(seconds=settings.JOB_LEASE_SECONDS)).isoformat()
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # An expired lease on the last attempt is not reclaimed
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', locked_by = NULL, "
+                "last_error = 'Lease expired after ' || attempts || ' attempts' "
+                "WHERE resource = ? AND status = 'running' AND locked_at < ? "
+                "AND attempts >= max_attempts",
+                (resource, stale),
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE resource = ? AND ("
+                "(status = 'queued' AND run_after <= ?) OR "
+                "(status = 'running' AND locked_at < ? AND attempts < max_attempts)"
+                ") ORDER BY run_after LIMIT 1",
+                (resource, now.isoformat(), stale),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "locked_by = ?, locked_at = ? WHERE id = ?",
+                (worker_id, now.isoformat(), row["id"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+            return self._row(job)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> None:
+        """Extend the lease on a running job."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET locked_at = ? WHERE id = ? AND locked_by = ?",
+                (_utcnow().isoformat(), job_id, worker_id),
+            )
+
+    def complete(self, job: Dict[str, Any]) -> None:
+        """
+        Mark a job as succeeded.
+
+        Raises:
+            LeaseLostError: If the worker no longer holds the job
+        """
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'succeeded', locked_by = NULL, last_error = NULL "
+                "WHERE id = ? AND locked_by = ?",
+                (job["id"], job["locked_by"]),
+            ).rowcount
+        if not updated:
+            raise LeaseLostError(job["id"])
+
+    def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """
+        Record a failed attempt, scheduling a retry if attempts remain.
+
+        Returns:
+            True if the job will be retried
+
+        Raises:
+            LeaseLostError: If the worker no longer holds the job
+        """
+        retry = job["attempts"] < job["max_attempts"]
+        with self._connect() as conn:
+            if retry:
+                run_after = (_utcnow() + _retry_delay(job["attempts"])).isoformat()
+                updated = conn.execute(
+                    "UPDATE jobs SET status = 'queued', run_after = ?, locked_by = NULL, "
+                    "last_error = ? WHERE id = ? AND locked_by = ?",
+                    (run_after, error[:2000], job["id"], job["locked_by"]),
+                ).rowcount
+            else:
+                updated = conn.execute(
+                    "UPDATE jobs SET status = 'failed', locked_by = NULL, last_error = ? "
+                    "WHERE id = ? AND locked_by = ?",
+                    (error[:2000], job["id"], job["locked_by"]),
+                ).rowcount
+        if not updated:
+            raise LeaseLostError(job["id"])
+        return retry
+
+    def list_jobs(
+        self, episode_id: Optional[str] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """List recent jobs, optionally for one episode."""
+        with self._connect() as conn:
+            if episode_id:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE episode_id = ? ORDER BY created_at DESC LIMIT ?",
+                    (episode_id, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Queued and running job counts per resource, kind and status."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT resource, kind, status, COUNT(*) AS count FROM jobs "
+                "WHERE status IN ('queued', 'running') GROUP BY resource, kind, status"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def get_job_queue() -> "JobQueue | LocalJobQueue":
+    """Create the job queue for the configured backend."""
+    if settings.JOB_QUEUE_BACKEND == "local":
+        return LocalJobQueue()
+    return JobQueue()
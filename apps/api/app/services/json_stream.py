@@ -0,0 +1,77 @@
+"""Incremental parsing of JSON arrays of objects from streamed LLM output."""
+import json
+from typing import Any, Dict, List
+
+
+class JSONObjectStream:
+    """
+    Emit each object in a JSON array as soon as it closes.
+
+    Text is fed as it arrives; the parser tracks nesting and string state so
+    brackets inside strings are not counted, and returns every object whose
+    parent is an array once its closing brace has been seen. This finds the
+    items of ``[{...}, ...]`` as well as of ``{"highlights": [{...}, ...]}``
+    and ignores prose around the JSON. Items that are not valid JSON are
+    skipped and counted in ``invalid``.
+    """
+
+    def __init__(self):
+        """Initialize parser state."""
+        self._buffer = ""
+        # Open containers, '[' or '{'
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        # Where the item being received starts in the buffer, and the
+        # nesting depth it closes at
+        self._item_start = -1
+        self._item_depth = 0
+        self.invalid = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Add streamed text.
+
+        Returns:
+            Items completed by this text, in order
+        """
+        scanned = len(self._buffer)
+        self._buffer += text
+        completed = []
+        for i in range(scanned, len(self._buffer)):
+            char = self._buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # Quotes in prose around the JSON do not start strings
+                self._in_string = bool(self._stack)
+            elif char in "[{":
+                if char == "{" and self._item_start < 0 and self._stack and self._stack[-1] == "[":
+                    self._item_start = i
+                    self._item_depth = len(self._stack)
+                self._stack.append(char)
+            elif char in "]}" and self._stack:
+                self._stack.pop()
+                if self._item_start >= 0 and len(self._stack) == self._item_depth:
+                    try:
+                        completed.append(json.loads(self._buffer[self._item_start:i + 1]))
+                    except json.JSONDecodeError:
+                        self.invalid += 1
+                    self._item_start = -1
+
+        # Keep only an item still being received
+        keep = self._item_start if self._item_start >= 0 else len(self._buffer)
+        self._buffer = self._buffer[keep:]
+        if self._item_start >= 0:
+            self._item_start = 0
+        return completed
+
+    @property
+    def truncated(self) -> bool:
+        """Whether the text so far ends inside an item, e.g. output cut off at the token limit."""
+        return self._item_start >= 0
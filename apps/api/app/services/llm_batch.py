@@ -0,0 +1,285 @@
+"""Provider batch APIs for highlight detection that can wait hours for a lower price."""
+import json
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from app.core.config import settings
+from app.services.transcript_windows import estimate_tokens
+
+# Batch states, the same for every provider
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# (custom_id, request body) pairs; bodies are in the provider's own layout
+BatchRequests = List[Tuple[str, Dict[str, Any]]]
+
+
+# Per-request envelope of a batch file line (custom_id, method, URL), in bytes
+REQUEST_OVERHEAD_BYTES = 256
+
+
+def split_batches(requests: BatchRequests, max_requests: int, max_bytes: int) -> List[BatchRequests]:
+    """
+    Split requests into batches within a request count and a size limit.
+
+    Sizes are the requests' JSON encodings plus an envelope allowance, as
+    in the JSONL file the providers receive; a request larger than
+    ``max_bytes`` on its own still gets a batch of its own. The split only
+    depends on the requests, so a retried submission splits them the same
+    way.
+
+    Args:
+        requests: (custom_id, body) pairs in submission order
+        max_requests: Most requests per batch
+        max_bytes: Most encoded bytes per batch
+
+    Returns:
+        The batches, in order
+    """
+    batches: List[BatchRequests] = []
+    chunk: BatchRequests = []
+    chunk_bytes = 0
+    for custom_id, body in requests:
+        size = len(json.dumps(body).encode("utf-8")) + len(custom_id) + REQUEST_OVERHEAD_BYTES
+        if chunk and (len(chunk) >= max_requests or chunk_bytes + size > max_bytes):
+            batches.append(chunk)
+            chunk, chunk_bytes = [], 0
+        chunk.append((custom_id, body))
+        chunk_bytes += size
+    if chunk:
+        batches.append(chunk)
+    return batches
+
+
+@dataclass
+class BatchResult:
+    """The answer to one request of a batch: its text or an error, and its tokens."""
+
+    custom_id: str
+    content: Optional[str] = None
+    error: Optional[str] = None
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class BatchProvider(Protocol):
+    """A provider's batch API: submit requests, then poll and read their results."""
+
+    async def submit(self, requests: BatchRequests) -> str:
+        """Submit requests as one batch, returning the provider's batch ID."""
+        ...
+
+    async def status(self, batch_id: str) -> str:
+        """The batch's state: IN_PROGRESS, COMPLETED or FAILED."""
+        ...
+
+    async def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """The results of a completed batch, by custom_id."""
+        ...
+
+
+class OpenAIBatchProvider:
+    """Chat completions through the OpenAI Batch API (a JSONL file, answered within 24 hours)."""
+
+    def __init__(self, client: Any):
+        """
+        Initialize OpenAI batch provider.
+
+        Args:
+            client: AsyncOpenAI client
+        """
+        self.client = client
+
+    async def submit(self, requests: BatchRequests) -> str:
+        """Upload the requests and start a batch, returning its ID."""
+        lines = [
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body})
+            for custom_id, body in requests
+        ]
+        upload = await self.client.files.create(
+            file=("highlights.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h"
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        """Whether the batch is in progress, completed or failed."""
+        batch = await self.client.batches.retrieve(batch_id)
+        if batch.status in ("completed", "expired", "cancelled"):
+            # Expired and cancelled batches still return the requests that finished
+            return COMPLETED if batch.output_file_id or batch.error_file_id else FAILED
+        if batch.status == "failed":
+            return FAILED
+        return IN_PROGRESS
+
+    async def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Answers of a completed batch, by custom_id."""
+        batch = await self.client.batches.retrieve(batch_id)
+        results: Dict[str, BatchResult] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    result = self._result(json.loads(line))
+                    results[result.custom_id] = result
+        return results
+
+    @staticmethod
+    def _result(item: Dict[str, Any]) -> BatchResult:
+        """Parse one line of a batch output or error file."""
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            error = item.get("error") or body.get("error") or {}
+            message = error.get("message") if isinstance(error, dict) else error
+            return BatchResult(item["custom_id"], error=str(message or f"HTTP {response.get('status_code')}"))
+        usage = body.get("usage") or {}
+        return BatchResult(
+            item["custom_id"],
+            content=body["choices"][0]["message"]["content"],
+            input_tokens=usage.get("prompt_tokens", 0),
+            cached_input_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+            output_tokens=usage.get("completion_tokens", 0),
+        )
+
+
+class AnthropicBatchProvider:
+    """Messages through the Anthropic Message Batches API."""
+
+    def __init__(self, client: Any):
+        """
+        Initialize Anthropic batch provider.
+
+        Args:
+            client: AsyncAnthropic client
+        """
+        self.client = client
+
+    async def submit(self, requests: BatchRequests) -> str:
+        """Start a batch, returning its ID."""
+        batch = await self.client.messages.batches.create(
+            requests=[{"custom_id": custom_id, "params": params} for custom_id, params in requests]
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        """Whether the batch is in progress or completed; requests fail one by one."""
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        return COMPLETED if batch.processing_status == "ended" else IN_PROGRESS
+
+    async def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Answers of an ended batch, by custom_id."""
+        results: Dict[str, BatchResult] = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type != "succeeded":
+                error = getattr(entry.result, "error", None)
+                results[entry.custom_id] = BatchResult(
+                    entry.custom_id, error=f"{entry.result.type}: {error}" if error else entry.result.type
+                )
+                continue
+            message = entry.result.message
+            usage = message.usage
+            results[entry.custom_id] = BatchResult(
+                entry.custom_id,
+                content="".join(block.text for block in message.content if block.type == "text"),
+                input_tokens=(
+                    usage.input_tokens
+                    + (usage.cache_creation_input_tokens or 0)
+                    + (usage.cache_read_input_tokens or 0)
+                ),
+                cached_input_tokens=usage.cache_read_input_tokens or 0,
+                output_tokens=usage.output_tokens,
+            )
+        return results
+
+
+def longest_lines(transcript: str, count: int = 3) -> List[Dict[str, Any]]:
+    """
+    Pick the longest lines of a rendered transcript as highlights.
+
+    A deterministic stand-in for a model's answer: the same transcript
+    always gives the same segment ranges.
+    """
+    lines = [
+        (int(match.group(1)), len(match.group(2)))
+        for match in re.finditer(r"^\[(\d+)\](.*)$", transcript, re.MULTILINE)
+    ]
+    if not lines:
+        return []
+    last = lines[-1][0]
+    picked = sorted(lines, key=lambda line: (-line[1], line[0]))[:count]
+    return [
+        {
+            "start_segment": index,
+            "end_segment": min(index + 1, last),
+            "description": f"Longest passage, from segment {index}",
+        }
+        for index, _ in sorted(picked)
+    ]
+
+
+class LocalBatchProvider:
+    """
+    Offline stand-in for a provider batch API.
+
+    Batches are JSON files in ``LLM_LOCAL_BATCH_DIR`` that complete
+    ``LLM_LOCAL_BATCH_SECONDS`` after submission. Requests use the OpenAI
+    chat layout and are answered with ``longest_lines`` of their
+    transcript, so the whole batch flow runs without network or keys.
+    """
+
+    def __init__(self, directory: Optional[str] = None, delay_seconds: Optional[float] = None):
+        """
+        Initialize local batch provider.
+
+        Args:
+            directory: Where batch files are kept
+            delay_seconds: Time from submission until a batch completes
+        """
+        self.directory = Path(directory or settings.LLM_LOCAL_BATCH_DIR)
+        self.delay_seconds = settings.LLM_LOCAL_BATCH_SECONDS if delay_seconds is None else delay_seconds
+
+    def _path(self, batch_id: str) -> Path:
+        return self.directory / f"{batch_id}.json"
+
+    async def submit(self, requests: BatchRequests) -> str:
+        """Store the requests as a new batch, returning its ID."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        batch_id = f"local_{uuid.uuid4().hex}"
+        self._path(batch_id).write_text(json.dumps({
+            "submitted_at": time.time(),
+            "requests": [{"custom_id": custom_id, "body": body} for custom_id, body in requests],
+        }))
+        return batch_id
+
+    async def status(self, batch_id: str) -> str:
+        """Completed once the delay has passed; failed if the batch file is gone."""
+        path = self._path(batch_id)
+        if not path.exists():
+            return FAILED
+        submitted_at = json.loads(path.read_text())["submitted_at"]
+        return COMPLETED if time.time() - submitted_at >= self.delay_seconds else IN_PROGRESS
+
+    async def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Answer every request of the batch."""
+        results: Dict[str, BatchResult] = {}
+        for request in json.loads(self._path(batch_id).read_text())["requests"]:
+            messages = request["body"]["messages"]
+            content = json.dumps({"highlights": longest_lines(messages[1]["content"])})
+            results[request["custom_id"]] = BatchResult(
+                request["custom_id"],
+                content=content,
+                input_tokens=sum(estimate_tokens(m["content"]) for m in messages),
+                output_tokens=estimate_tokens(content),
+            )
+        return results
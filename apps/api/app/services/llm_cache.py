@@ -0,0 +1,186 @@
+"""Disk-backed cache of LLM completions."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import settings
+
+
+class LLMCache:
+    """
+    LLM completions keyed by everything that determines them.
+
+    The key hashes provider, model, temperature, system prompt and the
+    rendered prompt (which contains the transcript chunk), so re-running a
+    prompt over an unchanged chunk is answered from disk. Entries are kept
+    in a SQLite file shared by the API and worker processes; when the total
+    size exceeds ``LLM_CACHE_MAX_MB`` the least recently used are deleted.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Initialize cache.
+
+        Args:
+            path: SQLite file holding the cache
+            max_bytes: Maximum total size of cached completions
+        """
+        self.path = Path(path or settings.LLM_CACHE_PATH)
+        self.max_bytes = max_bytes or int(settings.LLM_CACHE_MAX_MB * 1024 ** 2)
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._ready:
+            self._init_db()
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    last_access REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_lru ON llm_cache(last_access)")
+        finally:
+            conn.close()
+        self._ready = True
+
+    @staticmethod
+    def key(
+        provider: str,
+        model: str,
+        temperature: float,
+        system_prompt: str,
+        prompt: str,
+    ) -> str:
+        """Hash the inputs that determine a completion."""
+        material = json.dumps([provider, model, temperature, system_prompt, prompt])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _count(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO llm_cache_counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached completion, marking it as recently used.
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(conn, "misses")
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET hits = hits + 1, last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._count(conn, "hits")
+        return json.loads(row["value"])
+
+    def put(self, key: str, provider: str, model: str, value: Dict[str, Any]) -> None:
+        """Store a completion, evicting least recently used ones if over the size limit."""
+        data = json.dumps(value)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO llm_cache (key, provider, model, value, size_bytes, last_access, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                "size_bytes = excluded.size_bytes, last_access = excluded.last_access",
+                (key, provider, model, data, len(data), now, now),
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until under the size limit.
+
+        Returns:
+            Number of entries deleted
+        """
+        removed = 0
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute(
+                    "SELECT key, size_bytes FROM llm_cache ORDER BY last_access"
+                ).fetchall()
+                for row in rows:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (row["key"],))
+                    total -= row["size_bytes"]
+                    removed += 1
+                conn.execute(
+                    "INSERT INTO llm_cache_counters (name, value) VALUES ('evictions', ?) "
+                    "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                    (removed,),
+                )
+            conn.execute("COMMIT")
+        return removed
+
+    def clear(self) -> None:
+        """Delete every cached completion and reset the counters."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+            conn.execute("DELETE FROM llm_cache_counters")
+
+    def stats(self) -> Dict[str, Any]:
+        """Size against the limit, hit rate, and entries per provider and model."""
+        with self._connect() as conn:
+            models = conn.execute(
+                "SELECT provider, model, COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size_bytes, "
+                "COALESCE(SUM(hits), 0) AS hits FROM llm_cache GROUP BY provider, model "
+                "ORDER BY provider, model"
+            ).fetchall()
+            counters = dict(conn.execute("SELECT name, value FROM llm_cache_counters").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "max_bytes": self.max_bytes,
+            "used_bytes": sum(row["size_bytes"] for row in models),
+            "entries": sum(row["entries"] for row in models),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "evictions": counters.get("evictions", 0),
+            "models": [dict(row) for row in models],
+        }
+
+
+# Shared instance; the database is created on first use
+llm_cache = LLMCache()
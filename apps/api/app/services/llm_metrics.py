@@ -0,0 +1,262 @@
+"""Token, latency and cost accounting for LLM calls."""
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.services.database import supabase
+
+# Stored calls waiting for the writer thread, and how many it inserts at once
+MAX_PENDING_CALLS = 10000
+INSERT_BATCH_SIZE = 500
+
+# Labels (episode_id, prompt_id) attached to calls made in the current task
+_labels: ContextVar[Dict[str, str]] = ContextVar("llm_call_labels", default={})
+
+
+@contextmanager
+def call_labels(**labels: str) -> Iterator[None]:
+    """Attach labels, such as episode_id and prompt_id, to LLM calls made inside."""
+    token = _labels.set({**_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def estimate_cost(
+    provider: str,
+    model: str,
+    input_tokens: int,
+    cached_input_tokens: int,
+    output_tokens: int,
+    batch: bool = False,
+) -> Optional[float]:
+    """
+    Estimate a call's cost in USD from ``LLM_PRICES``.
+
+    Batch calls cost ``LLM_BATCH_DISCOUNT`` of the listed prices.
+
+    Returns:
+        The cost, or None when the model has no configured prices
+    """
+    prices = settings.LLM_PRICES.get(f"{provider}:{model}")
+    if not prices:
+        return None
+    uncached = input_tokens - cached_input_tokens
+    cost = (
+        uncached * prices["input"]
+        + cached_input_tokens * prices.get("cached_input", prices["input"])
+        + output_tokens * prices["output"]
+    ) / 1_000_000
+    return cost * settings.LLM_BATCH_DISCOUNT if batch else cost
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class LLMCall:
+    """One LLM call: what was estimated and used, how long it took, and how it ended."""
+
+    provider: str
+    model: str
+    # 'ok', 'error', or 'cached' when answered by the response cache
+    status: str = "ok"
+    error: Optional[str] = None
+    estimated_input_tokens: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    # Waiting for rate limits, time to first streamed text, and total
+    queue_ms: int = 0
+    first_token_ms: Optional[int] = None
+    latency_ms: int = 0
+    retries: int = 0
+    parse_failures: int = 0
+    highlights_count: int = 0
+    # Answered through a provider batch API, with no meaningful latency
+    batch: bool = False
+
+    @property
+    def cost_usd(self) -> Optional[float]:
+        return estimate_cost(
+            self.provider, self.model, self.input_tokens, self.cached_input_tokens, self.output_tokens,
+            self.batch,
+        )
+
+
+class _ModelMetrics:
+    """Running totals and recent latencies of one provider and model."""
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.cached = 0
+        self.retries = 0
+        self.parse_failures = 0
+        self.estimated_input_tokens = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.latencies: Deque[int] = deque(maxlen=window)
+        self.first_tokens: Deque[int] = deque(maxlen=window)
+        self.queues: Deque[int] = deque(maxlen=window)
+
+
+class LLMMetrics:
+    """
+    Accounting of every LLM call.
+
+    Each call is added to in-process totals per provider and model, with
+    latency percentiles over the last ``LLM_METRICS_WINDOW`` provider
+    calls, and stored in the llm_calls table with its labels for
+    per-episode and per-prompt summaries. Rows are queued and inserted in
+    batches by a writer thread, so recording never waits on the database.
+    """
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self._models: Dict[str, _ModelMetrics] = {}
+        self._pending: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=MAX_PENDING_CALLS)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def record(self, call: LLMCall) -> None:
+        """Add a finished call to the totals and store it."""
+        key = f"{call.provider}:{call.model}"
+        if key not in self._models:
+            self._models[key] = _ModelMetrics(settings.LLM_METRICS_WINDOW)
+        m = self._models[key]
+        m.calls += 1
+        m.errors += call.status == "error"
+        m.cached += call.status == "cached"
+        m.retries += call.retries
+        m.parse_failures += call.parse_failures
+        m.estimated_input_tokens += call.estimated_input_tokens
+        m.input_tokens += call.input_tokens
+        m.cached_input_tokens += call.cached_input_tokens
+        m.output_tokens += call.output_tokens
+        m.cost_usd += call.cost_usd or 0.0
+        if call.status != "cached" and not call.batch:
+            m.latencies.append(call.latency_ms)
+            m.queues.append(call.queue_ms)
+            if call.first_token_ms is not None:
+                m.first_tokens.append(call.first_token_ms)
+
+        if not settings.LLM_CALL_LOGGING:
+            return
+        # Every row has the label columns, as rows are inserted together
+        row = {"episode_id": None, "prompt_id": None, **asdict(call), **_labels.get(),
+               "cost_usd": call.cost_usd}
+        try:
+            self._pending.put_nowait(row)
+        except queue.Full:
+            print("⚠️ LLM call metrics queue is full, call not stored")
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._write_calls, name="llm-metrics-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _write_calls(self) -> None:
+        """Insert queued calls in batches, for as long as the process runs."""
+        while True:
+            rows = [self._pending.get()]
+            while len(rows) < INSERT_BATCH_SIZE:
+                try:
+                    rows.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                supabase.table("llm_calls").insert(rows).execute()
+            except Exception as e:
+                # Accounting must never fail a detection
+                print(f"⚠️ Could not store {len(rows)} LLM call metrics: {e}")
+            finally:
+                for _ in rows:
+                    self._pending.task_done()
+
+    def flush(self) -> None:
+        """Wait until every recorded call has been stored (or failed to)."""
+        self._pending.join()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Totals and latency percentiles per provider and model, since startup."""
+        models = []
+        for key, m in sorted(self._models.items()):
+            provider, model = key.split(":", 1)
+            provider_calls = m.calls - m.cached
+            models.append({
+                "provider": provider,
+                "model": model,
+                "calls": m.calls,
+                "errors": m.errors,
+                "cached": m.cached,
+                "error_rate": m.errors / provider_calls if provider_calls else 0.0,
+                "retries": m.retries,
+                "parse_failures": m.parse_failures,
+                "estimated_input_tokens": m.estimated_input_tokens,
+                "input_tokens": m.input_tokens,
+                "cached_input_tokens": m.cached_input_tokens,
+                "output_tokens": m.output_tokens,
+                "cost_usd": round(m.cost_usd, 6),
+                "latency_p50_ms": percentile(list(m.latencies), 0.5),
+                "latency_p95_ms": percentile(list(m.latencies), 0.95),
+                "first_token_p50_ms": percentile(list(m.first_tokens), 0.5),
+                "queue_p95_ms": percentile(list(m.queues), 0.95),
+            })
+        return models
+
+    def episode_summary(self, episode_id: str) -> Dict[str, Any]:
+        """
+        Summarize the stored calls of an episode, per prompt.
+
+        Returns:
+            Totals for the episode and for each prompt run on it
+        """
+        rows = supabase.table("llm_calls").select("*").eq("episode_id", episode_id).execute().data
+        by_prompt: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_prompt.setdefault(row.get("prompt_id"), []).append(row)
+        return {
+            "episode_id": episode_id,
+            **self._summarize(rows),
+            "prompts": [
+                {"prompt_id": prompt_id, **self._summarize(prompt_rows)}
+                for prompt_id, prompt_rows in by_prompt.items()
+            ],
+        }
+
+    def _summarize(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Totals and latency percentiles of stored calls."""
+        latencies = [r["latency_ms"] for r in rows if r["status"] != "cached" and not r.get("batch")]
+        return {
+            "calls": len(rows),
+            "errors": sum(r["status"] == "error" for r in rows),
+            "cached": sum(r["status"] == "cached" for r in rows),
+            "retries": sum(r["retries"] for r in rows),
+            "parse_failures": sum(r["parse_failures"] for r in rows),
+            "input_tokens": sum(r["input_tokens"] for r in rows),
+            "cached_input_tokens": sum(r["cached_input_tokens"] for r in rows),
+            "output_tokens": sum(r["output_tokens"] for r in rows),
+            "cost_usd": round(sum(r.get("cost_usd") or 0.0 for r in rows), 6),
+            "latency_p50_ms": percentile(latencies, 0.5),
+            "latency_p95_ms": percentile(latencies, 0.95),
+        }
+
+
+# Shared by every LLMService in the process
+llm_metrics = LLMMetrics()
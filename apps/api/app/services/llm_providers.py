@@ -0,0 +1,348 @@
+"""Chat model APIs that highlight detection can run on."""
+import asyncio
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+from app.services.llm_batch import (
+    AnthropicBatchProvider,
+    BatchProvider,
+    LocalBatchProvider,
+    OpenAIBatchProvider,
+    longest_lines,
+)
+from app.services.llm_cache import llm_cache
+from app.services.llm_metrics import LLMCall
+from app.services.transcript_windows import estimate_tokens
+
+MAX_OUTPUT_TOKENS = 4096
+TEMPERATURE = 0.7
+
+RESPONSE_FORMAT = """Each transcript line starts with its segment number in brackets, and
+speakers are tagged as listed on the first line. Identify highlights by
+the first and last segment numbers they span (inclusive), not by
+timestamps. Return your
+response as a JSON object with the following structure:
+{
+  "highlights": [
+    {
+      "start_segment": 12,
+      "end_segment": 15,
+      "description": "Brief description of why this moment is a highlight"
+    }
+  ]
+}
+"""
+
+OPENAI_SYSTEM_PROMPT = """You are an expert at analyzing podcast content and identifying 
+highlight moments. """ + RESPONSE_FORMAT
+
+
+def prompt_instructions(prompt_template: str) -> str:
+    """
+    Turn a prompt template into instructions that follow the transcript.
+
+    The transcript is sent first, as a prefix shared by every prompt, so
+    the template's {transcript} placeholder becomes a reference to it.
+    """
+    if "{transcript}" not in prompt_template:
+        return prompt_template
+    return prompt_template.replace("{transcript}", "(the transcript above)")
+
+
+def openai_request(model: str, transcript: str, instructions: str) -> Dict[str, Any]:
+    """Chat completion parameters: the static system prompt and the transcript form the shared prefix."""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": OPENAI_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Transcript:\n{transcript}"},
+            {"role": "user", "content": instructions},
+        ],
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def anthropic_request(model: str, transcript: str, instructions: str) -> Dict[str, Any]:
+    """Message parameters: the transcript is the cached prefix and the instructions follow it."""
+    return {
+        "model": model,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+        "system": [
+            {
+                "type": "text",
+                "text": f"Podcast transcript:\n{transcript}",
+                "cache_control": {"type": "ephemeral"},
+            },
+        ],
+        "messages": [
+            {"role": "user", "content": instructions}
+        ],
+        "temperature": TEMPERATURE,
+    }
+
+
+class LLMProvider(ABC):
+    """
+    A chat model API that highlight detection can run on.
+
+    A provider builds the request for a transcript and a prompt's
+    instructions, starts a streamed response, and turns the stream into
+    text while filling in the call's token counts. ``LLMService`` does the
+    rest (response caching, rate limits, prefix sharing, parsing and
+    accounting) the same way for every provider it has registered.
+    """
+
+    # Key in LLMService.providers, and the provider in rate limits, metrics and cache keys
+    name = ""
+    title = ""
+
+    def __init__(self, client: Any = None):
+        """
+        Initialize provider.
+
+        Args:
+            client: The provider's async API client, None if not configured
+        """
+        self.client = client
+
+    @property
+    @abstractmethod
+    def default_model(self) -> str:
+        """The model used when none is given."""
+
+    def check(self) -> None:
+        """Raise if the provider cannot take calls."""
+        if self.client is None:
+            raise RuntimeError(f"{self.title} API key not configured")
+
+    def instructions(self, prompt_template: str) -> str:
+        """The text sent after the transcript."""
+        return prompt_instructions(prompt_template)
+
+    @abstractmethod
+    def request(self, model: str, transcript: str, instructions: str) -> Dict[str, Any]:
+        """Request parameters, without streaming options; also the body of a batch request."""
+
+    def estimate_input_tokens(self, transcript: str, instructions: str) -> int:
+        """Input tokens of a request, estimated before sending it."""
+        return estimate_tokens(transcript + instructions)
+
+    def cache_key(self, model: str, transcript: str, instructions: str) -> str:
+        """Response cache key of a request."""
+        return llm_cache.key(self.name, model, TEMPERATURE, transcript, instructions)
+
+    @abstractmethod
+    async def create(self, request: Dict[str, Any]) -> Any:
+        """Start a streamed response; errors here are retried by the rate limiter."""
+
+    @abstractmethod
+    def texts(self, stream: Any, call: LLMCall) -> AsyncIterator[str]:
+        """Yield the text of a stream, setting the call's token counts."""
+
+    def batch(self) -> BatchProvider:
+        """The provider's batch API, with submit, status and results."""
+        raise ValueError(f"Provider {self.name} has no batch API")
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions; the prompt prefix is cached automatically."""
+
+    name = "openai"
+    title = "OpenAI"
+
+    @property
+    def default_model(self) -> str:
+        return settings.DEFAULT_LLM_MODEL
+
+    def request(self, model: str, transcript: str, instructions: str) -> Dict[str, Any]:
+        return openai_request(model, transcript, instructions)
+
+    def estimate_input_tokens(self, transcript: str, instructions: str) -> int:
+        return estimate_tokens(OPENAI_SYSTEM_PROMPT + transcript + instructions)
+
+    def cache_key(self, model: str, transcript: str, instructions: str) -> str:
+        return llm_cache.key(
+            self.name, model, TEMPERATURE, OPENAI_SYSTEM_PROMPT, transcript + "\n\n" + instructions
+        )
+
+    async def create(self, request: Dict[str, Any]) -> Any:
+        return await self.client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+
+    async def texts(self, stream: Any, call: LLMCall) -> AsyncIterator[str]:
+        async for chunk in stream:
+            if chunk.usage:
+                details = getattr(chunk.usage, "prompt_tokens_details", None)
+                call.input_tokens = chunk.usage.prompt_tokens
+                call.cached_input_tokens = getattr(details, "cached_tokens", None) or 0
+                call.output_tokens = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def batch(self) -> BatchProvider:
+        self.check()
+        return OpenAIBatchProvider(self.client)
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropic messages; the transcript is cached through ``cache_control``."""
+
+    name = "anthropic"
+    title = "Anthropic"
+
+    @property
+    def default_model(self) -> str:
+        return "claude-3-5-sonnet-20241022"
+
+    def instructions(self, prompt_template: str) -> str:
+        return prompt_instructions(prompt_template) + "\n\n" + RESPONSE_FORMAT
+
+    def request(self, model: str, transcript: str, instructions: str) -> Dict[str, Any]:
+        return anthropic_request(model, transcript, instructions)
+
+    async def create(self, request: Dict[str, Any]) -> Any:
+        return await self.client.messages.create(**request, stream=True)
+
+    async def texts(self, stream: Any, call: LLMCall) -> AsyncIterator[str]:
+        async for event in stream:
+            if event.type == "message_start":
+                usage = event.message.usage
+                # All input tokens, including cache reads and writes
+                call.input_tokens = (
+                    usage.input_tokens
+                    + (usage.cache_creation_input_tokens or 0)
+                    + (usage.cache_read_input_tokens or 0)
+                )
+                call.cached_input_tokens = usage.cache_read_input_tokens or 0
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text
+            elif event.type == "message_delta":
+                call.output_tokens = event.usage.output_tokens
+
+    def batch(self) -> BatchProvider:
+        self.check()
+        return AnthropicBatchProvider(self.client)
+
+
+class LocalProviderError(Exception):
+    """An injected provider failure; retried like a 503."""
+
+    status_code = 503
+
+
+class LocalProvider(LLMProvider):
+    """
+    Local, deterministic provider for load tests and offline runs.
+
+    Answers every request with ``longest_lines`` of its transcript, streamed
+    in small chunks: the first after about ``latency_ms`` and the last
+    ``stream_ms`` later, each varied by up to half from request to request.
+    A share ``error_rate`` of attempts fails with a retryable error. Delays
+    and failures are derived from a hash of the request, the attempt and
+    ``seed``, so a run is reproducible however calls are scheduled.
+    Transcripts already seen count as cached input, like a provider's
+    prompt cache.
+    """
+
+    name = "local"
+    title = "Local"
+    CHUNK_CHARS = 16
+    # Requests with attempts in progress, and cached prefixes, that are remembered
+    MAX_TRACKED = 10000
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        stream_ms: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize local provider, by default from the LLM_LOCAL_* settings.
+
+        Args:
+            latency_ms: Average time to the first streamed text
+            stream_ms: Average time from the first to the last streamed text
+            error_rate: Share of attempts that fail, from 0 to 1
+            seed: Varies delays and failures between runs
+        """
+        super().__init__()
+        self.latency_ms = settings.LLM_LOCAL_LATENCY_MS if latency_ms is None else latency_ms
+        self.stream_ms = settings.LLM_LOCAL_STREAM_MS if stream_ms is None else stream_ms
+        self.error_rate = settings.LLM_LOCAL_ERROR_RATE if error_rate is None else error_rate
+        self.seed = settings.LLM_LOCAL_SEED if seed is None else seed
+        # Request hash -> failed attempts so far, so a retry may succeed
+        self._attempts: "OrderedDict[str, int]" = OrderedDict()
+        # Prefix hashes, least recently used first
+        self._prefixes: "OrderedDict[str, None]" = OrderedDict()
+
+    @property
+    def default_model(self) -> str:
+        return "local"
+
+    def check(self) -> None:
+        return None
+
+    def request(self, model: str, transcript: str, instructions: str) -> Dict[str, Any]:
+        # The OpenAI layout, which LocalBatchProvider answers too
+        return openai_request(model, transcript, instructions)
+
+    def _fraction(self, key: str, salt: str) -> float:
+        """A number in [0, 1) that only depends on the seed, the key and the salt."""
+        digest = hashlib.sha256(f"{self.seed}\0{key}\0{salt}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    async def create(self, request: Dict[str, Any]) -> Any:
+        key = hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+        attempt = self._attempts.pop(key, 0)
+        if self._fraction(key, f"error {attempt}") < self.error_rate:
+            self._attempts[key] = attempt + 1
+            if len(self._attempts) > self.MAX_TRACKED:
+                self._attempts.popitem(last=False)
+            raise LocalProviderError(f"Injected failure (attempt {attempt + 1})")
+        return self._stream(key, request)
+
+    async def _stream(self, key: str, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the answer as text and usage events, like the provider SDKs."""
+        system, prefix, instructions = (m["content"] for m in request["messages"])
+        content = json.dumps({"highlights": longest_lines(prefix)})
+        chunks = [content[i:i + self.CHUNK_CHARS] for i in range(0, len(content), self.CHUNK_CHARS)]
+        latency_s = self.latency_ms * (0.5 + self._fraction(key, "latency")) / 1000
+        chunk_s = self.stream_ms * (0.5 + self._fraction(key, "stream")) / 1000 / len(chunks)
+
+        await asyncio.sleep(latency_s)
+        # The prefix is cached once output starts
+        prefix_key = hashlib.sha256(f"{request['model']}\0{prefix}".encode("utf-8")).hexdigest()
+        cached = estimate_tokens(system + prefix) if prefix_key in self._prefixes else 0
+        self._prefixes[prefix_key] = None
+        self._prefixes.move_to_end(prefix_key)
+        if len(self._prefixes) > self.MAX_TRACKED:
+            self._prefixes.popitem(last=False)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(chunk_s)
+            yield {"text": chunk}
+        yield {"usage": {
+            "input_tokens": estimate_tokens(system + prefix + instructions),
+            "cached_input_tokens": cached,
+            "output_tokens": estimate_tokens(content),
+        }}
+
+    async def texts(self, stream: Any, call: LLMCall) -> AsyncIterator[str]:
+        async for event in stream:
+            if "usage" in event:
+                call.input_tokens = event["usage"]["input_tokens"]
+                call.cached_input_tokens = event["usage"]["cached_input_tokens"]
+                call.output_tokens = event["usage"]["output_tokens"]
+            else:
+                yield event["text"]
+
+    def batch(self) -> BatchProvider:
+        return LocalBatchProvider()
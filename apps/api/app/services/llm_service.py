@@ -1,172 +1,600 @@
-"""LLM service for highlight detection using OpenAI and Anthropic."""
-import json
-from typing import List, Dict, Any, Optional
+"""LLM service for highlight detection on pluggable providers."""
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
 
-from openai import OpenAI
-from anthropic import Anthropic
+from openai import AsyncOpenAI
+from anthropic import AsyncAnthropic
 
 from app.core.config import settings
+from app.services.json_stream import JSONObjectStream
+from app.services.llm_batch import BatchRequests
+from app.services.llm_cache import llm_cache
+from app.services.llm_metrics import LLMCall, call_labels, llm_metrics
+from app.services.llm_providers import (
+    MAX_OUTPUT_TOKENS,
+    AnthropicProvider,
+    LLMProvider,
+    LocalProvider,
+    OpenAIProvider,
+)
+from app.services.rate_limiter import is_retryable, rate_limiter
+from app.services.transcript_windows import (
+    CompactTranscript,
+    TranscriptWindow,
+    build_windows,
+    estimate_tokens,
+    merge_highlights,
+    temporal_iou,
+)
+
+# Providers only cache prefixes of at least this many tokens
+PREFIX_CACHE_MIN_TOKENS = 1024
+
+HighlightCallback = Callable[[Dict[str, Any]], Awaitable[None]]
 
 
 class LLMService:
     """Service for LLM-based highlight detection."""
 
     def __init__(self):
-        """Initialize LLM service with API clients."""
-        self.openai_client = None
-        self.anthropic_client = None
+        """
+        Initialize LLM service with its providers.
         
-        if settings.OPENAI_API_KEY:
-            self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        OpenAI and Anthropic are registered with async API clients when
+        their keys are configured, and the local provider always, so the
+        pipeline runs offline and under load without keys. Other providers
+        can be added with ``register_provider``.
         
-        if settings.ANTHROPIC_API_KEY:
-            self.anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        Calls go through the process-wide rate limiter, so any number of
+        concurrent detections share each provider's request and token
+        budgets. Completions are cached on disk, so re-running a prompt
+        over an unchanged transcript chunk makes no provider call.
+        
+        Requests start with the transcript and end with the prompt's
+        instructions, so prompts over the same transcript share a prefix
+        the providers cache (OpenAI automatically, Anthropic through
+        ``cache_control``). Responses are streamed and each highlight is
+        handed on as soon as its JSON object is complete. Every call's
+        tokens, latency, retries and parse failures are recorded in
+        ``llm_metrics``. Back catalogs, where latency does not matter, can
+        go through the providers' cheaper batch APIs (``submit_batch``).
+        """
+        self.providers: Dict[str, LLMProvider] = {}
+        # Transcript prefix -> set once the first request with it completed
+        self._prefix_ready: Dict[str, asyncio.Event] = {}
+        
+        # Retries are done by the rate limiter, with jitter
+        self.register_provider(OpenAIProvider(
+            AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+            if settings.OPENAI_API_KEY else None
+        ))
+        self.register_provider(AnthropicProvider(
+            AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, max_retries=0)
+            if settings.ANTHROPIC_API_KEY else None
+        ))
+        self.register_provider(LocalProvider())
+
+    def register_provider(self, provider: LLMProvider) -> None:
+        """Make a provider available by its name, replacing one of the same name."""
+        self.providers[provider.name] = provider
 
-    def detect_highlights_openai(
+    def provider(self, name: str) -> LLMProvider:
+        """
+        Get a registered provider.
+        
+        Raises:
+            ValueError: If no provider has that name
+        """
+        if name not in self.providers:
+            raise ValueError(f"Unknown provider: {name}")
+        return self.providers[name]
+
+    @property
+    def openai_client(self) -> Any:
+        return self.providers["openai"].client
+
+    @openai_client.setter
+    def openai_client(self, client: Any) -> None:
+        self.providers["openai"].client = client
+
+    @property
+    def anthropic_client(self) -> Any:
+        return self.providers["anthropic"].client
+
+    @anthropic_client.setter
+    def anthropic_client(self, client: Any) -> None:
+        self.providers["anthropic"].client = client
+
+    async def detect_highlights_openai(
         self,
         transcript: str,
         prompt_template: str,
         model: str = "gpt-4o-mini",
+        usage: Optional[Dict[str, int]] = None,
+        on_highlight: Optional[HighlightCallback] = None,
+    ) -> List[Dict[str, Any]]:
+        """Detect highlights using OpenAI; see ``detect_highlights``."""
+        return await self._detect(
+            self.providers["openai"], transcript, prompt_template, model, usage, on_highlight
+        )
+
+    async def detect_highlights_anthropic(
+        self,
+        transcript: str,
+        prompt_template: str,
+        model: str = "claude-3-5-sonnet-20241022",
+        usage: Optional[Dict[str, int]] = None,
+        on_highlight: Optional[HighlightCallback] = None,
+    ) -> List[Dict[str, Any]]:
+        """Detect highlights using Anthropic Claude; see ``detect_highlights``."""
+        return await self._detect(
+            self.providers["anthropic"], transcript, prompt_template, model, usage, on_highlight
+        )
+
+    async def _detect(
+        self,
+        provider: LLMProvider,
+        transcript: str,
+        prompt_template: str,
+        model: str,
+        usage: Optional[Dict[str, int]],
+        on_highlight: Optional[HighlightCallback],
     ) -> List[Dict[str, Any]]:
         """
-        Detect highlights using OpenAI.
+        Detect highlights with one provider call, or from the response cache.
         
-        Args:
-            transcript: Full transcript text
-            prompt_template: Prompt template with {transcript} placeholder
-            model: OpenAI model to use
-            
         Returns:
-            List of detected highlights
-        """
-        if not self.openai_client:
-            raise RuntimeError("OpenAI API key not configured")
-        
-        # Fill in the template
-        prompt = prompt_template.replace("{transcript}", transcript)
-        
-        # Add instructions for structured output
-        system_prompt = """You are an expert at analyzing podcast content and identifying 
-highlight moments. Return your response as a JSON array with the following structure:
-[
-  {
-    "start_time": "00:15:30",
-    "end_time": "00:16:45",
-    "description": "Brief description of why this moment is a highlight",
-    "transcript": "The actual text spoken during this highlight"
-  }
-]
-"""
-        
-        response = self.openai_client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            response_format={"type": "json_object"}
+            Highlights as inclusive segment index ranges
+        """
+        provider.check()
+        
+        instructions = provider.instructions(prompt_template)
+        call = LLMCall(
+            provider.name, model,
+            estimated_input_tokens=provider.estimate_input_tokens(transcript, instructions),
         )
         
-        content = response.choices[0].message.content
+        cache_key = provider.cache_key(model, transcript, instructions)
+        cached = None
+        if settings.LLM_CACHE_ENABLED:
+            # The cache is a SQLite file; reads and writes stay off the event loop
+            cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached:
+            self._record_usage(usage, cached=True)
+            return await self._emit_highlights(cached["content"], on_highlight, call)
         
+        request = provider.request(model, transcript, instructions)
+        reserved = call.estimated_input_tokens + MAX_OUTPUT_TOKENS
+        emitted = 0
+        
+        async def emit(highlight: Dict[str, Any]) -> None:
+            nonlocal emitted
+            emitted += 1
+            await on_highlight(highlight)
+        
+        async with self._tracked(call) as limits:
+            async with self._shared_prefix(provider.name, model, transcript) as prefix_cached:
+                limits["prefix_wait_s"] = time.monotonic() - limits["started"]
+                
+                async def attempt() -> Tuple[List[Dict[str, Any]], str]:
+                    # Read the whole stream inside the limiter's slot, so
+                    # LLM_MAX_CONCURRENCY bounds the calls in flight and
+                    # errors during the stream are retried too
+                    stream = await provider.create(request)
+                    return await self._consume_stream(
+                        provider.texts(stream, call), emit if on_highlight else None,
+                        prefix_cached, call, limits["started"],
+                    )
+                
+                highlights, content = await rate_limiter.call(
+                    provider.name,
+                    model,
+                    reserved,
+                    attempt,
+                    stats=limits,
+                    # A retry after a highlight was handed on would repeat it
+                    retryable=lambda e: emitted == 0 and is_retryable(e),
+                )
+        
+        rate_limiter.settle(provider.name, model, reserved, call.input_tokens + call.output_tokens)
+        self._record_usage(usage, call.input_tokens, call.output_tokens,
+                           cached_input_tokens=call.cached_input_tokens)
+        # Only a response parsed in full is reused; a truncated or malformed
+        # one is asked again next time
+        if settings.LLM_CACHE_ENABLED and call.parse_failures == 0:
+            await asyncio.to_thread(llm_cache.put, cache_key, provider.name, model, {"content": content})
+        return highlights
+
+    @asynccontextmanager
+    async def _tracked(self, call: LLMCall) -> AsyncIterator[Dict[str, float]]:
+        """
+        Time a provider call and record it with its outcome.
+        
+        Yields the stats dict the rate limiter fills in (retries and seconds
+        waited), with the start time and the wait for a shared prefix.
+        """
+        limits: Dict[str, float] = {"started": time.monotonic(), "prefix_wait_s": 0.0}
         try:
-            # Parse JSON response
-            result = json.loads(content)
-            highlights = result.get('highlights', [])
-            return self._parse_highlights(highlights)
-        except json.JSONDecodeError:
-            # Fallback: try to extract highlights from text
-            return []
-
-    def detect_highlights_anthropic(
+            yield limits
+        except Exception as e:
+            call.status = "error"
+            call.error = f"{e.__class__.__name__}: {e}"[:500]
+            raise
+        finally:
+            call.retries = int(limits.get("retries", 0))
+            call.queue_ms = int((limits["prefix_wait_s"] + limits.get("wait_s", 0.0)) * 1000)
+            call.latency_ms = int((time.monotonic() - limits["started"]) * 1000)
+            llm_metrics.record(call)
+
+    async def _consume_stream(
+        self,
+        texts: AsyncIterator[str],
+        on_highlight: Optional[HighlightCallback],
+        on_first_text: Callable[[], None],
+        call: LLMCall,
+        started: float,
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Parse highlights out of streamed text as their objects close.
+        
+        Returns:
+            The highlights and the full response text
+        """
+        parser = JSONObjectStream()
+        highlights: List[Dict[str, Any]] = []
+        parts = []
+        items = 0
+        async for text in texts:
+            if not parts:
+                # Output has started, so the provider has cached the prompt prefix
+                on_first_text()
+                call.first_token_ms = int((time.monotonic() - started) * 1000)
+            parts.append(text)
+            raw = parser.feed(text)
+            items += len(raw)
+            for highlight in self._parse_highlights(raw):
+                highlights.append(highlight)
+                if on_highlight:
+                    await on_highlight(highlight)
+        content = "".join(parts)
+        self._count_parse_failures(call, parser, items, highlights, content)
+        return highlights, content
+
+    async def _emit_highlights(
+        self, content: str, on_highlight: Optional[HighlightCallback], call: LLMCall
+    ) -> List[Dict[str, Any]]:
+        """Parse a cached response, passing each highlight to the callback."""
+        parser = JSONObjectStream()
+        raw = parser.feed(content)
+        highlights = self._parse_highlights(raw)
+        if on_highlight:
+            for highlight in highlights:
+                await on_highlight(highlight)
+        call.status = "cached"
+        self._count_parse_failures(call, parser, len(raw), highlights, content)
+        llm_metrics.record(call)
+        return highlights
+
+    def _count_parse_failures(
+        self,
+        call: LLMCall,
+        parser: JSONObjectStream,
+        items: int,
+        highlights: List[Dict[str, Any]],
+        content: str,
+    ) -> None:
+        """Count invalid, rejected and cut-off items, and a response with no JSON array at all."""
+        call.highlights_count = len(highlights)
+        call.parse_failures = parser.invalid + items - len(highlights) + int(parser.truncated)
+        if not items and not parser.invalid and "[" not in content:
+            call.parse_failures += 1
+
+    async def detect_highlights(
         self,
         transcript: str,
         prompt_template: str,
-        model: str = "claude-3-5-sonnet-20241022",
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+        on_highlight: Optional[HighlightCallback] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Detect highlights using Anthropic Claude.
+        Detect highlights using configured LLM provider.
         
         Args:
-            transcript: Full transcript text
+            transcript: Transcript rendered by ``render_transcript``
             prompt_template: Prompt template with {transcript} placeholder
-            model: Claude model to use
+            provider: Name of a registered provider ('openai', 'anthropic',
+                'local' or one added with ``register_provider``), uses
+                default if None
+            model: Model to use, uses the provider's default if None
+            usage: Counters to add token usage to (calls, cached_calls,
+                input_tokens, cached_input_tokens, output_tokens)
+            on_highlight: Called with each highlight as soon as it is parsed
             
         Returns:
-            List of detected highlights
-        """
-        if not self.anthropic_client:
-            raise RuntimeError("Anthropic API key not configured")
-        
-        # Fill in the template
-        prompt = prompt_template.replace("{transcript}", transcript)
-        
-        # Add instructions for structured output
-        prompt += """\n\nReturn your response as a JSON array with the following structure:
-[
-  {
-    "start_time": "00:15:30",
-    "end_time": "00:16:45",
-    "description": "Brief description of why this moment is a highlight",
-    "transcript": "The actual text spoken during this highlight"
-  }
-]
-"""
-        
-        response = self.anthropic_client.messages.create(
-            model=model,
-            max_tokens=4096,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
+            Highlights as inclusive segment index ranges
+        """
+        llm = self.provider(provider or settings.DEFAULT_LLM_PROVIDER)
+        return await self._detect(
+            llm, transcript, prompt_template, model or llm.default_model, usage, on_highlight
         )
-        
-        content = response.content[0].text
-        
-        try:
-            # Extract JSON from response
-            start_idx = content.find('[')
-            end_idx = content.rfind(']') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = content[start_idx:end_idx]
-                highlights = json.loads(json_str)
-                return self._parse_highlights(highlights)
-        except (json.JSONDecodeError, ValueError):
-            pass
-        
-        return []
-
-    def detect_highlights(
+
+    async def detect_highlights_windowed(
         self,
-        transcript: str,
+        segments: List[Dict[str, Any]],
         prompt_template: str,
         provider: Optional[str] = None,
         model: Optional[str] = None,
+        transcript: Optional[CompactTranscript] = None,
+        usage: Optional[Dict[str, int]] = None,
+        on_highlight: Optional[HighlightCallback] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Detect highlights using configured LLM provider.
+        Detect highlights over a long transcript in concurrent windows.
+        
+        The transcript is split on segment boundaries into overlapping
+        windows that fit ``LLM_WINDOW_MAX_TOKENS`` together with the prompt,
+        up to ``LLM_WINDOW_CONCURRENCY`` windows run at once (within the
+        provider's rate limits), and highlights
+        found twice in an overlap are merged. Latency is that of the
+        slowest window rather than growing with episode length.
         
         Args:
-            transcript: Full transcript text
+            segments: Segments ordered by start, with start_s, end_s, text
+                and optionally speakers
             prompt_template: Prompt template with {transcript} placeholder
-            provider: LLM provider ('openai' or 'anthropic'), uses default if None
-            model: Model to use, uses default if None
+            provider: Name of a registered provider, uses default if None
+            model: Model to use, uses the provider's default if None
+            transcript: The segments already rendered by
+                ``render_transcript``, to share one rendering between prompts
+            usage: Counters to add token usage to, summed over windows
+            on_highlight: Called with each highlight as soon as its window's
+                response contains it; a highlight overlapping one already
+                passed on is dropped instead of merged
             
         Returns:
-            List of detected highlights
+            Detected highlights ordered by start time, with their segment
+            index range and its start_s and end_s
         """
-        provider = provider or settings.DEFAULT_LLM_PROVIDER
+        windows = self.windows(segments, prompt_template, transcript)
+        semaphore = asyncio.Semaphore(settings.LLM_WINDOW_CONCURRENCY)
+        emitted: List[Dict[str, Any]] = []
         
-        if provider == "openai":
-            model = model or settings.DEFAULT_LLM_MODEL
-            return self.detect_highlights_openai(transcript, prompt_template, model)
-        elif provider == "anthropic":
-            model = model or "claude-3-5-sonnet-20241022"
-            return self.detect_highlights_anthropic(transcript, prompt_template, model)
-        else:
-            raise ValueError(f"Unknown provider: {provider}")
+        async def run(window: TranscriptWindow) -> List[Dict[str, Any]]:
+            async def emit(highlight: Dict[str, Any]) -> None:
+                for h in self._clip_to_window([highlight], window, segments):
+                    if all(temporal_iou(h, other) < settings.HIGHLIGHT_MERGE_IOU for other in emitted):
+                        emitted.append(h)
+                        await on_highlight(h)
+            
+            async with semaphore:
+                return await self.detect_highlights(
+                    window.text, prompt_template, provider, model, usage,
+                    emit if on_highlight else None,
+                )
+        
+        results = await asyncio.gather(*(run(w) for w in windows), return_exceptions=True)
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if failures and len(failures) == len(results):
+            raise failures[0]
+        for window, result in zip(windows, results):
+            if isinstance(result, BaseException):
+                print(f"⚠️ Highlight window {window.index} "
+                      f"({window.start_s:.0f}-{window.end_s:.0f}s) failed: {result}")
+        
+        found = [(w, r) for w, r in zip(windows, results) if not isinstance(r, BaseException)]
+        if on_highlight:
+            print(f"✨ {len(emitted)} highlights from {len(windows)} windows")
+            return sorted(emitted, key=lambda h: h['start_s'])
+        return self.merge_window_highlights(found, segments)
+    
+    def windows(
+        self,
+        segments: List[Dict[str, Any]],
+        prompt_template: str,
+        transcript: Optional[CompactTranscript] = None,
+    ) -> List[TranscriptWindow]:
+        """
+        Split a transcript into windows that fit ``LLM_WINDOW_MAX_TOKENS`` with the prompt.
+        
+        Raises:
+            ValueError: If the prompt leaves no room for the transcript
+        """
+        budget = settings.LLM_WINDOW_MAX_TOKENS - estimate_tokens(prompt_template)
+        if budget <= settings.LLM_WINDOW_OVERLAP_TOKENS:
+            raise ValueError("Prompt template leaves no room for the transcript in a window")
+        return build_windows(segments, budget, settings.LLM_WINDOW_OVERLAP_TOKENS, transcript)
+    
+    def merge_window_highlights(
+        self,
+        found: List[Tuple[TranscriptWindow, List[Dict[str, Any]]]],
+        segments: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Clip each window's highlights to it and merge those found twice in an overlap.
+        
+        Args:
+            found: Windows with the highlights detected in each
+            segments: The segments the windows were built from
+            
+        Returns:
+            Highlights ordered by start time, with start_s and end_s
+        """
+        highlights = [h for window, hs in found for h in self._clip_to_window(hs, window, segments)]
+        merged = merge_highlights(highlights, settings.HIGHLIGHT_MERGE_IOU)
+        print(f"✨ {len(merged)} highlights from {len(found)} windows "
+              f"({len(highlights) - len(merged)} duplicates merged)")
+        return merged
+    
+    def default_model(self, provider: str) -> str:
+        """The model used for a provider when none is given."""
+        return self.provider(provider).default_model
+    
+    def batch_request(
+        self, provider: str, model: str, transcript: str, prompt_template: str
+    ) -> Dict[str, Any]:
+        """
+        Build one batch request, laid out like the interactive call.
+        
+        Args:
+            provider: 'openai', 'anthropic' or 'local' (the offline stand-in)
+            model: Model to use
+            transcript: Transcript window rendered by ``render_transcript``
+            prompt_template: Prompt template with {transcript} placeholder
+            
+        Returns:
+            The request body for ``submit_batch``
+        """
+        llm = self.provider(provider)
+        return llm.request(model, transcript, llm.instructions(prompt_template))
+    
+    async def submit_batch(self, provider: str, requests: BatchRequests) -> str:
+        """
+        Submit requests built by ``batch_request`` as one provider batch.
+        
+        Batches are answered within 24 hours at ``LLM_BATCH_DISCOUNT`` of
+        the interactive price and do not count against the rate limits of
+        interactive calls.
+        
+        Args:
+            provider: 'openai', 'anthropic' or 'local'
+            requests: (custom_id, request body) pairs
+            
+        Returns:
+            The provider's batch ID
+        """
+        return await self.provider(provider).batch().submit(requests)
+    
+    async def batch_status(self, provider: str, batch_id: str) -> str:
+        """Whether a provider batch is 'in_progress', 'completed' or 'failed'."""
+        return await self.provider(provider).batch().status(batch_id)
+    
+    async def batch_results(
+        self,
+        provider: str,
+        model: str,
+        batch_id: str,
+        labels: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> Dict[str, Tuple[List[Dict[str, Any]], LLMCall]]:
+        """
+        Parse the answers of a completed provider batch.
+        
+        Each answer is recorded in ``llm_metrics`` as a batch call.
+        
+        Args:
+            provider: 'openai', 'anthropic' or 'local'
+            model: Model the batch was submitted for
+            batch_id: The provider's batch ID
+            labels: Call labels (episode_id, prompt_id) by custom_id
+            
+        Returns:
+            By custom_id, the highlights as inclusive segment index ranges
+            and the call; a failed request has no highlights and an
+            'error' call
+        """
+        results = await self.provider(provider).batch().results(batch_id)
+        parsed = {}
+        for custom_id, result in results.items():
+            call = LLMCall(
+                provider, model, batch=True,
+                input_tokens=result.input_tokens,
+                cached_input_tokens=result.cached_input_tokens,
+                output_tokens=result.output_tokens,
+            )
+            highlights: List[Dict[str, Any]] = []
+            if result.error is not None:
+                call.status = "error"
+                call.error = result.error[:500]
+            else:
+                parser = JSONObjectStream()
+                raw = parser.feed(result.content or "")
+                highlights = self._parse_highlights(raw)
+                self._count_parse_failures(call, parser, len(raw), highlights, result.content or "")
+            with call_labels(**(labels or {}).get(custom_id, {})):
+                llm_metrics.record(call)
+            parsed[custom_id] = (highlights, call)
+        return parsed
+
+    @asynccontextmanager
+    async def _shared_prefix(
+        self, provider: str, model: str, transcript: str
+    ) -> AsyncIterator[Callable[[], None]]:
+        """
+        Let the first request with a transcript prefix warm the provider cache.
+
+        A prefix is only cached once a request with it has been processed,
+        so when several prompts start on the same transcript together the
+        first goes ahead and the others wait for it, then read the prefix
+        from the cache instead of each paying for it in full. The first
+        request releases the others by calling the yielded function as soon
+        as its output starts, or by finishing.
+        """
+        if not settings.LLM_PROMPT_CACHING or estimate_tokens(transcript) < PREFIX_CACHE_MIN_TOKENS:
+            yield lambda: None
+            return
+        key = hashlib.sha256(f"{provider}\0{model}\0{transcript}".encode("utf-8")).hexdigest()
+        ready = self._prefix_ready.get(key)
+        if ready is not None:
+            await ready.wait()
+            yield lambda: None
+            return
+        self._prefix_ready[key] = ready = asyncio.Event()
+        try:
+            yield ready.set
+        finally:
+            # Later requests find the prefix cached and need not wait
+            ready.set()
+            del self._prefix_ready[key]
+
+    def _record_usage(
+        self,
+        usage: Optional[Dict[str, int]],
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cached: bool = False,
+        cached_input_tokens: int = 0,
+    ) -> None:
+        """Add one call's tokens to a caller's usage counters."""
+        if usage is None:
+            return
+        for name, value in (
+            ("calls", 1),
+            ("cached_calls", int(cached)),
+            ("input_tokens", input_tokens),
+            ("cached_input_tokens", cached_input_tokens),
+            ("output_tokens", output_tokens),
+        ):
+            usage[name] = usage.get(name, 0) + value
+
+    def _clip_to_window(
+        self,
+        highlights: List[Dict[str, Any]],
+        window: TranscriptWindow,
+        segments: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Clamp highlights to the segments of the window they came from.
+        
+        Highlights outside the window are dropped; the rest get the start
+        and end times of their first and last segments.
+        """
+        clipped = []
+        for h in highlights:
+            start = max(h['start_segment'], window.first_segment)
+            end = min(h['end_segment'], window.last_segment)
+            if end >= start:
+                clipped.append({
+                    **h,
+                    'start_segment': start,
+                    'end_segment': end,
+                    'start_s': segments[start]['start_s'],
+                    'end_s': segments[end]['end_s'],
+                })
+        return clipped
 
     def _parse_highlights(self, highlights: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -176,44 +604,22 @@ highlight moments. Return your response as a JSON array with the following struc
             highlights: Raw highlight data from LLM
             
         Returns:
-            Validated and formatted highlights
+            Highlights with start_segment, end_segment and description
         """
         parsed = []
         
         for h in highlights:
             try:
-                # Convert time strings to seconds
-                start_s = self._time_to_seconds(h.get('start_time', '00:00:00'))
-                end_s = self._time_to_seconds(h.get('end_time', '00:00:00'))
-                
-                parsed.append({
-                    'start_s': start_s,
-                    'end_s': end_s,
-                    'transcript': h.get('transcript', h.get('description', '')),
-                    'description': h.get('description', ''),
-                })
-            except (ValueError, KeyError):
+                start = int(h['start_segment'])
+                end = int(h.get('end_segment', start))
+            except (TypeError, ValueError, KeyError):
                 continue
+            if start < 0 or end < start:
+                continue
+            parsed.append({
+                'start_segment': start,
+                'end_segment': end,
+                'description': h.get('description', ''),
+            })
         
         return parsed
-
-    def _time_to_seconds(self, time_str: str) -> float:
-        """
-        Convert time string (HH:MM:SS or MM:SS) to seconds.
-        
-        Args:
-            time_str: Time string
-            
-        Returns:
-            Time in seconds
-        """
-        parts = time_str.split(':')
-        if len(parts) == 3:
-            h, m, s = parts
-            return int(h) * 3600 + int(m) * 60 + float(s)
-        elif len(parts) == 2:
-            m, s = parts
-            return int(m) * 60 + float(s)
-        else:
-            return float(parts[0])
-
@@ -0,0 +1,274 @@
+"""Local media cache with a disk quota and LRU eviction."""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+MEDIA_KINDS = ("audio", "pcm", "video", "clip")
+
+
+class MediaStore:
+    """
+    Media files keyed by YouTube video ID or content hash.
+
+    Files live under ``<root>/<kind>/`` and are indexed in a SQLite file
+    shared by the API and worker processes on the host. When the total size
+    exceeds the quota, the least recently used files are deleted, except
+    those pinned by an in-flight job. Pins expire after
+    ``MEDIA_PIN_TTL_SECONDS`` so a crashed worker cannot pin a file forever.
+    """
+
+    def __init__(self, root: Optional[str] = None, quota_bytes: Optional[int] = None):
+        """
+        Initialize media store.
+
+        Args:
+            root: Directory holding the media files and the index
+            quota_bytes: Maximum total size of stored media
+        """
+        self.root = Path(root or settings.MEDIA_STORE_DIR)
+        self.quota_bytes = quota_bytes or int(settings.MEDIA_STORE_QUOTA_GB * 1024 ** 3)
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._ready:
+            self._init_db()
+        conn = sqlite3.connect(self.root / "media.sqlite3", timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.root / "media.sqlite3", timeout=30, isolation_level=None)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS media (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    last_access REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS media_pins (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    pinned_at REAL NOT NULL,
+                    PRIMARY KEY (kind, key, owner)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_media_lru ON media(last_access)")
+        finally:
+            conn.close()
+        self._ready = True
+
+    def path_for(self, kind: str, key: str, ext: str) -> Path:
+        """
+        Get the path a new file should be written to before ``put``.
+
+        Args:
+            kind: Media kind (audio, pcm, video, clip)
+            key: Video ID or content hash
+            ext: File extension without the dot
+        """
+        if kind not in MEDIA_KINDS:
+            raise ValueError(f"Unknown media kind: {kind}")
+        directory = self.root / kind
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / f"{key}.{ext}"
+
+    def get(self, kind: str, key: str) -> Optional[str]:
+        """
+        Get a stored file's path, marking it as recently used.
+
+        Returns:
+            The path, or None if not stored (or deleted behind our back)
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path FROM media WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(row["path"]):
+                conn.execute("DELETE FROM media WHERE kind = ? AND key = ?", (kind, key))
+                return None
+            conn.execute(
+                "UPDATE media SET hits = hits + 1, last_access = ? WHERE kind = ? AND key = ?",
+                (time.time(), kind, key),
+            )
+            return row["path"]
+
+    def put(self, kind: str, key: str, path: str) -> str:
+        """
+        Register a file written to ``path_for`` (or anywhere under the root).
+
+        Evicts least recently used files if the store is over quota.
+
+        Returns:
+            The file's path
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO media (kind, key, path, size_bytes, last_access, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, key) DO UPDATE SET path = excluded.path, "
+                "size_bytes = excluded.size_bytes, last_access = excluded.last_access",
+                (kind, key, str(path), os.path.getsize(path), now, now),
+            )
+        self.evict(keep=(kind, key))
+        return str(path)
+
+    def put_file(self, kind: str, source: str, ext: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Move a file into the store under its content hash.
+
+        Identical content is stored once; a duplicate source is deleted.
+
+        Args:
+            kind: Media kind
+            source: File to move into the store
+            ext: Extension to store it with; defaults to the source's
+
+        Returns:
+            The content key (SHA-256) and the stored path
+        """
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        key = digest.hexdigest()
+
+        existing = self.get(kind, key)
+        if existing:
+            os.remove(source)
+            return key, existing
+
+        target = self.path_for(kind, key, ext or Path(source).suffix.lstrip(".") or "bin")
+        shutil.move(source, target)
+        return key, self.put(kind, key, str(target))
+
+    def pin(self, kind: str, key: str, owner: str) -> None:
+        """Protect a file from eviction while ``owner`` (e.g. a job) uses it."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO media_pins (kind, key, owner, pinned_at) VALUES (?, ?, ?, ?)",
+                (kind, key, owner, time.time()),
+            )
+
+    def unpin(self, kind: str, key: str, owner: str) -> None:
+        """Release a pin taken with ``pin``."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM media_pins WHERE kind = ? AND key = ? AND owner = ?",
+                (kind, key, owner),
+            )
+
+    @contextmanager
+    def pinned(self, items: List[Tuple[str, str]], owner: str) -> Iterator[None]:
+        """Pin several ``(kind, key)`` files for the duration of a block."""
+        for kind, key in items:
+            self.pin(kind, key, owner)
+        try:
+            yield
+        finally:
+            for kind, key in items:
+                self.unpin(kind, key, owner)
+
+    def evict(self, keep: Optional[Tuple[str, str]] = None) -> List[str]:
+        """
+        Delete least recently used, unpinned files until under quota.
+
+        Args:
+            keep: A ``(kind, key)`` never to evict, e.g. the file just added
+
+        Returns:
+            Paths of the deleted files
+        """
+        removed: List[str] = []
+        pin_cutoff = time.time() - settings.MEDIA_PIN_TTL_SECONDS
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM media_pins WHERE pinned_at < ?", (pin_cutoff,))
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM media").fetchone()[0]
+            if total > self.quota_bytes:
+                candidates = conn.execute(
+                    "SELECT kind, key, path, size_bytes FROM media m WHERE NOT EXISTS ("
+                    "SELECT 1 FROM media_pins p WHERE p.kind = m.kind AND p.key = m.key"
+                    ") ORDER BY last_access"
+                ).fetchall()
+                for row in candidates:
+                    if total <= self.quota_bytes:
+                        break
+                    if (row["kind"], row["key"]) == keep:
+                        continue
+                    try:
+                        os.remove(row["path"])
+                    except OSError:
+                        pass
+                    conn.execute(
+                        "DELETE FROM media WHERE kind = ? AND key = ?", (row["kind"], row["key"])
+                    )
+                    total -= row["size_bytes"]
+                    removed.append(row["path"])
+            conn.execute("COMMIT")
+
+        for path in removed:
+            print(f"🧹 Evicted {path}")
+        return removed
+
+    def delete(self, kind: str, key: str) -> None:
+        """Remove a file from the store."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path FROM media WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            conn.execute("DELETE FROM media WHERE kind = ? AND key = ?", (kind, key))
+        if row:
+            try:
+                os.remove(row["path"])
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Disk usage against the quota, per kind, with pin and hit counts."""
+        pin_cutoff = time.time() - settings.MEDIA_PIN_TTL_SECONDS
+        with self._connect() as conn:
+            kinds = conn.execute(
+                "SELECT kind, COUNT(*) AS files, COALESCE(SUM(size_bytes), 0) AS size_bytes, "
+                "COALESCE(SUM(hits), 0) AS hits FROM media GROUP BY kind ORDER BY kind"
+            ).fetchall()
+            pinned = conn.execute(
+                "SELECT COUNT(DISTINCT kind || '/' || key) FROM media_pins WHERE pinned_at >= ?",
+                (pin_cutoff,),
+            ).fetchone()[0]
+        used = sum(row["size_bytes"] for row in kinds)
+        return {
+            "quota_bytes": self.quota_bytes,
+            "used_bytes": used,
+            "files": sum(row["files"] for row in kinds),
+            "pinned_files": pinned,
+            "kinds": [dict(row) for row in kinds],
+        }
+
+
+# Shared instance; the index is created on first use
+media_store = MediaStore()
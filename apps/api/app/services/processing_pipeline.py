@@ -0,0 +1,381 @@
+"""Stage-checkpointed episode processing pipeline."""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.database import supabase
+from app.services.fingerprint_service import fingerprint_wav
+from app.services.media_store import media_store
+from app.services.youtube_service import episode_media_key
+
+if TYPE_CHECKING:
+    from app.services.episode_service import EpisodeService
+
+# Overall progress reached at the end of each stage
+STAGE_PROGRESS = {
+    "download": 10,
+    "decode": 12,
+    "fingerprint": 13,
+    "transcribe": 80,
+    "diarize": 80,
+    "merge_speakers": 85,
+    "persist": 95,
+    "detect_highlights": 100,
+}
+
+
+@dataclass
+class Stage:
+    """A node of the processing DAG."""
+
+    name: str
+    depends_on: List[str]
+    checkpointed: bool = True
+
+
+# download -> decode -> fingerprint -> (transcribe || diarize) -> merge_speakers -> persist
+# -> detect_highlights
+STAGES: List[Stage] = [
+    Stage("download", []),
+    Stage("decode", ["download"]),
+    # Finds a processed episode with the same audio; the following stages
+    # are no-ops when its results were copied
+    Stage("fingerprint", ["decode"]),
+    Stage("transcribe", ["fingerprint"]),
+    Stage("diarize", ["fingerprint"]),
+    Stage("merge_speakers", ["transcribe", "diarize"]),
+    Stage("persist", ["merge_speakers"]),
+    # Re-runs whenever prompts are given, so it never resumes from a checkpoint
+    Stage("detect_highlights", ["persist"], checkpointed=False),
+]
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+
+class ProcessingPipeline:
+    """
+    Runs the episode processing DAG with per-stage checkpoints.
+
+    Each stage writes its output under ``PIPELINE_WORK_DIR/<episode_id>/``
+    and is recorded in ``episodes.completed_stages``. A stage is skipped when
+    both the record and its checkpoint exist, so a crash or redeploy resumes
+    from the last completed stage. Transcription also checkpoints every
+    chunk, so it resumes mid-episode.
+    """
+
+    def __init__(self, episode_service: "EpisodeService"):
+        """
+        Initialize pipeline.
+
+        Args:
+            episode_service: Service providing persistence and the ML services
+        """
+        self.episodes = episode_service
+        self.work_root = Path(settings.PIPELINE_WORK_DIR)
+        self._runners: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+            "download": self._download,
+            "decode": self._decode,
+            "fingerprint": self._fingerprint,
+            "transcribe": self._transcribe,
+            "diarize": self._diarize,
+            "merge_speakers": self._merge_speakers,
+            "persist": self._persist,
+            "detect_highlights": self._detect_highlights,
+        }
+
+    def work_dir(self, episode_id: str) -> Path:
+        """Get the checkpoint directory for an episode."""
+        return self.work_root / episode_id
+
+    def _checkpoint_path(self, episode_id: str, stage: str) -> Path:
+        return self.work_dir(episode_id) / f"{stage}.json"
+
+    def _write_checkpoint(self, episode_id: str, stage: str, data: Dict[str, Any]) -> None:
+        """Write a checkpoint atomically so a crash never leaves a partial file."""
+        path = self._checkpoint_path(episode_id, stage)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, path)
+
+    def _read_checkpoint(self, episode_id: str, stage: str) -> Optional[Dict[str, Any]]:
+        path = self._checkpoint_path(episode_id, stage)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    async def run(
+        self,
+        episode_id: str,
+        until: Optional[str] = None,
+        prompt_ids: Optional[List[str]] = None,
+        restart: bool = False,
+    ) -> None:
+        """
+        Run the pipeline, resuming after the last completed stage.
+
+        Args:
+            episode_id: Episode to process
+            until: Last stage to run (inclusive); runs everything by default
+            prompt_ids: Prompts for the detect_highlights stage; it is
+                skipped when not given
+            restart: Discard checkpoints and start over
+        """
+        episode = await self.episodes.get_episode(episode_id)
+        if not episode:
+            raise ValueError(f"Episode not found: {episode_id}")
+
+        if restart:
+            shutil.rmtree(self.work_dir(episode_id), ignore_errors=True)
+            episode["completed_stages"] = []
+            await self.episodes.update_episode(episode_id, {"completed_stages": []})
+
+        completed = set(episode.get("completed_stages") or [])
+        ctx: Dict[str, Any] = {"episode": episode, "prompt_ids": prompt_ids}
+        last = STAGE_NAMES.index(until) if until else len(STAGES) - 1
+
+        # Keep this episode's media from being evicted while stages use it
+        key = episode_media_key(episode)
+        owner = f"pipeline:{episode_id}:{os.getpid()}"
+        with media_store.pinned([("audio", key), ("pcm", key)], owner):
+            # Walk the DAG in waves: every stage whose dependencies are satisfied runs concurrently
+            pending = list(STAGES[:last + 1])
+            while pending:
+                ready = [s for s in pending if all(dep in ctx for dep in s.depends_on)]
+                pending = [s for s in pending if s not in ready]
+                results = await asyncio.gather(
+                    *(self._run_stage(stage, ctx, completed) for stage in ready)
+                )
+                for stage, result in zip(ready, results):
+                    ctx[stage.name] = result
+
+    async def _run_stage(
+        self, stage: Stage, ctx: Dict[str, Any], completed: set
+    ) -> Dict[str, Any]:
+        episode_id = ctx["episode"]["id"]
+        if stage.checkpointed and stage.name in completed:
+            checkpoint = self._read_checkpoint(episode_id, stage.name)
+            # Media a checkpoint points to may have been evicted since
+            if checkpoint is not None and all(
+                os.path.exists(value) for name, value in checkpoint.items() if name.endswith("path")
+            ):
+                return checkpoint
+
+        print(f"▶️ Episode {episode_id}: stage {stage.name}")
+        result = await self._runners[stage.name](ctx)
+
+        if stage.checkpointed:
+            self._write_checkpoint(episode_id, stage.name, result)
+            completed.add(stage.name)
+            await self.episodes.update_episode(episode_id, {
+                "completed_stages": [s for s in STAGE_NAMES if s in completed],
+            })
+        return result
+
+    async def _download(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        episode = ctx["episode"]
+        source_type = episode.get("source_type") or "youtube"
+        if source_type != "youtube":
+            # Uploaded and server-local files are used where they are
+            path = episode.get("source_path")
+            if not path or not os.path.exists(path):
+                raise FileNotFoundError(f"Source file for episode {episode['id']} is missing: {path}")
+            return {"path": path}
+
+        await self.episodes._set_progress(episode["id"], "downloading", 0, status="processing")
+        youtube = self.episodes.youtube_service
+
+        if settings.AUDIO_INGEST_MODE == "stream":
+            # Decode while downloading; the decode stage then reuses the WAV
+            return await asyncio.to_thread(
+                youtube.stream_audio, episode["youtube_url"], episode["id"]
+            )
+
+        path = await asyncio.to_thread(
+            youtube.download_audio, episode["youtube_url"], episode["id"]
+        )
+        return {"path": path}
+
+    async def _decode(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """Decode to 16 kHz mono PCM, the format both models consume."""
+        episode = ctx["episode"]
+        wav_path = ctx["download"].get("wav_path")
+        if wav_path and os.path.exists(wav_path):
+            return {"path": wav_path}
+
+        key = episode_media_key(episode)
+        cached = media_store.get("pcm", key)
+        if cached:
+            return {"path": cached}
+
+        await self.episodes._set_progress(
+            episode["id"], "decoding", STAGE_PROGRESS["download"], status="processing"
+        )
+        output = media_store.path_for("pcm", key, "wav")
+        tmp = output.with_suffix(".tmp.wav")
+        await asyncio.to_thread(subprocess.run, [
+            "ffmpeg", "-y", "-loglevel", "error", "-i", ctx["download"]["path"],
+            "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", str(tmp),
+        ], check=True)
+        os.replace(tmp, output)
+        return {"path": media_store.put("pcm", key, str(output))}
+
+    async def _fingerprint(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fingerprint the audio and reuse a processed episode with the same recording.
+
+        On a match, its segments, speakers and word timings are copied
+        (shifted by the detected offset) and the transcription, diarization
+        and persist stages are skipped.
+        """
+        episode_id = ctx["episode"]["id"]
+        await self.episodes._set_progress(
+            episode_id, "fingerprinting", STAGE_PROGRESS["decode"], status="processing"
+        )
+        fingerprints = self.episodes.fingerprint_service
+        fingerprint = await asyncio.to_thread(fingerprint_wav, ctx["decode"]["path"])
+        await asyncio.to_thread(fingerprints.save, episode_id, fingerprint)
+
+        match = await asyncio.to_thread(fingerprints.find_match, episode_id, fingerprint)
+        if match is None:
+            return {"reused_from": None}
+
+        await self.episodes.copy_processed_episode(
+            match["episode_id"], episode_id, match["offset_s"]
+        )
+        return {"reused_from": match["episode_id"], "offset_s": match["offset_s"]}
+
+    @staticmethod
+    def _reused(ctx: Dict[str, Any]) -> bool:
+        return bool(ctx.get("fingerprint", {}).get("reused_from"))
+
+    async def _transcribe(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Transcribe progressively, persisting and checkpointing every chunk.
+
+        On resume, chunks with a checkpoint are reused and any segments a
+        crashed chunk had already inserted are deleted before it re-runs.
+        """
+        if self._reused(ctx):
+            return {"segments": [], "raw_segments": []}
+        episode_id = ctx["episode"]["id"]
+        chunk_s = settings.TRANSCRIPTION_CHUNK_SECONDS
+        chunk_dir = self.work_dir(episode_id) / "transcribe"
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+
+        done = sorted(chunk_dir.glob("chunk_*.json"))
+        # Only a contiguous run of chunks from the start can be trusted
+        done = [p for i, p in enumerate(done) if p.name == f"chunk_{i:05d}.json"]
+        start_chunk = len(done)
+        if start_chunk == 0:
+            supabase.table("segments").delete().eq("episode_id", episode_id).execute()
+            supabase.table("speakers").delete().eq("episode_id", episode_id).execute()
+        else:
+            (
+                supabase.table("segments").delete()
+                .eq("episode_id", episode_id)
+                .gte("start_s", start_chunk * chunk_s)
+                .execute()
+            )
+
+        await self.episodes._set_progress(
+            episode_id, "transcribing", STAGE_PROGRESS["fingerprint"], status="processing"
+        )
+        chunks = self.episodes.transcription_service.transcribe_chunks(
+            ctx["decode"]["path"], chunk_s=chunk_s, start_chunk=start_chunk
+        )
+        span = STAGE_PROGRESS["transcribe"] - STAGE_PROGRESS["fingerprint"]
+        while True:
+            # Run the blocking model call off the event loop
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+
+            rows = [
+                {"episode_id": episode_id, **segment}
+                for segment in self.episodes.transcription_service.format_segments(chunk)
+            ]
+            persisted = await self.episodes._insert_segments(rows)
+            path = chunk_dir / f"chunk_{chunk['index']:05d}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"segments": persisted, "raw": chunk["segments"]}))
+            os.replace(tmp, path)
+
+            await self.episodes._set_progress(
+                episode_id,
+                "transcribing",
+                STAGE_PROGRESS["fingerprint"] + int(span * chunk["progress"]),
+            )
+            print(f"📝 Episode {episode_id}: chunk {chunk['index']} persisted "
+                  f"({len(persisted)} segments)")
+
+        segments: List[Dict[str, Any]] = []
+        raw_segments: List[Dict[str, Any]] = []
+        for path in sorted(chunk_dir.glob("chunk_*.json")):
+            data = json.loads(path.read_text())
+            segments.extend(data["segments"])
+            raw_segments.extend(data["raw"])
+        return {"segments": segments, "raw_segments": raw_segments}
+
+    async def _diarize(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        if self._reused(ctx):
+            return {"speakers": []}
+        diarization = await asyncio.to_thread(
+            self.episodes.diarization_service.diarize, ctx["decode"]["path"]
+        )
+        return diarization
+
+    async def _merge_speakers(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        if self._reused(ctx):
+            return {"assignments": []}
+        episode_id = ctx["episode"]["id"]
+        await self.episodes._set_progress(
+            episode_id, "merging speakers", STAGE_PROGRESS["transcribe"]
+        )
+        assigned = self.episodes.diarization_service.assign_speakers_to_segments(
+            ctx["transcribe"]["segments"], ctx["diarize"]
+        )
+        return {
+            "assignments": [
+                {"segment_id": segment["id"], "speakers": segment["speakers"]}
+                for segment in assigned
+            ]
+        }
+
+    async def _persist(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        if self._reused(ctx):
+            return {"reused_from": ctx["fingerprint"]["reused_from"]}
+        episode_id = ctx["episode"]["id"]
+        await self.episodes._set_progress(
+            episode_id, "persisting", STAGE_PROGRESS["merge_speakers"]
+        )
+        transcription = self.episodes.transcription_service
+
+        words = transcription.format_words({"segments": ctx["transcribe"]["raw_segments"]})
+        await asyncio.to_thread(self.episodes.word_timing_service.save, episode_id, words)
+
+        # Idempotent on resume: speakers (and their segment links) are recreated
+        supabase.table("speakers").delete().eq("episode_id", episode_id).execute()
+        await self.episodes._persist_speakers(
+            episode_id, ctx["diarize"], ctx["merge_speakers"]["assignments"]
+        )
+
+        segments = ctx["transcribe"]["segments"]
+        await self.episodes.update_episode(episode_id, {
+            "full_transcript": transcription.get_full_transcript(segments),
+            "status": "completed",
+            "processing_stage": None,
+            "progress_percent": 100,
+        })
+        print(f"✅ Episode {episode_id} processed: {len(segments)} segments")
+        return {"segment_count": len(segments)}
+
+    async def _detect_highlights(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        if ctx["prompt_ids"]:
+            await self.episodes.detect_highlights(ctx["episode"]["id"], ctx["prompt_ids"])
+        return {}
@@ -0,0 +1,176 @@
+"""Fan-out of episode processing events to streaming clients."""
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.database import supabase
+
+PRUNE_INTERVAL_SECONDS = 3600
+MAX_POLL_BACKOFF_SECONDS = 30
+# IDs are assigned on insert but rows become visible on commit, so a row
+# can appear after rows with higher IDs. Each poll re-reads this many IDs
+# below the cursor; it is kept below the fetch limit so a poll always has
+# room for new rows.
+REORDER_WINDOW_IDS = 200
+FETCH_LIMIT = 500
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Format an event row as a Server-Sent Events message."""
+    lines = []
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'], default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class ProgressBroker:
+    """
+    Tails ``episode_events`` and fans new rows out to subscribers.
+
+    Events are written by database triggers, so they reach the API from
+    any worker process. One poller runs per watched episode however many
+    clients are subscribed, and stops when the last one leaves, so open
+    dashboards cost one cheap indexed query per episode per interval.
+    """
+
+    def __init__(self, poll_interval: Optional[float] = None):
+        """
+        Initialize broker.
+
+        Args:
+            poll_interval: Seconds between queries for new events
+        """
+        self.poll_interval = poll_interval or settings.EVENTS_POLL_INTERVAL_SECONDS
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._last_prune = 0.0
+
+    def _fetch(self, episode_id: str, after_id: int, limit: int = FETCH_LIMIT) -> List[Dict[str, Any]]:
+        result = (
+            supabase.table("episode_events")
+            .select("*")
+            .eq("episode_id", episode_id)
+            .gt("id", after_id)
+            .order("id")
+            .limit(limit)
+            .execute()
+        )
+        return result.data
+
+    def _latest_id(self, episode_id: str) -> int:
+        result = (
+            supabase.table("episode_events")
+            .select("id")
+            .eq("episode_id", episode_id)
+            .order("id", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return result.data[0]["id"] if result.data else 0
+
+    async def _poll(self, episode_id: str, cursor: int) -> None:
+        """
+        Query new events for an episode and fan them out until nobody listens.
+
+        Rows that commit out of ID order are caught by re-reading the last
+        ``REORDER_WINDOW_IDS`` IDs and skipping those already delivered. A
+        failed query is retried with backoff rather than ending the stream.
+        """
+        start = cursor
+        delivered: Set[int] = set()
+        failures = 0
+        try:
+            while self._subscribers.get(episode_id):
+                after = max(start, cursor - REORDER_WINDOW_IDS)
+                try:
+                    events = await asyncio.to_thread(self._fetch, episode_id, after)
+                except Exception as e:
+                    failures += 1
+                    delay = min(self.poll_interval * 2 ** failures, MAX_POLL_BACKOFF_SECONDS)
+                    print(f"⚠️ Could not fetch events of episode {episode_id}: {e}; "
+                          f"retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                failures = 0
+                for event in events:
+                    if event["id"] in delivered:
+                        continue
+                    delivered.add(event["id"])
+                    cursor = max(cursor, event["id"])
+                    for queue in list(self._subscribers.get(episode_id, ())):
+                        queue.put_nowait(event)
+                delivered = {i for i in delivered if i > cursor - REORDER_WINDOW_IDS}
+                await self._maybe_prune()
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            # A new subscriber may already have started a replacement poller
+            if self._pollers.get(episode_id) is asyncio.current_task():
+                del self._pollers[episode_id]
+
+    async def _maybe_prune(self) -> None:
+        if time.monotonic() - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = time.monotonic()
+        try:
+            await asyncio.to_thread(lambda: supabase.rpc("prune_episode_events", {}).execute())
+        except Exception as e:
+            print(f"⚠️ Could not prune episode events: {e}")
+
+    async def subscribe(
+        self,
+        episode_id: str,
+        last_event_id: Optional[int] = None,
+        heartbeat_s: Optional[float] = None,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Stream an episode's events as they are published.
+
+        Args:
+            episode_id: Episode to watch
+            last_event_id: Replay events after this ID first (SSE reconnects)
+            heartbeat_s: Yield None after this many idle seconds, so the
+                caller can send a keep-alive
+
+        Yields:
+            Event rows (id, type, data), or None as an idle heartbeat
+        """
+        heartbeat_s = heartbeat_s or settings.EVENTS_HEARTBEAT_SECONDS
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(episode_id, set()).add(queue)
+        try:
+            if episode_id not in self._pollers:
+                cursor = await asyncio.to_thread(self._latest_id, episode_id)
+                if episode_id not in self._pollers:
+                    self._pollers[episode_id] = asyncio.create_task(self._poll(episode_id, cursor))
+
+            replayed: Set[int] = set()
+            if last_event_id is not None:
+                for event in await asyncio.to_thread(self._fetch, episode_id, last_event_id):
+                    replayed.add(event["id"])
+                    yield event
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat_s)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] not in replayed:
+                    yield event
+        finally:
+            subscribers = self._subscribers.get(episode_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[episode_id]
+                    poller = self._pollers.pop(episode_id, None)
+                    if poller is not None:
+                        poller.cancel()
+
+
+# Shared by every request in the API process
+progress_broker = ProgressBroker()
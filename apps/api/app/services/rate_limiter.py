@@ -0,0 +1,206 @@
+"""Request and token rate limits for LLM provider calls."""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429}
+
+
+class TokenBucket:
+    """
+    Continuously refilling budget of units per minute.
+
+    ``acquire`` waits until enough units are available. Debt is allowed:
+    when a call turns out to use more than it reserved, later callers wait
+    for the difference.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize bucket.
+
+        Args:
+            per_minute: Units refilled per minute; also the burst capacity
+            clock: Monotonic time source, injectable for tests
+        """
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.clock = clock
+        self.available = self.capacity
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Take ``amount`` units, waiting for the bucket to refill if needed.
+
+        Requests larger than the capacity wait for a full bucket and then
+        go into debt, so they are never starved.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        # One waiter at a time keeps the order fair (FIFO on the lock)
+        async with self._lock:
+            while True:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self.available >= needed:
+                    self.available -= amount
+                    return waited
+                delay = (needed - self.available) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def refund(self, amount: float) -> None:
+        """Return unused units (or take more, if negative) after a call settles."""
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimiter:
+    """
+    Shared limits for LLM calls, per provider and model.
+
+    Each ``provider:model`` pair gets a requests-per-minute and a
+    tokens-per-minute bucket (``LLM_RATE_LIMITS``, falling back to
+    ``LLM_DEFAULT_RPM``/``LLM_DEFAULT_TPM``), and each provider a cap on
+    calls in flight. Limits apply per process, so with several workers the
+    configured limits should be the provider's divided by the worker count.
+    """
+
+    def __init__(self):
+        """Initialize limiter; buckets are created on first use."""
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _limits(self, provider: str, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        key = f"{provider}:{model}"
+        if key not in self._buckets:
+            limits = settings.LLM_RATE_LIMITS.get(key) or settings.LLM_RATE_LIMITS.get(provider) or {}
+            self._buckets[key] = (
+                TokenBucket(limits.get("rpm", settings.LLM_DEFAULT_RPM)),
+                TokenBucket(limits.get("tpm", settings.LLM_DEFAULT_TPM)),
+            )
+        return self._buckets[key]
+
+    def _slot(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._slots:
+            self._slots[provider] = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        return self._slots[provider]
+
+    async def call(
+        self,
+        provider: str,
+        model: str,
+        reserve_tokens: int,
+        request: Callable[[], Awaitable[T]],
+        usage: Callable[[T], Optional[int]] = lambda response: None,
+        stats: Optional[Dict[str, float]] = None,
+        retryable: Optional[Callable[[Exception], bool]] = None,
+    ) -> T:
+        """
+        Make a provider call within its limits, retrying transient failures.
+
+        Args:
+            provider: Provider name
+            model: Model name
+            reserve_tokens: Estimated input plus maximum output tokens
+            request: Makes the call, including reading a streamed
+                response, so the call holds its slot until it is done;
+                invoked again on each retry
+            usage: Gets the tokens a response actually used, to settle the
+                reservation; for streams, use ``settle`` instead
+            stats: Filled in with the retries made and the seconds spent
+                waiting for the limits (retries, wait_s)
+            retryable: Whether a failure may be retried, ``is_retryable``
+                by default
+
+        Returns:
+            The provider's response
+        """
+        requests, tokens = self._limits(provider, model)
+        stats = stats if stats is not None else {}
+        stats.update(retries=0, wait_s=0.0)
+        attempt = 0
+        while True:
+            stats["wait_s"] += await requests.acquire(1)
+            stats["wait_s"] += await tokens.acquire(reserve_tokens)
+            try:
+                async with self._slot(provider):
+                    response = await request()
+            except Exception as e:
+                # A failed call may not have consumed its tokens; keep the
+                # reservation anyway so a 429 slows everyone down
+                if attempt >= settings.LLM_MAX_RETRIES or not (retryable or is_retryable)(e):
+                    raise
+                delay = backoff_delay(attempt, retry_after(e))
+                attempt += 1
+                stats["retries"] = attempt
+                print(f"⏳ {provider}:{model} call failed ({e.__class__.__name__}), "
+                      f"retry {attempt}/{settings.LLM_MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            used = usage(response)
+            if used is not None:
+                tokens.refund(reserve_tokens - used)
+            return response
+
+    def settle(self, provider: str, model: str, reserve_tokens: int, used_tokens: int) -> None:
+        """
+        Settle a reservation once a streamed response reports its usage.
+
+        A stream's usage arrives with its last event rather than as part
+        of a response, so its callers settle the token reservation once
+        ``call`` returns.
+        """
+        _, tokens = self._limits(provider, model)
+        tokens.refund(reserve_tokens - used_tokens)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a provider error is transient: connection, 408/409/429 or 5xx."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES or status >= 500
+    # Connection errors and timeouts of both SDKs carry no status
+    return error.__class__.__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Get the server's Retry-After delay from an error's response, if any."""
+    response: Any = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, server_delay: Optional[float] = None) -> float:
+    """
+    Full-jitter exponential backoff, never shorter than the server asked.
+
+    Random delays spread the retries of many concurrent calls that failed
+    together instead of having them collide again.
+    """
+    ceiling = min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+    delay = random.uniform(0, ceiling)
+    return max(delay, server_delay or 0.0)
+
+
+# Shared by every LLMService in the process
+rate_limiter = RateLimiter()
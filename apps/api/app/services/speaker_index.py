@@ -0,0 +1,172 @@
+"""Cross-episode speaker identity index using voice embeddings."""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.database import supabase
+
+
+class SpeakerIndex:
+    """
+    In-memory nearest-neighbour index over known people's voice embeddings.
+
+    Rows are kept L2-normalized in a single matrix, so matching a speaker is
+    one matrix-vector product. The index is loaded lazily from the
+    ``known_speakers`` table, updated in place as speakers are confirmed, and
+    reloaded every ``SPEAKER_INDEX_TTL_SECONDS`` to pick up confirmations
+    made by other processes. Running means are updated in the database, in
+    one statement, so concurrent confirmations are not lost.
+    """
+
+    def __init__(self):
+        """Initialize an empty, not-yet-loaded index."""
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._counts: List[int] = []
+        self._means: Optional[np.ndarray] = None  # Raw running means
+        self._unit: Optional[np.ndarray] = None  # Normalized rows for search
+
+    def load(self) -> None:
+        """(Re)load all known speakers from the database."""
+        result = supabase.table("known_speakers").select("*").execute()
+        with self._lock:
+            self._ids = [row["id"] for row in result.data]
+            self._names = [row["name"] for row in result.data]
+            self._counts = [row["sample_count"] for row in result.data]
+            if result.data:
+                self._means = np.asarray([row["embedding"] for row in result.data], np.float32)
+                self._unit = self._normalize(self._means)
+            else:
+                self._means = None
+                self._unit = None
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > settings.SPEAKER_INDEX_TTL_SECONDS:
+            self.load()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def match_many(
+        self,
+        embeddings: List[List[float]],
+        threshold: Optional[float] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Find the closest known person for each embedding.
+
+        Args:
+            embeddings: Speaker embeddings to look up
+            threshold: Minimum cosine similarity to accept a match
+
+        Returns:
+            For each embedding, the matched known speaker (id, name,
+            similarity) or None
+        """
+        threshold = settings.SPEAKER_MATCH_THRESHOLD if threshold is None else threshold
+        self._ensure_loaded()
+
+        with self._lock:
+            if self._unit is None or not embeddings:
+                return [None] * len(embeddings)
+            queries = self._normalize(np.asarray(embeddings, np.float32))
+            similarity = queries @ self._unit.T
+            best = similarity.argmax(axis=1)
+
+            matches: List[Optional[Dict[str, Any]]] = []
+            for row, idx in zip(similarity, best):
+                if row[idx] >= threshold:
+                    matches.append({
+                        "id": self._ids[idx],
+                        "name": self._names[idx],
+                        "similarity": float(row[idx]),
+                    })
+                else:
+                    matches.append(None)
+            return matches
+
+    def match(
+        self, embedding: List[float], threshold: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Find the closest known person for a single embedding."""
+        return self.match_many([embedding], threshold)[0]
+
+    def get_name(self, known_speaker_id: str) -> Optional[str]:
+        """Get the name of a known speaker by ID."""
+        self._ensure_loaded()
+        with self._lock:
+            if known_speaker_id in self._ids:
+                return self._names[self._ids.index(known_speaker_id)]
+            return None
+
+    def confirm(self, name: str, embedding: List[float]) -> str:
+        """
+        Fold a confirmed speaker embedding into a person's entry.
+
+        Updates the running mean of an existing person, or adds a new one;
+        the database computes the mean, and the index takes the result.
+
+        Args:
+            name: Person's name as confirmed by a reviewer
+            embedding: The confirmed speaker's voice embedding
+
+        Returns:
+            ID of the known speaker row
+        """
+        self._ensure_loaded()
+        result = supabase.rpc("confirm_known_speaker", {
+            "p_name": name,
+            "p_embedding": [float(x) for x in embedding],
+        }).execute()
+        row = result.data[0]
+        mean = np.asarray(row["embedding"], np.float32)
+
+        with self._lock:
+            if row["id"] in self._ids:
+                idx = self._ids.index(row["id"])
+                self._means[idx] = mean
+                self._unit[idx] = self._normalize(mean)
+                self._counts[idx] = row["sample_count"]
+                return row["id"]
+
+            self._ids.append(row["id"])
+            self._names.append(row["name"])
+            self._counts.append(row["sample_count"])
+            if self._means is None:
+                self._means = mean[None, :]
+            else:
+                self._means = np.vstack([self._means, mean])
+            self._unit = self._normalize(self._means)
+            return row["id"]
+
+    def retract(self, known_speaker_id: str, embedding: List[float]) -> None:
+        """
+        Take a confirmed speaker embedding back out of a person's entry.
+
+        Used when a confirmed speaker is renamed, so the sample stops
+        counting for the earlier name. A person left with no samples is
+        removed. The index is reloaded on next use.
+
+        Args:
+            known_speaker_id: Known speaker the embedding was folded into
+            embedding: The speaker's voice embedding
+        """
+        supabase.rpc("retract_known_speaker", {
+            "p_id": known_speaker_id,
+            "p_embedding": [float(x) for x in embedding],
+        }).execute()
+        with self._lock:
+            self._loaded_at = None
+
+
+# Shared instance, loaded on first use
+speaker_index = SpeakerIndex()
@@ -2,6 +2,7 @@
 from typing import Any, Optional
 
 from app.services.database import supabase
+from app.services.speaker_index import speaker_index
 
 
 class SpeakerService:
@@ -18,15 +19,76 @@ class SpeakerService:
         )
         return result.data
 
+    async def create_speakers(
+        self, episode_id: str, diarization: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        """
+        Create speaker rows from a diarization result.
+
+        Speakers whose voice embedding matches a known person get their
+        mapped_name pre-filled from the speaker index.
+        """
+        speakers = diarization["speakers"]
+        if not speakers:
+            return []
+
+        with_embedding = [s for s in speakers if s.get("embedding")]
+        matches = speaker_index.match_many([s["embedding"] for s in with_embedding])
+        names = {
+            s["label"]: match["name"]
+            for s, match in zip(with_embedding, matches)
+            if match
+        }
+
+        rows = [
+            {
+                "episode_id": episode_id,
+                "speaker_label": s["label"],
+                "mapped_name": names.get(s["label"]),
+                "embedding": s.get("embedding"),
+            }
+            for s in speakers
+        ]
+        result = supabase.table("speakers").insert(rows).execute()
+        return result.data
+
     async def update_speaker(
         self, speaker_id: str, mapped_name: str
     ) -> Optional[dict[str, Any]]:
-        """Update speaker's mapped name."""
+        """
+        Update speaker's mapped name.
+
+        A named speaker with an embedding counts as a confirmation and is
+        folded into the cross-episode speaker index; renaming a confirmed
+        speaker moves its sample from the earlier name to the new one.
+        """
         result = (
             supabase.table("speakers")
             .update({"mapped_name": mapped_name})
             .eq("id", speaker_id)
             .execute()
         )
-        return result.data[0] if result.data else None
+        if not result.data:
+            return None
+
+        speaker = result.data[0]
+        embedding = speaker.get("embedding")
+        previous_id = speaker.get("known_speaker_id")
+        already_confirmed = previous_id and speaker_index.get_name(previous_id) == mapped_name
+        if embedding and not already_confirmed:
+            try:
+                known_id = None
+                if previous_id:
+                    # Renamed: the sample no longer counts for the earlier name
+                    speaker_index.retract(previous_id, embedding)
+                if mapped_name:
+                    known_id = speaker_index.confirm(mapped_name, embedding)
+                if previous_id != known_id:
+                    supabase.table("speakers").update(
+                        {"known_speaker_id": known_id}
+                    ).eq("id", speaker_id).execute()
+                    speaker["known_speaker_id"] = known_id
+            except Exception as e:
+                print(f"⚠️ Could not update speaker index for {speaker_id}: {e}")
 
+        return speaker
@@ -0,0 +1,168 @@
+"""Compact, token-budgeted transcript windows and merging of per-window highlights."""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Conservative for Portuguese and English with BPE tokenizers
+CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without a tokenizer."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def speaker_tags(segments: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Short tags (S0, S1, ...) for an episode's speakers, in order of appearance."""
+    tags: Dict[str, str] = {}
+    for segment in segments:
+        for speaker in segment.get("speakers") or []:
+            if speaker not in tags:
+                tags[speaker] = f"S{len(tags)}"
+    return tags
+
+
+def format_segment(index: int, segment: Dict[str, Any], tags: Dict[str, str]) -> str:
+    """Render one segment as a transcript line: its index, speaker tags and text."""
+    speakers = ",".join(tags[s] for s in segment.get("speakers") or [] if s in tags)
+    prefix = f"[{index}]"
+    if speakers:
+        prefix += f" {speakers}:"
+    return f"{prefix} {segment['text'].strip()}"
+
+
+@dataclass
+class CompactTranscript:
+    """
+    A transcript rendered for LLM input.
+
+    Each line starts with the segment's index in the episode, which is what
+    models answer with, and speakers are short tags explained by the legend.
+    Indices and tags take a fraction of the tokens of timestamps and names.
+    """
+
+    legend: str
+    lines: List[str]
+
+
+def render_transcript(segments: List[Dict[str, Any]]) -> CompactTranscript:
+    """Render every segment of an episode, in order."""
+    tags = speaker_tags(segments)
+    legend = ""
+    if tags:
+        legend = "Speakers: " + ", ".join(f"{tag}={name}" for name, tag in tags.items())
+    return CompactTranscript(
+        legend=legend,
+        lines=[format_segment(i, s, tags) for i, s in enumerate(segments)],
+    )
+
+
+@dataclass
+class TranscriptWindow:
+    """A run of consecutive segments that fits in one prompt."""
+
+    index: int
+    first_segment: int
+    last_segment: int
+    start_s: float
+    end_s: float
+    legend: str = ""
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join([self.legend, *self.lines] if self.legend else self.lines)
+
+
+def build_windows(
+    segments: List[Dict[str, Any]],
+    max_tokens: int,
+    overlap_tokens: int,
+    transcript: Optional[CompactTranscript] = None,
+) -> List[TranscriptWindow]:
+    """
+    Split a transcript into overlapping windows on segment boundaries.
+
+    Each window holds as many whole segments as fit in ``max_tokens``; the
+    next one starts far enough back to repeat about ``overlap_tokens`` of
+    the previous window, so a highlight spanning a boundary is seen whole
+    by at least one window. A segment longer than the budget gets a window
+    of its own. Every window carries the speaker legend.
+
+    Args:
+        segments: Segments ordered by start, with start_s, end_s and text
+        max_tokens: Transcript token budget per window
+        overlap_tokens: Tokens repeated between consecutive windows
+        transcript: The segments already rendered by ``render_transcript``
+
+    Returns:
+        Windows in transcript order
+    """
+    if transcript is None:
+        transcript = render_transcript(segments)
+    lines = transcript.lines
+    budget = max_tokens - estimate_tokens(transcript.legend)
+    # +1 for the newline joining lines
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    windows: List[TranscriptWindow] = []
+
+    start = 0
+    while start < len(segments):
+        end = start
+        used = 0
+        while end < len(segments) and (end == start or used + costs[end] <= budget):
+            used += costs[end]
+            end += 1
+
+        windows.append(TranscriptWindow(
+            index=len(windows),
+            first_segment=start,
+            last_segment=end - 1,
+            start_s=segments[start]["start_s"],
+            end_s=segments[end - 1]["end_s"],
+            legend=transcript.legend,
+            lines=lines[start:end],
+        ))
+        if end == len(segments):
+            break
+
+        # Step back over whole segments for the overlap, always moving forward
+        next_start = end
+        repeated = 0
+        while next_start - 1 > start and repeated + costs[next_start - 1] <= overlap_tokens:
+            next_start -= 1
+            repeated += costs[next_start]
+        start = next_start
+
+    return windows
+
+
+def temporal_iou(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Intersection over union of two highlights' time ranges."""
+    intersection = min(a["end_s"], b["end_s"]) - max(a["start_s"], b["start_s"])
+    if intersection <= 0:
+        return 0.0
+    union = max(a["end_s"], b["end_s"]) - min(a["start_s"], b["start_s"])
+    return intersection / union if union > 0 else 1.0
+
+
+def merge_highlights(
+    highlights: List[Dict[str, Any]], iou_threshold: float
+) -> List[Dict[str, Any]]:
+    """
+    De-duplicate highlights found by overlapping windows.
+
+    Highlights whose time ranges overlap by at least ``iou_threshold`` are
+    the same moment seen twice; the longer one (more context) is kept.
+
+    Returns:
+        Highlights ordered by start time
+    """
+    kept: List[Dict[str, Any]] = []
+    by_length = sorted(highlights, key=lambda h: h["end_s"] - h["start_s"], reverse=True)
+    for highlight in by_length:
+        if highlight["end_s"] <= highlight["start_s"]:
+            continue
+        if all(temporal_iou(highlight, other) < iou_threshold for other in kept):
+            kept.append(highlight)
+    return sorted(kept, key=lambda h: h["start_s"])
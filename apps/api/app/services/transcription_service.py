@@ -1,5 +1,7 @@
 """Transcription service using WhisperX."""
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any, Tuple
+
+from app.services.word_timing_service import WordTimings
 
 # Note: whisperx needs to be installed separately
 # pip install git+https://github.com/m-bain/whisperX.git
@@ -10,6 +12,8 @@ except ImportError:
     WHISPERX_AVAILABLE = False
     print("Warning: WhisperX not installed. Transcription will not work.")
 
+SAMPLE_RATE = 16000  # whisperx.load_audio resamples to 16 kHz mono
+
 
 class TranscriptionService:
     """Service for transcribing audio using WhisperX."""
@@ -25,6 +29,8 @@ class TranscriptionService:
         self.device = device
         self.compute_type = compute_type
         self.model = None
+        # Alignment model and metadata per language code
+        self.align_models: Dict[str, Tuple[Any, Any]] = {}
 
     def load_model(self, model_size: str = "base") -> None:
         """
@@ -79,24 +85,79 @@ class TranscriptionService:
         # Load audio
         audio = whisperx.load_audio(audio_path)
         
-        # Transcribe
+        # Transcribe and align whisper output
+        return self._transcribe_audio(audio)
+
+    def transcribe_chunks(
+        self, audio_path: str, chunk_s: float = 600.0, start_chunk: int = 0
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Transcribe audio file in fixed-length chunks, yielding as each finishes.
+        
+        Segment and word timestamps are shifted to episode time, so callers
+        can persist each chunk's segments as soon as it is yielded.
+        
+        Args:
+            audio_path: Path to audio file
+            chunk_s: Chunk length in seconds
+            start_chunk: Index of the first chunk to transcribe, to resume
+            
+        Yields:
+            Transcription result for one chunk, with its ``index`` and the
+            ``progress`` (0-1) of the whole file
+        """
+        if not WHISPERX_AVAILABLE:
+            if start_chunk == 0:
+                yield {**self.transcribe(audio_path), 'index': 0, 'progress': 1.0}
+            return
+        
+        if self.model is None:
+            self.load_model()
+        
+        audio = whisperx.load_audio(audio_path)
+        chunk_samples = int(chunk_s * SAMPLE_RATE)
+        
+        for index, offset in enumerate(range(0, len(audio), chunk_samples)):
+            if index < start_chunk:
+                continue
+            chunk = audio[offset:offset + chunk_samples]
+            result = self._transcribe_audio(chunk)
+            offset_s = offset / SAMPLE_RATE
+            
+            for segment in result['segments']:
+                segment['start'] += offset_s
+                segment['end'] += offset_s
+                for word in segment.get('words', []):
+                    if 'start' in word:
+                        word['start'] += offset_s
+                    if 'end' in word:
+                        word['end'] += offset_s
+            
+            result['index'] = index
+            result['progress'] = min(offset + chunk_samples, len(audio)) / len(audio)
+            yield result
+
+    def _transcribe_audio(self, audio: Any) -> Dict[str, Any]:
+        """Transcribe and align an in-memory 16 kHz mono waveform."""
         result = self.model.transcribe(audio, batch_size=16)
         
-        # Align whisper output
-        model_a, metadata = whisperx.load_align_model(
-            language_code=result["language"],
-            device=self.device
-        )
-        result = whisperx.align(
+        language = result["language"]
+        if language not in self.align_models:
+            self.align_models[language] = whisperx.load_align_model(
+                language_code=language,
+                device=self.device
+            )
+        align_model, align_metadata = self.align_models[language]
+        aligned = whisperx.align(
             result["segments"],
-            model_a,
-            metadata,
+            align_model,
+            align_metadata,
             audio,
             self.device,
             return_char_alignments=False
         )
-        
-        return result
+        aligned['language'] = language
+        return aligned
 
     def format_segments(self, transcription_result: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -118,6 +179,18 @@ class TranscriptionService:
             })
         return segments
 
+    def format_words(self, transcription_result: Dict[str, Any]) -> WordTimings:
+        """
+        Pack word-level alignment for storage.
+        
+        Args:
+            transcription_result: Raw (aligned) transcription result
+            
+        Returns:
+            Columnar word timings
+        """
+        return WordTimings.from_segments(transcription_result.get('segments', []))
+
     def get_full_transcript(self, segments: List[Dict[str, Any]]) -> str:
         """
         Combine all segments into full transcript.
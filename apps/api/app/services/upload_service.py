@@ -0,0 +1,330 @@
+"""Streaming file uploads and server-local files as episode sources."""
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import re
+import subprocess
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+MAX_FIELD_BYTES = 64 * 1024
+SWEEP_INTERVAL_SECONDS = 3600
+
+
+def probe_duration(path: str) -> float:
+    """Get a media file's duration in seconds with ffprobe, or 0 if unknown."""
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        return float(output)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return 0.0
+
+
+class UploadService:
+    """
+    Receives episode media files without holding them in memory.
+
+    Files arrive either as one streamed multipart request or as a resumable
+    session: the client declares the size, sends chunks at the offset the
+    server reports (``Upload-Offset``, as in tus) and can pick up after a
+    dropped connection. Finished files are kept under ``UPLOAD_DIR/files``
+    by content hash. They are originals, so unlike the media store they are
+    never evicted; unfinished sessions idle for ``UPLOAD_SESSION_TTL_HOURS``
+    are.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        Initialize upload service.
+
+        Args:
+            root: Directory for upload sessions and stored files
+        """
+        self.root = Path(root or settings.UPLOAD_DIR)
+        self.max_bytes = int(settings.UPLOAD_MAX_GB * 1024 ** 3)
+        self._last_sweep = 0.0
+
+    def _sessions_dir(self) -> Path:
+        directory = self.root / "sessions"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def _session_paths(self, upload_id: str) -> Tuple[Path, Path]:
+        if not UPLOAD_ID_RE.match(upload_id):
+            raise LookupError(f"Upload not found: {upload_id}")
+        directory = self._sessions_dir()
+        return directory / f"{upload_id}.json", directory / f"{upload_id}.part"
+
+    def create_session(self, filename: str, size_bytes: int) -> Dict[str, Any]:
+        """
+        Start a resumable upload.
+
+        Args:
+            filename: Original file name, used for the extension and title
+            size_bytes: Total size the client will send
+
+        Returns:
+            Session status with ``upload_id`` and ``offset``
+        """
+        if size_bytes <= 0 or size_bytes > self.max_bytes:
+            raise ValueError(f"Upload size must be between 1 byte and {settings.UPLOAD_MAX_GB} GB")
+        self._maybe_sweep()
+
+        upload_id = uuid.uuid4().hex
+        meta_path, part_path = self._session_paths(upload_id)
+        meta_path.write_text(json.dumps({"filename": os.path.basename(filename), "size_bytes": size_bytes}))
+        part_path.touch()
+        return self.get_session(upload_id)
+
+    def get_session(self, upload_id: str) -> Dict[str, Any]:
+        """Get a session's declared size and how many bytes were received."""
+        meta_path, part_path = self._session_paths(upload_id)
+        if not meta_path.exists():
+            raise LookupError(f"Upload not found: {upload_id}")
+        meta = json.loads(meta_path.read_text())
+        return {"upload_id": upload_id, **meta, "offset": part_path.stat().st_size}
+
+    async def append_chunk(
+        self, upload_id: str, offset: int, body: AsyncIterator[bytes]
+    ) -> Dict[str, Any]:
+        """
+        Append a chunk to a resumable upload.
+
+        Args:
+            upload_id: Session ID
+            offset: Byte offset the chunk starts at; must equal the bytes
+                already received
+            body: The chunk's bytes as they arrive
+
+        Returns:
+            Updated session status
+        """
+        session = self.get_session(upload_id)
+        _, part_path = self._session_paths(upload_id)
+        received = offset
+        with open(part_path, "ab") as f:
+            # One chunk at a time, across processes; the lock goes with the file
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ValueError("Another chunk of this upload is being received") from None
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise ValueError(f"Offset mismatch: upload is at byte {current}")
+            async for block in body:
+                received += len(block)
+                if received > session["size_bytes"]:
+                    # Drop the whole chunk so the client can resend it from ``offset``
+                    f.truncate(offset)
+                    raise ValueError("Chunk exceeds the declared upload size")
+                f.write(block)
+        return self.get_session(upload_id)
+
+    def complete_session(self, upload_id: str) -> Dict[str, Any]:
+        """
+        Finish a resumable upload and move the file into storage.
+
+        Returns:
+            Stored file ``path``, content ``key`` and original ``filename``
+        """
+        session = self.get_session(upload_id)
+        if session["offset"] != session["size_bytes"]:
+            raise ValueError(
+                f"Upload incomplete: {session['offset']} of {session['size_bytes']} bytes received"
+            )
+        meta_path, part_path = self._session_paths(upload_id)
+        stored = self._store(part_path, session["filename"])
+        meta_path.unlink()
+        return stored
+
+    def cancel_session(self, upload_id: str) -> None:
+        """Discard a resumable upload and its received bytes."""
+        meta_path, part_path = self._session_paths(upload_id)
+        if not meta_path.exists():
+            raise LookupError(f"Upload not found: {upload_id}")
+        meta_path.unlink()
+        part_path.unlink(missing_ok=True)
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = time.monotonic()
+        removed = self.sweep_sessions()
+        if removed:
+            print(f"🧹 Removed {removed} abandoned upload sessions")
+
+    def sweep_sessions(self) -> int:
+        """
+        Delete upload sessions idle for longer than ``UPLOAD_SESSION_TTL_HOURS``.
+
+        Covers resumable sessions and the partial files of interrupted
+        multipart uploads; a file still being written to is skipped.
+
+        Returns:
+            Number of sessions removed
+        """
+        cutoff = time.time() - settings.UPLOAD_SESSION_TTL_HOURS * 3600
+        removed = 0
+        for part_path in self._sessions_dir().glob("*.part"):
+            meta_path = part_path.with_suffix(".json")
+            try:
+                idle_since = max(
+                    path.stat().st_mtime for path in (part_path, meta_path) if path.exists()
+                )
+                if idle_since >= cutoff:
+                    continue
+                with open(part_path, "ab") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    meta_path.unlink(missing_ok=True)
+                    part_path.unlink()
+            except (BlockingIOError, FileNotFoundError):
+                continue
+            removed += 1
+        return removed
+
+    async def receive_multipart(
+        self, content_type: str, body: AsyncIterator[bytes]
+    ) -> Tuple[Dict[str, List[str]], Dict[str, Any]]:
+        """
+        Stream a multipart/form-data request with one file part to disk.
+
+        The body is parsed as it arrives, so only one network chunk is held
+        in memory however large the file is.
+
+        Args:
+            content_type: The request's Content-Type header
+            body: The request body as it arrives
+
+        Returns:
+            Form fields (values per name) and the stored file as returned
+            by ``complete_session``
+        """
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise ValueError("Expected a multipart/form-data body")
+
+        self._maybe_sweep()
+        fields: Dict[str, List[str]] = {}
+        part: Dict[str, Any] = {}
+        header_field = bytearray()
+        header_value = bytearray()
+        tmp_path = self._sessions_dir() / f"{uuid.uuid4().hex}.part"
+        upload: Dict[str, Any] = {}
+
+        def on_part_begin() -> None:
+            part.clear()
+            part.update(headers={}, data=bytearray(), file=None, size=0)
+
+        def on_header_field(data: bytes, start: int, end: int) -> None:
+            header_field.extend(data[start:end])
+
+        def on_header_value(data: bytes, start: int, end: int) -> None:
+            header_value.extend(data[start:end])
+
+        def on_header_end() -> None:
+            part["headers"][bytes(header_field).lower()] = bytes(header_value)
+            header_field.clear()
+            header_value.clear()
+
+        def on_headers_finished() -> None:
+            _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+            part["name"] = options.get(b"name", b"").decode()
+            if b"filename" in options:
+                if upload:
+                    raise ValueError("Only one file can be uploaded per request")
+                part["filename"] = os.path.basename(options[b"filename"].decode())
+                part["file"] = open(tmp_path, "wb")
+
+        def on_part_data(data: bytes, start: int, end: int) -> None:
+            if part["file"] is not None:
+                part["size"] += end - start
+                if part["size"] > self.max_bytes:
+                    raise ValueError(f"Upload exceeds {settings.UPLOAD_MAX_GB} GB")
+                part["file"].write(data[start:end])
+            else:
+                part["data"].extend(data[start:end])
+                if len(part["data"]) > MAX_FIELD_BYTES:
+                    raise ValueError(f"Form field too large: {part['name']}")
+
+        def on_part_end() -> None:
+            if part["file"] is not None:
+                part["file"].close()
+                upload.update(filename=part["filename"], size_bytes=part["size"])
+            else:
+                fields.setdefault(part["name"], []).append(part["data"].decode())
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+        try:
+            async for chunk in body:
+                parser.write(chunk)
+            parser.finalize()
+            if not upload or not upload["size_bytes"]:
+                raise ValueError("No file was uploaded")
+            # Hashing a multi-gigabyte file takes a while; keep the loop free
+            return fields, await asyncio.to_thread(self._store, tmp_path, upload["filename"])
+        finally:
+            if part.get("file") is not None:
+                part["file"].close()
+            tmp_path.unlink(missing_ok=True)
+
+    def _store(self, source: Path, filename: str) -> Dict[str, Any]:
+        """Move a received file to ``files/<sha256><ext>``; identical content is kept once."""
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        key = digest.hexdigest()
+
+        directory = self.root / "files"
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"{key}{Path(filename).suffix.lower()}"
+        if target.exists():
+            source.unlink()
+        else:
+            os.replace(source, target)
+        return {"path": str(target), "key": key, "filename": filename}
+
+    def resolve_local_path(self, path: str) -> str:
+        """
+        Check that a server-local file may be ingested.
+
+        Only files under ``LOCAL_INGEST_ROOTS`` (e.g. the studio share) are
+        accepted; symlinks are resolved first so they cannot escape a root.
+
+        Returns:
+            The resolved absolute path
+        """
+        roots = [os.path.realpath(root) for root in settings.LOCAL_INGEST_ROOTS]
+        if not roots:
+            raise PermissionError("Local file ingest is disabled (LOCAL_INGEST_ROOTS is empty)")
+
+        resolved = os.path.realpath(path)
+        if not any(os.path.commonpath([resolved, root]) == root for root in roots):
+            raise PermissionError(f"Path is outside the allowed ingest roots: {path}")
+        if not os.path.isfile(resolved):
+            raise FileNotFoundError(f"File not found: {path}")
+        return resolved
@@ -0,0 +1,186 @@
+"""Word-level timing storage in a compact columnar format."""
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.database import supabase
+
+MAGIC = b"WT01"
+HEADER = struct.Struct("<4sI")  # magic, word count
+
+
+@dataclass
+class WordTimings:
+    """
+    Word alignment for one episode stored as parallel arrays.
+
+    ``offsets`` has one more entry than there are words and indexes into the
+    UTF-8 encoded ``text`` buffer, so word ``i`` is
+    ``text[offsets[i]:offsets[i + 1]]``. ``max_ends`` is derived: the
+    running maximum of ``ends``, which makes ends searchable even if
+    neighbouring alignments overlap slightly.
+    """
+
+    offsets: np.ndarray  # uint32, n + 1
+    starts: np.ndarray  # float32, n
+    ends: np.ndarray  # float32, n
+    scores: np.ndarray  # float16, n
+    text: bytes
+    max_ends: np.ndarray = field(init=False, repr=False)  # float32, n
+
+    def __post_init__(self) -> None:
+        self.max_ends = np.maximum.accumulate(self.ends)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_segments(cls, segments: List[Dict[str, Any]]) -> "WordTimings":
+        """
+        Build word timings from aligned WhisperX segments.
+
+        Words WhisperX could not align (e.g. numerals) have no timestamps;
+        they inherit the previous word's end so the arrays stay sorted.
+
+        Args:
+            segments: Aligned segments with a ``words`` list each
+
+        Returns:
+            Packed word timings
+        """
+        words, starts, ends, scores = [], [], [], []
+        last_end = 0.0
+        for segment in segments:
+            for word in segment.get('words', []):
+                start = word.get('start', last_end)
+                end = word.get('end', start)
+                words.append(word['word'].strip().encode('utf-8'))
+                starts.append(start)
+                ends.append(end)
+                scores.append(word.get('score', 0.0))
+                last_end = end
+
+        lengths = np.fromiter((len(w) for w in words), np.uint32, len(words))
+        offsets = np.zeros(len(words) + 1, np.uint32)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(
+            offsets=offsets,
+            starts=np.asarray(starts, np.float32),
+            ends=np.asarray(ends, np.float32),
+            scores=np.asarray(scores, np.float16),
+            text=b"".join(words),
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serialize to the packed binary layout."""
+        return b"".join([
+            HEADER.pack(MAGIC, len(self)),
+            self.offsets.astype("<u4").tobytes(),
+            self.starts.astype("<f4").tobytes(),
+            self.ends.astype("<f4").tobytes(),
+            self.scores.astype("<f2").tobytes(),
+            self.text,
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WordTimings":
+        """Deserialize from the packed binary layout without copying arrays."""
+        magic, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a word timings blob")
+
+        pos = HEADER.size
+        offsets = np.frombuffer(data, "<u4", count + 1, pos)
+        pos += offsets.nbytes
+        starts = np.frombuffer(data, "<f4", count, pos)
+        pos += starts.nbytes
+        ends = np.frombuffer(data, "<f4", count, pos)
+        pos += ends.nbytes
+        scores = np.frombuffer(data, "<f2", count, pos)
+        pos += scores.nbytes
+        return cls(offsets=offsets, starts=starts, ends=ends, scores=scores, text=data[pos:])
+
+    def words_between(self, start_s: float, end_s: float) -> List[Dict[str, Any]]:
+        """
+        Get the words that overlap a time range.
+
+        Args:
+            start_s: Range start in seconds
+            end_s: Range end in seconds
+
+        Returns:
+            Words with their start, end and alignment score
+        """
+        lo = int(np.searchsorted(self.max_ends, start_s, side='right'))
+        hi = int(np.searchsorted(self.starts, end_s, side='left'))
+        return [
+            {
+                'word': self.text[self.offsets[i]:self.offsets[i + 1]].decode('utf-8'),
+                'start_s': float(self.starts[i]),
+                'end_s': float(self.ends[i]),
+                'score': float(self.scores[i]),
+            }
+            for i in range(lo, hi)
+        ]
+
+
+class WordTimingService:
+    """Service for storing and querying word-level timings."""
+
+    def __init__(self, cache_size: int = 16):
+        """
+        Initialize word timing service.
+
+        Args:
+            cache_size: Number of episodes' decoded timings kept in memory
+        """
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, WordTimings]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, episode_id: str, timings: WordTimings) -> None:
+        """Store (or replace) an episode's word timings."""
+        supabase.table("word_timings").upsert({
+            "episode_id": episode_id,
+            "word_count": len(timings),
+            "data": "\\x" + timings.to_bytes().hex(),
+        }).execute()
+        with self._lock:
+            self._cache.pop(episode_id, None)
+
+    def load(self, episode_id: str) -> Optional[WordTimings]:
+        """Load an episode's word timings, using the in-memory cache."""
+        with self._lock:
+            if episode_id in self._cache:
+                self._cache.move_to_end(episode_id)
+                return self._cache[episode_id]
+
+        result = (
+            supabase.table("word_timings")
+            .select("data")
+            .eq("episode_id", episode_id)
+            .execute()
+        )
+        if not result.data:
+            return None
+
+        # PostgREST returns bytea as a "\x"-prefixed hex string
+        timings = WordTimings.from_bytes(bytes.fromhex(result.data[0]["data"][2:]))
+        with self._lock:
+            self._cache[episode_id] = timings
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return timings
+
+    def get_words(
+        self, episode_id: str, start_s: float, end_s: float
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Get the words spoken in a time range, or None if not stored."""
+        timings = self.load(episode_id)
+        if timings is None:
+            return None
+        return timings.words_between(start_s, end_s)
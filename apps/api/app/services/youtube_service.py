@@ -1,19 +1,74 @@
 """YouTube video download service using yt-dlp."""
 import os
+import re
 import subprocess
-from pathlib import Path
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qs, urlparse
 
 import yt_dlp
 
+from app.services.media_store import MediaStore, media_store
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_HOSTS = ("youtube.com", "youtube-nocookie.com", "youtu.be")
+
+
+def extract_video_id(youtube_url: str) -> Optional[str]:
+    """
+    Get the normalized video ID from any common YouTube URL form.
+    
+    Handles ``watch?v=``, ``youtu.be/``, ``shorts/``, ``embed/`` and
+    ``live/`` links on any subdomain, ignoring extra query parameters.
+    
+    Args:
+        youtube_url: YouTube video URL (or a bare video ID)
+        
+    Returns:
+        The 11-character video ID, or None if the URL is not a video
+    """
+    youtube_url = youtube_url.strip()
+    if VIDEO_ID_RE.match(youtube_url):
+        return youtube_url
+    
+    parsed = urlparse(youtube_url if "://" in youtube_url else f"https://{youtube_url}")
+    host = (parsed.hostname or "").lower()
+    if not any(host == h or host.endswith(f".{h}") for h in YOUTUBE_HOSTS):
+        return None
+    
+    parts = [p for p in parsed.path.split("/") if p]
+    if host.endswith("youtu.be"):
+        candidate = parts[0] if parts else None
+    elif parts[:1] == ["watch"]:
+        candidate = parse_qs(parsed.query).get("v", [None])[0]
+    elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+        candidate = parts[1]
+    else:
+        candidate = None
+    
+    if candidate and VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def media_key(youtube_url: Optional[str], episode_id: str) -> str:
+    """Key an episode's media by video ID, so reprocessing reuses it."""
+    return (youtube_url and extract_video_id(youtube_url)) or episode_id
+
+
+def episode_media_key(episode: Dict[str, Any]) -> str:
+    """Key an episode's media by uploaded content hash or YouTube video ID."""
+    return episode.get("source_key") or media_key(episode.get("youtube_url"), episode["id"])
+
 
 class YouTubeService:
     """Service for downloading videos from YouTube."""
 
-    def __init__(self, output_dir: str = "./downloads"):
-        """Initialize YouTube service with output directory."""
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+    def __init__(self, store: Optional[MediaStore] = None):
+        """Initialize YouTube service with the media store downloads go to."""
+        self.store = store or media_store
 
     def get_video_info(self, youtube_url: str) -> Dict[str, Any]:
         """
@@ -41,47 +96,189 @@ class YouTubeService:
                 'description': info.get('description', ''),
             }
 
+    def list_videos(self, url: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        List the videos of a playlist or channel without resolving each one.
+        
+        Uses flat extraction, so a large channel costs a few page requests
+        rather than one extraction per video. Channel tabs (videos, shorts,
+        live) are followed one level down.
+        
+        Args:
+            url: Playlist, channel or video URL
+            limit: Maximum number of videos to return
+            
+        Returns:
+            Videos with their ID, canonical URL, and the title and duration
+            when the listing includes them
+        """
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+        }
+        if limit:
+            ydl_opts['playlistend'] = limit
+        
+        videos: List[Dict[str, Any]] = []
+        seen = set()
+        
+        def collect(info: Dict[str, Any], depth: int) -> None:
+            entries = info.get('entries')
+            if entries is None:
+                entries = [info]
+            for entry in entries:
+                if not entry or (limit and len(videos) >= limit):
+                    continue
+                video_id = entry.get('id') if entry.get('ie_key', 'Youtube') == 'Youtube' else None
+                if video_id and VIDEO_ID_RE.match(video_id):
+                    if video_id not in seen:
+                        seen.add(video_id)
+                        videos.append({
+                            'video_id': video_id,
+                            'url': f"https://www.youtube.com/watch?v={video_id}",
+                            'title': entry.get('title'),
+                            'duration_seconds': int(entry.get('duration') or 0),
+                        })
+                elif depth == 0 and entry.get('url'):
+                    collect(ydl.extract_info(entry['url'], download=False), depth + 1)
+        
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            collect(ydl.extract_info(url, download=False), 0)
+        return videos
+
     def download_audio(self, youtube_url: str, episode_id: str) -> str:
         """
-        Download audio from YouTube video.
+        Download the compressed audio stream from a YouTube video.
+        
+        The stream is kept as served (usually Opus or AAC) instead of being
+        expanded to WAV; decoding to the models' format is a separate step.
+        A copy already in the media store is reused.
         
         Args:
             youtube_url: YouTube video URL
-            episode_id: Episode ID for filename
+            episode_id: Episode ID, used as the key for non-YouTube URLs
             
         Returns:
             Path to downloaded audio file
         """
-        output_path = self.output_dir / f"{episode_id}.wav"
+        key = media_key(youtube_url, episode_id)
+        cached = self.store.get("audio", key)
+        if cached:
+            return cached
         
         ydl_opts = {
             'format': 'bestaudio/best',
-            'outtmpl': str(self.output_dir / f"{episode_id}.%(ext)s"),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'wav',
-            }],
+            'outtmpl': str(self.store.path_for("audio", key, "%(ext)s")),
             'quiet': True,
             'no_warnings': True,
         }
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([youtube_url])
+            info = ydl.extract_info(youtube_url, download=True)
+            return self.store.put("audio", key, ydl.prepare_filename(info))
+
+    def stream_audio(
+        self, youtube_url: str, episode_id: str, sample_rate: int = 16000
+    ) -> Dict[str, str]:
+        """
+        Download the audio stream while decoding it in the same pass.
+        
+        yt-dlp writes the compressed stream to stdout; every block is saved
+        to disk and fed to an ffmpeg decoder at the same time, so the mono
+        PCM WAV is ready as soon as the download finishes. Both files go to
+        the media store and are reused if already there.
+        
+        Transcription still starts once the WAV is complete: the download
+        runs as its own I/O job, and the fingerprint stage that may skip
+        transcription altogether needs the whole recording.
+        
+        Args:
+            youtube_url: YouTube video URL
+            episode_id: Episode ID, used as the key for non-YouTube URLs
+            sample_rate: Output sample rate
+            
+        Returns:
+            Paths to the compressed audio (``path``) and the WAV (``wav_path``)
+        """
+        key = media_key(youtube_url, episode_id)
+        cached_audio = self.store.get("audio", key)
+        cached_wav = self.store.get("pcm", key)
+        if cached_audio and cached_wav:
+            return {"path": cached_audio, "wav_path": cached_wav}
+        
+        output_path = self.store.path_for("audio", key, "audio")
+        wav_path = self.store.path_for("pcm", key, "wav")
+        tmp_audio = output_path.with_suffix(".audio.part")
+        tmp_wav = wav_path.with_suffix(".part.wav")
         
-        return str(output_path)
+        downloader = subprocess.Popen(
+            [sys.executable, "-m", "yt_dlp", "-f", "bestaudio/best", "-o", "-",
+             "--quiet", "--no-warnings", youtube_url],
+            stdout=subprocess.PIPE,
+        )
+        decoder = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", "pipe:0",
+             "-ac", "1", "-ar", str(sample_rate), "-c:a", "pcm_s16le", str(tmp_wav)],
+            stdin=subprocess.PIPE,
+        )
+        
+        try:
+            with open(tmp_audio, "wb") as f:
+                for block in iter(lambda: downloader.stdout.read(STREAM_BLOCK_SIZE), b""):
+                    f.write(block)
+                    decoder.stdin.write(block)
+            decoder.stdin.close()
+        except BrokenPipeError:
+            # The decoder exited early; its return code reports why
+            downloader.kill()
+        except Exception:
+            # E.g. a full disk: stop both processes, or waiting for them
+            # would block on their pipes, and leave no partial files
+            for process in (downloader, decoder):
+                process.kill()
+            try:
+                decoder.stdin.close()
+            except OSError:
+                pass
+            downloader.wait()
+            decoder.wait()
+            self.cleanup(str(tmp_audio))
+            self.cleanup(str(tmp_wav))
+            raise
+        download_code = downloader.wait()
+        decode_code = decoder.wait()
+        
+        if download_code != 0 or decode_code != 0:
+            self.cleanup(str(tmp_audio))
+            self.cleanup(str(tmp_wav))
+            raise RuntimeError(
+                f"Streaming audio failed (yt-dlp exit {download_code}, ffmpeg exit {decode_code})"
+            )
+        
+        os.replace(tmp_audio, output_path)
+        os.replace(tmp_wav, wav_path)
+        return {
+            "path": self.store.put("audio", key, str(output_path)),
+            "wav_path": self.store.put("pcm", key, str(wav_path)),
+        }
 
     def download_video(self, youtube_url: str, episode_id: str) -> str:
         """
-        Download full video from YouTube.
+        Download full video from YouTube, reusing a copy in the media store.
         
         Args:
             youtube_url: YouTube video URL
-            episode_id: Episode ID for filename
+            episode_id: Episode ID, used as the key for non-YouTube URLs
             
         Returns:
             Path to downloaded video file
         """
-        output_path = self.output_dir / f"{episode_id}.mp4"
+        key = media_key(youtube_url, episode_id)
+        cached = self.store.get("video", key)
+        if cached:
+            return cached
+        output_path = self.store.path_for("video", key, "mp4")
         
         ydl_opts = {
             'format': 'best',
@@ -93,7 +290,7 @@ class YouTubeService:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download([youtube_url])
         
-        return str(output_path)
+        return self.store.put("video", key, str(output_path))
 
     def cleanup(self, file_path: str) -> None:
         """Delete downloaded file."""
@@ -0,0 +1,94 @@
+"""
+Benchmark speaker assignment on a synthetic three-hour diarization.
+
+Run from apps/api:
+    python -m benchmarks.bench_speaker_assignment
+"""
+import random
+import time
+from typing import Any, Dict, List
+
+from app.services.diarization_service import DiarizationService
+
+EPISODE_SECONDS = 3 * 60 * 60
+NUM_SPEAKERS = 3
+
+
+def make_diarization(seed: int = 0) -> Dict[str, Any]:
+    """Build alternating speaker turns of 1-20s covering the whole episode."""
+    rng = random.Random(seed)
+    speakers: Dict[str, List[tuple]] = {f"SPEAKER_{i:02d}": [] for i in range(NUM_SPEAKERS)}
+    t = 0.0
+    while t < EPISODE_SECONDS:
+        label = f"SPEAKER_{rng.randrange(NUM_SPEAKERS):02d}"
+        length = rng.uniform(1.0, 20.0)
+        speakers[label].append((t, t + length))
+        t += length + rng.uniform(-0.5, 0.5)  # small gaps and overlaps
+    return {'speakers': [{'label': k, 'segments': v} for k, v in speakers.items()]}
+
+
+def make_segments(seed: int = 1) -> List[Dict[str, Any]]:
+    """Build contiguous 2-8s transcript segments covering the whole episode."""
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    while t < EPISODE_SECONDS:
+        length = rng.uniform(2.0, 8.0)
+        segments.append({'start_s': t, 'end_s': t + length, 'text': ''})
+        t += length
+    return segments
+
+
+def naive_assign(
+    segments: List[Dict[str, Any]], diarization: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Previous O(segments x turns) implementation, kept for comparison."""
+    result = []
+    for segment in segments:
+        segment_speakers = set()
+        for speaker_info in diarization['speakers']:
+            for turn_start, turn_end in speaker_info['segments']:
+                if turn_start < segment['end_s'] and turn_end > segment['start_s']:
+                    segment_speakers.add(speaker_info['label'])
+        result.append({**segment, 'speakers': list(segment_speakers)})
+    return result
+
+
+def main() -> None:
+    """Run both implementations and report timings."""
+    diarization = make_diarization()
+    segments = make_segments()
+    num_turns = sum(len(s['segments']) for s in diarization['speakers'])
+    print(f"{len(segments)} segments, {num_turns} turns over {EPISODE_SECONDS / 3600:.0f}h")
+
+    service = DiarizationService()
+
+    start = time.perf_counter()
+    fast = service.assign_speakers_to_segments(segments, diarization)
+    fast_s = time.perf_counter() - start
+    print(f"sweep-line:       {fast_s * 1000:9.1f} ms")
+
+    start = time.perf_counter()
+    service.assign_speakers_to_segments(segments, diarization, dominant_only=True)
+    print(f"sweep-line (dom): {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+    # A speaker talking over the whole episode must not slow the others down
+    background = {'label': 'BACKGROUND', 'segments': [(0.0, float(EPISODE_SECONDS))]}
+    long_turn = {'speakers': [*diarization['speakers'], background]}
+    start = time.perf_counter()
+    service.assign_speakers_to_segments(segments, long_turn)
+    print(f"sweep-line (long): {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    start = time.perf_counter()
+    slow = naive_assign(segments, diarization)
+    slow_s = time.perf_counter() - start
+    print(f"naive:            {slow_s * 1000:9.1f} ms  ({slow_s / fast_s:.0f}x slower)")
+
+    mismatches = sum(
+        set(a['speakers']) != set(b['speakers']) for a, b in zip(fast, slow)
+    )
+    print(f"mismatched segments: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ from app.routers import (
     comments,
     highlight_comments,
     highlight_segments,
+    jobs,
+    llm,
+    media,
+    uploads,
 )
 
 app = FastAPI(
@@ -40,6 +44,10 @@ app.include_router(seed.router, prefix="/api/seed", tags=["seed"])
 app.include_router(comments.router, prefix="/api/episodes", tags=["comments"])
 app.include_router(highlight_comments.router, prefix="/api/highlights", tags=["highlight_comments"])
 app.include_router(highlight_segments.router, prefix="/api/highlights", tags=["highlight_segments"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(llm.router, prefix="/api/llm", tags=["llm"])
+app.include_router(media.router, prefix="/api/media", tags=["media"])
+app.include_router(uploads.router, prefix="/api/uploads", tags=["uploads"])
 
 
 @app.get("/")
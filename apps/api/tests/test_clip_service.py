@@ -0,0 +1,51 @@
+"""Tests for clip rendering."""
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services.clip_service import ClipService, merge_ranges, plan_cut
+
+KEYFRAMES = np.arange(0.0, 120.0, 2.0)  # A keyframe every 2 seconds
+
+
+def test_plan_cut_copies_between_keyframes():
+    """Test that only the boundaries around the copied middle are re-encoded."""
+    parts = plan_cut(10.5, 31.2, KEYFRAMES, min_copy_s=2.0)
+
+    assert parts == [(10.5, 12.0, 'encode'), (12.0, 30.0, 'copy'), (30.0, 31.2, 'encode')]
+
+
+def test_plan_cut_on_keyframes_has_no_boundaries():
+    """Test that a range starting and ending on keyframes is copied whole."""
+    assert plan_cut(10.0, 20.0, KEYFRAMES, min_copy_s=2.0) == [(10.0, 20.0, 'copy')]
+
+
+def test_plan_cut_short_range_is_encoded():
+    """Test that a range without a long enough keyframe span is re-encoded."""
+    assert plan_cut(10.5, 13.0, KEYFRAMES, min_copy_s=2.0) == [(10.5, 13.0, 'encode')]
+    assert plan_cut(200.0, 210.0, KEYFRAMES, min_copy_s=2.0) == [(200.0, 210.0, 'encode')]
+
+
+def test_merge_ranges_keeps_order():
+    """Test that touching ranges merge but reordered ranges stay apart."""
+    ranges = [(10.0, 15.0), (15.0, 20.0), (50.0, 55.0), (30.0, 35.0)]
+
+    assert merge_ranges(ranges) == [(10.0, 20.0), (50.0, 55.0), (30.0, 35.0)]
+
+
+def test_get_clip_ranges_falls_back_to_highlight_bounds():
+    """Test ranges come from ordered segments, or the highlight itself."""
+    highlights = [
+        {'id': 'h1', 'start_s': 0.0, 'end_s': 30.0},
+        {'id': 'h2', 'start_s': 40.0, 'end_s': 50.0},
+    ]
+    with patch('app.services.clip_service.supabase') as mock_supabase:
+        query = mock_supabase.table.return_value.select.return_value.in_.return_value
+        query.order.return_value.execute.return_value.data = [
+            {'highlight_id': 'h1', 'sequence_order': 0, 'segments': {'start_s': 20.0, 'end_s': 30.0}},
+            {'highlight_id': 'h1', 'sequence_order': 1, 'segments': {'start_s': 0.0, 'end_s': 5.0}},
+        ]
+
+        ranges = ClipService(youtube_service=object()).get_clip_ranges(highlights)
+
+    assert ranges == {'h1': [(20.0, 30.0), (0.0, 5.0)], 'h2': [(40.0, 50.0)]}
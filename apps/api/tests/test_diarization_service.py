@@ -0,0 +1,129 @@
+"""Tests for diarization service."""
+import numpy as np
+import pytest
+
+from app.services.diarization_service import DiarizationService
+
+
+@pytest.fixture
+def diarization_service():
+    """Create diarization service instance."""
+    return DiarizationService()
+
+
+@pytest.fixture
+def sample_diarization():
+    """Two speakers alternating, with one overlapping turn."""
+    return {
+        'speakers': [
+            {'label': 'SPEAKER_00', 'segments': [(0.0, 5.0), (10.0, 15.0)]},
+            {'label': 'SPEAKER_01', 'segments': [(5.0, 10.0), (14.0, 20.0)]},
+        ]
+    }
+
+
+def test_assign_speakers_ignores_boundary_touch(diarization_service, sample_diarization):
+    """Test that turns touching a segment boundary are not counted as overlap."""
+    segments = [
+        {'start_s': 0.0, 'end_s': 5.0, 'text': 'a'},
+        {'start_s': 5.0, 'end_s': 10.0, 'text': 'b'},
+    ]
+
+    result = diarization_service.assign_speakers_to_segments(segments, sample_diarization)
+
+    assert result[0]['speakers'] == ['SPEAKER_00']
+    assert result[1]['speakers'] == ['SPEAKER_01']
+    assert result[0]['text'] == 'a'
+
+
+def test_assign_speakers_orders_by_overlap(diarization_service, sample_diarization):
+    """Test that overlapping speakers are ranked by overlap duration."""
+    segments = [
+        {'start_s': 9.0, 'end_s': 15.0, 'text': 'mostly speaker 0'},
+        {'start_s': 13.0, 'end_s': 20.0, 'text': 'mostly speaker 1'},
+    ]
+
+    result = diarization_service.assign_speakers_to_segments(segments, sample_diarization)
+
+    assert result[0]['speakers'] == ['SPEAKER_00', 'SPEAKER_01']
+    assert result[1]['speakers'] == ['SPEAKER_01', 'SPEAKER_00']
+
+
+def test_assign_speakers_dominant_only(diarization_service, sample_diarization):
+    """Test picking only the dominant speaker."""
+    segments = [{'start_s': 13.0, 'end_s': 20.0, 'text': 'x'}]
+
+    result = diarization_service.assign_speakers_to_segments(
+        segments, sample_diarization, dominant_only=True
+    )
+
+    assert result[0]['speakers'] == ['SPEAKER_01']
+
+
+def test_assign_speakers_long_turn_spanning_segments(diarization_service):
+    """Test that a long early turn is still found for later segments."""
+    diarization = {
+        'speakers': [
+            {'label': 'SPEAKER_00', 'segments': [(0.0, 100.0)]},
+            {'label': 'SPEAKER_01', 'segments': [(1.0, 2.0), (3.0, 4.0)]},
+        ]
+    }
+    segments = [
+        {'start_s': 50.0, 'end_s': 55.0, 'text': 'x'},
+        {'start_s': 150.0, 'end_s': 155.0, 'text': 'silence'},
+    ]
+
+    result = diarization_service.assign_speakers_to_segments(segments, diarization)
+
+    assert result[0]['speakers'] == ['SPEAKER_00']
+    assert result[1]['speakers'] == []
+
+
+def test_assign_speakers_long_turn_does_not_hide_shorter_ones(diarization_service):
+    """Test that speakers under a long turn are still ranked by overlap."""
+    diarization = {
+        'speakers': [
+            {'label': 'SPEAKER_00', 'segments': [(0.0, 10800.0)]},
+            {'label': 'SPEAKER_01', 'segments': [(t, t + 8.0) for t in range(0, 10800, 10)]},
+        ]
+    }
+    segments = [{'start_s': float(t), 'end_s': t + 10.0, 'text': 'x'} for t in range(0, 10800, 10)]
+
+    result = diarization_service.assign_speakers_to_segments(segments, diarization)
+
+    assert all(r['speakers'] == ['SPEAKER_00', 'SPEAKER_01'] for r in result)
+
+
+def test_plan_chunks_covers_duration(diarization_service):
+    """Test that windows overlap and cover the full duration."""
+    windows = diarization_service.plan_chunks(1500.0, chunk_s=600.0, overlap_s=30.0)
+
+    assert windows == [(0.0, 600.0), (570.0, 1170.0), (1140.0, 1500.0)]
+
+
+def test_merge_chunks_keeps_labels_consistent(diarization_service):
+    """Test that local speakers are re-clustered into global labels."""
+    host, guest = [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]
+    windows = [(0.0, 100.0), (90.0, 190.0)]
+    chunk_results = [
+        {'turns': [(0.0, 50.0, 0), (50.0, 100.0, 1)], 'embeddings': np.array([host, guest])},
+        # Local labels swapped in the second window
+        {'turns': [(90.0, 140.0, 0), (140.0, 190.0, 1)], 'embeddings': np.array([guest, host])},
+    ]
+
+    result = diarization_service.merge_chunks(windows, chunk_results, overlap_s=10.0)
+
+    speakers = {s['label']: s['segments'] for s in result['speakers']}
+    assert speakers['SPEAKER_00'] == [(0.0, 50.0), (140.0, 190.0)]
+    assert speakers['SPEAKER_01'] == [(50.0, 140.0)]
+
+
+def test_cluster_never_merges_same_chunk(diarization_service):
+    """Test that two speakers from one window stay separate even if similar."""
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.1]])
+
+    cluster_ids = diarization_service.cluster_speaker_embeddings(
+        embeddings, chunk_ids=[0, 0], threshold=0.5
+    )
+
+    assert cluster_ids[0] != cluster_ids[1]
@@ -1,10 +1,21 @@
 """Tests for episode service."""
+import asyncio
+
 import pytest
 from unittest.mock import Mock, patch
 
 from app.services.episode_service import EpisodeService
 
 
+METADATA = {
+    'title': 'Test Episode',
+    'duration_seconds': 3600,
+    'description': '',
+    'thumbnail_url': None,
+    'upload_date': None,
+}
+
+
 @pytest.fixture
 def episode_service():
     """Create episode service instance."""
@@ -16,7 +27,9 @@ async def test_create_episode(episode_service):
     """Test episode creation."""
     youtube_url = "https://www.youtube.com/watch?v=test123"
     
-    with patch('app.services.episode_service.supabase') as mock_supabase:
+    with patch('app.services.episode_service.supabase') as mock_supabase, \
+            patch.object(episode_service, '_extract_youtube_metadata', return_value=METADATA):
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
         mock_supabase.table.return_value.insert.return_value.execute.return_value.data = [
             {
                 'id': 'test-id',
@@ -65,3 +78,187 @@ async def test_get_episode(episode_service):
         assert result['id'] == episode_id
         assert result['title'] == 'Test Episode'
 
+
+@pytest.mark.asyncio
+async def test_create_episode_dedupes_by_video_id(episode_service):
+    """Test that a different URL form of an ingested video is rejected."""
+    with patch('app.services.episode_service.supabase') as mock_supabase, \
+            patch.object(episode_service, '_extract_youtube_metadata') as mock_extract:
+        select = mock_supabase.table.return_value.select.return_value
+        select.eq.return_value.limit.return_value.execute.return_value.data = [{'id': 'existing-id'}]
+        
+        with pytest.raises(ValueError, match='existing-id'):
+            await episode_service.create_episode("https://youtu.be/test1234567?t=42")
+        
+        select.eq.assert_called_with('youtube_video_id', 'test1234567')
+        mock_extract.assert_not_called()
+
+
+class UniqueViolation(Exception):
+    """A PostgREST error for a duplicate key."""
+
+    code = '23505'
+
+
+@pytest.mark.asyncio
+async def test_create_episode_reports_concurrent_ingest_as_duplicate(episode_service):
+    """Test that losing an insert race to another process is a duplicate, not a server error."""
+    with patch('app.services.episode_service.supabase') as mock_supabase, \
+            patch.object(episode_service, '_extract_youtube_metadata', return_value=METADATA), \
+            patch.object(episode_service, 'find_episode_by_video_id',
+                         side_effect=[None, {'id': 'other-process-id'}]):
+        mock_supabase.table.return_value.insert.return_value.execute.side_effect = UniqueViolation()
+
+        with pytest.raises(ValueError, match='other-process-id'):
+            await episode_service.create_episode("https://youtu.be/test1234567")
+
+
+@pytest.mark.asyncio
+async def test_resolve_metadata_is_cached_and_shared(episode_service):
+    """Test that concurrent and repeated lookups of one video extract once."""
+    with patch.object(episode_service, '_extract_youtube_metadata', return_value=METADATA) as mock_extract:
+        results = await asyncio.gather(
+            episode_service.resolve_youtube_metadata("https://www.youtube.com/watch?v=test1234567"),
+            episode_service.resolve_youtube_metadata("https://youtu.be/test1234567"),
+        )
+        again = await episode_service.resolve_youtube_metadata("youtube.com/shorts/test1234567")
+    
+    assert mock_extract.call_count == 1
+    assert results[0] == results[1] == again == METADATA
+
+
+@pytest.mark.asyncio
+async def test_resolve_metadata_does_not_cache_failures(episode_service):
+    """Test that a failed lookup falls back and is retried next time."""
+    with patch.object(episode_service, '_extract_youtube_metadata', side_effect=[RuntimeError('offline'), METADATA]):
+        first = await episode_service.resolve_youtube_metadata("https://youtu.be/test1234567")
+        second = await episode_service.resolve_youtube_metadata("https://youtu.be/test1234567")
+    
+    assert first['title'] == 'Unknown Title'
+    assert second == METADATA
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_is_bounded(episode_service):
+    """Test that the oldest cached videos are evicted beyond the cache size."""
+    with patch.object(episode_service, '_extract_youtube_metadata', return_value=METADATA), \
+            patch('app.services.episode_service.settings') as mock_settings:
+        mock_settings.YOUTUBE_METADATA_TTL_SECONDS = 3600
+        mock_settings.YOUTUBE_METADATA_CACHE_SIZE = 2
+        for video_id in ('aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'):
+            await episode_service.resolve_youtube_metadata(f"https://youtu.be/{video_id}")
+
+    assert list(episode_service._metadata_cache) == ['bbbbbbbbbbb', 'ccccccccccc']
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_episodes(episode_service):
+    """Test bulk ingest dedupes videos and creates the rest in one insert."""
+    playlist = [
+        {'video_id': 'aaaaaaaaaaa', 'url': 'https://www.youtube.com/watch?v=aaaaaaaaaaa',
+         'title': 'Episode A', 'duration_seconds': 100},
+        {'video_id': 'bbbbbbbbbbb', 'url': 'https://www.youtube.com/watch?v=bbbbbbbbbbb',
+         'title': 'Episode B', 'duration_seconds': 200},
+    ]
+    episode_service.youtube_service = Mock()
+    episode_service.youtube_service.list_videos.return_value = playlist
+    
+    with patch('app.services.episode_service.supabase') as mock_supabase, \
+            patch.object(episode_service, '_extract_youtube_metadata', return_value=METADATA) as mock_extract:
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {'id': 'existing-b', 'youtube_video_id': 'bbbbbbbbbbb'}
+        ]
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.return_value.data = [{'id': 'new-a'}, {'id': 'new-c'}]
+        
+        result = await episode_service.bulk_create_episodes([
+            'https://www.youtube.com/playlist?list=PLshow',
+            'https://youtu.be/aaaaaaaaaaa',
+            'https://youtu.be/ccccccccccc',
+        ])
+    
+    rows = insert.call_args[0][0]
+    assert insert.call_count == 1
+    assert [row['youtube_video_id'] for row in rows] == ['aaaaaaaaaaa', 'ccccccccccc']
+    assert rows[0]['title'] == 'Episode A'
+    assert rows[1]['title'] == METADATA['title']
+    mock_extract.assert_called_once_with('https://youtu.be/ccccccccccc')
+    assert {s['reason'] for s in result['skipped']} == {'already ingested', 'duplicate in request'}
+    assert len(result['created']) == 2
+
+
+@pytest.mark.asyncio
+async def test_detect_highlights_runs_prompts_concurrently(episode_service):
+    """Test that prompts share one transcript, map ranges to segments and record their runs."""
+    segments = [
+        {'id': f'seg-{i}', 'start_s': i * 10.0, 'end_s': i * 10.0 + 10.0,
+         'text': f'frase {i}', 'speakers': ['Ana']}
+        for i in range(6)
+    ]
+    prompts = [
+        {'id': 'p-funny', 'name': 'funny', 'template_text': 'Funny: {transcript}'},
+        {'id': 'p-broken', 'name': 'broken', 'template_text': 'Broken: {transcript}'},
+    ]
+    in_flight = []
+    peak = []
+
+    async def detect(segs, template, transcript=None, usage=None, on_highlight=None):
+        assert transcript is not None and len(transcript.lines) == len(segments)
+        in_flight.append(template)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(template)
+        if template.startswith('Broken'):
+            raise RuntimeError('model refused')
+        usage.update({'calls': 1, 'cached_calls': 0, 'input_tokens': 900, 'output_tokens': 120})
+        highlight = {'start_segment': 1, 'end_segment': 2, 'start_s': 10.0, 'end_s': 30.0, 'description': ''}
+        await on_highlight(highlight)
+        return [highlight]
+
+    tables = {}
+
+    def table(name):
+        return tables.setdefault(name, Mock(name=name))
+
+    with patch('app.services.episode_service.supabase') as mock_supabase, \
+            patch.object(episode_service, 'get_segments', return_value=segments), \
+            patch.object(episode_service.llm_service, 'detect_highlights_windowed', side_effect=detect):
+        mock_supabase.table.side_effect = table
+        table('prompts').select.return_value.in_.return_value.execute.return_value.data = prompts
+        table('highlights').insert.return_value.execute.return_value.data = [{'id': 'h-1'}]
+
+        runs = await episode_service.detect_highlights('ep-1', ['p-funny', 'p-broken'])
+
+    assert max(peak) == 2
+    assert [(r['prompt_id'], r['status'], r['highlights_count']) for r in runs] == [
+        ('p-funny', 'completed', 1), ('p-broken', 'failed', 0),
+    ]
+    assert runs[0]['input_tokens'] == 900
+
+    [row] = tables['highlights'].insert.call_args.args[0]
+    assert row == {
+        'episode_id': 'ep-1', 'prompt_id': 'p-funny', 'start_s': 10.0, 'end_s': 30.0,
+        'transcript': 'frase 1 frase 2',
+    }
+    # The failed prompt keeps its earlier highlights
+    assert tables['highlights'].delete.call_count == 1
+    links = tables['highlight_segments'].insert.call_args.args[0]
+    assert [(l['segment_id'], l['sequence_order']) for l in links] == [('seg-1', 0), ('seg-2', 1)]
+    assert tables['highlight_runs'].insert.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_detect_highlights_raises_when_every_prompt_fails(episode_service):
+    """Test that the job is retried when no prompt produced anything."""
+    segments = [{'id': 'seg-0', 'start_s': 0.0, 'end_s': 10.0, 'text': 'oi', 'speakers': []}]
+
+    with patch('app.services.episode_service.supabase') as mock_supabase, \
+            patch.object(episode_service, 'get_segments', return_value=segments), \
+            patch.object(episode_service.llm_service, 'detect_highlights_windowed',
+                         side_effect=RuntimeError('down')):
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+            {'id': 'p-1', 'name': 'one', 'template_text': '{transcript}'},
+        ]
+
+        with pytest.raises(RuntimeError, match='Every prompt failed'):
+            await episode_service.detect_highlights('ep-1', ['p-1'])
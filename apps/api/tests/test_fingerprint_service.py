@@ -0,0 +1,114 @@
+"""Tests for audio fingerprinting and re-upload matching."""
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.fingerprint_service import (
+    HOP_S,
+    SAMPLE_RATE,
+    FingerprintService,
+    _from_bytea,
+    _to_bytea,
+    compare,
+    fingerprint_samples,
+    index_keys,
+)
+
+
+def recording(seconds, seed=0):
+    """Speech-like audio: noise bursts over a wandering tone."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = np.sin(2 * np.pi * (400 + 300 * np.sin(2 * np.pi * 0.1 * t)) * t)
+    bursts = rng.standard_normal(len(t)) * np.abs(np.sin(2 * np.pi * 0.7 * t))
+    return (tone + bursts) * 3000
+
+
+def reupload(signal, shift, seed=1):
+    """The same audio cut ``shift`` samples later, quieter and with added noise."""
+    rng = np.random.default_rng(seed)
+    shifted = signal[shift:] * 0.5 + rng.standard_normal(len(signal) - shift) * 300
+    return shifted.astype(np.int16)
+
+
+@pytest.fixture(scope="module")
+def original():
+    """Fingerprint of a four-minute recording."""
+    return fingerprint_samples(recording(240).astype(np.int16))
+
+
+@pytest.fixture
+def indexed(original):
+    """Fingerprint service whose index holds ``original`` as episode ep0."""
+    frames, keys = index_keys(original)
+    rows = [
+        {"hash": int(key), "episode_id": "ep0", "frame": int(frame)}
+        for frame, key in zip(frames, keys)
+    ]
+
+    def lookup(column, values):
+        query = MagicMock()
+        if column == "id":
+            # Episodes: ep0 is completed
+            query.eq.return_value.or_.return_value.execute.return_value.data = [
+                {"id": episode_id} for episode_id in values if episode_id == "ep0"
+            ]
+        else:
+            query.neq.return_value.execute.return_value.data = [r for r in rows if r["hash"] in values]
+        return query
+
+    with patch("app.services.fingerprint_service.supabase") as mock_supabase, \
+            patch("app.services.fingerprint_service.settings") as mock_settings:
+        mock_settings.FINGERPRINT_MAX_BIT_ERROR = 0.25
+        mock_settings.FINGERPRINT_MIN_COVERAGE = 0.9
+        table = mock_supabase.table.return_value
+        table.select.return_value.in_.side_effect = lookup
+        table.select.return_value.eq.return_value.execute.return_value.data = [
+            {"data": _to_bytea(original)}
+        ]
+        yield FingerprintService()
+
+
+def test_bytea_round_trip(original):
+    """Test that fingerprints survive the PostgREST bytea encoding."""
+    assert np.array_equal(_from_bytea(_to_bytea(original)), original)
+
+
+def test_compare_aligned_and_unrelated(original):
+    """Test that the bit error rate separates the same audio from other audio."""
+    copy = fingerprint_samples(reupload(recording(240), 100 * 256))
+    other = fingerprint_samples(recording(240, seed=7).astype(np.int16))
+
+    same_ber, overlap = compare(copy, original, 100)
+    other_ber, _ = compare(other, original, 0)
+
+    assert same_ber < 0.2
+    assert overlap == len(copy)
+    assert other_ber > 0.35
+
+
+@pytest.mark.parametrize("shift", [250 * 256 + 30, 250 * 256 + 128])
+def test_find_match_recovers_offset(indexed, shift):
+    """Test that a re-upload is matched with its offset, even between hops."""
+    query = fingerprint_samples(reupload(recording(240), shift))
+
+    match = indexed.find_match("ep1", query)
+
+    assert match["episode_id"] == "ep0"
+    assert match["offset_s"] == pytest.approx(-shift / SAMPLE_RATE, abs=HOP_S)
+
+
+def test_find_match_ignores_other_recordings(indexed):
+    """Test that unrelated audio is not matched."""
+    query = fingerprint_samples(recording(240, seed=7).astype(np.int16))
+
+    assert indexed.find_match("ep1", query) is None
+
+
+def test_find_match_skips_unprocessed_episodes(indexed):
+    """Test that an episode still processing, or failed, is not reused."""
+    query = fingerprint_samples(reupload(recording(240), 250 * 256))
+
+    with patch.object(indexed, "_processed", return_value=set()):
+        assert indexed.find_match("ep1", query) is None
@@ -0,0 +1,115 @@
+"""Tests for the local job queue stand-in."""
+from unittest.mock import patch
+
+import pytest
+
+from app.services.job_queue import LeaseLostError, LocalJobQueue
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    """Create a job queue in a temporary SQLite file."""
+    return LocalJobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_claim_by_resource(job_queue):
+    """Test that workers only claim jobs for their resource class."""
+    job_queue.enqueue("process_episode", "ep1")
+    job_queue.enqueue("download_audio", "ep2", {"prompt_ids": ["p1"]})
+
+    io_job = job_queue.claim("io", "worker-io")
+    assert io_job["kind"] == "download_audio"
+    assert io_job["payload"] == {"prompt_ids": ["p1"]}
+    assert io_job["status"] == "running"
+    assert io_job["attempts"] == 1
+
+    assert job_queue.claim("io", "worker-io") is None
+    assert job_queue.claim("cpu", "worker-cpu")["episode_id"] == "ep1"
+
+
+def test_failed_job_is_retried_then_given_up(job_queue):
+    """Test retries with backoff until max_attempts is reached."""
+    job_queue.enqueue("process_episode", "ep1")  # max_attempts = 2
+
+    with patch("app.services.job_queue.settings") as mock_settings:
+        mock_settings.JOB_RETRY_BASE_SECONDS = 0
+        mock_settings.JOB_LEASE_SECONDS = 300
+
+        job = job_queue.claim("cpu", "w")
+        assert job_queue.fail(job, "boom") is True
+
+        job = job_queue.claim("cpu", "w")
+        assert job["attempts"] == 2
+        assert job["last_error"] == "boom"
+        assert job_queue.fail(job, "boom again") is False
+
+        assert job_queue.claim("cpu", "w") is None
+
+    assert job_queue.list_jobs("ep1")[0]["status"] == "failed"
+
+
+def test_expired_lease_is_reclaimed(job_queue):
+    """Test that a job whose worker stopped heartbeating is claimed again."""
+    job_queue.enqueue("process_episode", "ep1")
+    job_queue.claim("cpu", "dead-worker")
+
+    with patch("app.services.job_queue.settings") as mock_settings:
+        mock_settings.JOB_LEASE_SECONDS = -1
+        job = job_queue.claim("cpu", "live-worker")
+
+    assert job["locked_by"] == "live-worker"
+    assert job["attempts"] == 2
+
+
+def test_expired_lease_on_last_attempt_fails(job_queue):
+    """Test that a job whose lease expired on its last attempt is failed, not reclaimed."""
+    job_queue.enqueue("process_episode", "ep1")
+    job_queue.claim("cpu", "w1")
+
+    with patch("app.services.job_queue.settings") as mock_settings:
+        mock_settings.JOB_LEASE_SECONDS = -1
+        assert job_queue.claim("cpu", "w2")["attempts"] == 2
+        assert job_queue.claim("cpu", "w3") is None
+
+    [job] = job_queue.list_jobs("ep1")
+    assert job["status"] == "failed"
+    assert job["last_error"] == "Lease expired after 2 attempts"
+
+
+def test_stale_worker_cannot_update_reclaimed_job(job_queue):
+    """Test that a worker whose lease expired can neither complete nor fail the new run."""
+    job_queue.enqueue("process_episode", "ep1")
+    stale = job_queue.claim("cpu", "w1")
+
+    with patch("app.services.job_queue.settings") as mock_settings:
+        mock_settings.JOB_LEASE_SECONDS = -1
+        mock_settings.JOB_RETRY_BASE_SECONDS = 0
+        job_queue.claim("cpu", "w2")
+        with pytest.raises(LeaseLostError):
+            job_queue.complete(stale)
+        with pytest.raises(LeaseLostError):
+            job_queue.fail(stale, "boom")
+
+    [job] = job_queue.list_jobs("ep1")
+    assert (job["status"], job["locked_by"], job["last_error"]) == ("running", "w2", None)
+
+
+def test_stats(job_queue):
+    """Test queue depth counts."""
+    job_queue.enqueue("process_episode", "ep1")
+    job_queue.enqueue("process_episode", "ep2")
+    job = job_queue.claim("cpu", "w")
+    job_queue.complete(job)
+
+    stats = job_queue.stats()
+
+    assert stats == [{"resource": "cpu", "kind": "process_episode", "status": "queued", "count": 1}]
+
+
+def test_delayed_job_waits(job_queue):
+    """Test that a job enqueued with a delay is not claimed before it is due."""
+    job_queue.enqueue("poll_highlight_batch", None, {"batch_id": "b1"}, delay_seconds=60)
+    assert job_queue.claim("io", "w") is None
+
+    job_queue.enqueue("poll_highlight_batch", None, {"batch_id": "b2"})
+    assert job_queue.claim("io", "w")["payload"] == {"batch_id": "b2"}
@@ -0,0 +1,62 @@
+"""Tests for incremental JSON array parsing."""
+from app.services.json_stream import JSONObjectStream
+
+
+def feed_in_chunks(text, size):
+    """Feed text a few characters at a time, noting when each item arrives."""
+    parser = JSONObjectStream()
+    arrivals = []
+    for i in range(0, len(text), size):
+        for item in parser.feed(text[i:i + size]):
+            arrivals.append((i + size, item))
+    return arrivals
+
+
+def test_items_are_emitted_as_they_close():
+    """Test that each item comes out as soon as its closing brace arrives."""
+    text = '{"highlights": [{"start_segment": 1, "end_segment": 2}, {"start_segment": 7}]}'
+
+    arrivals = feed_in_chunks(text, 1)
+
+    assert [item for _, item in arrivals] == [
+        {"start_segment": 1, "end_segment": 2},
+        {"start_segment": 7},
+    ]
+    assert arrivals[0][0] == text.index("}") + 1
+    assert arrivals[1][0] < len(text)
+
+
+def test_strings_nesting_and_prose():
+    """Test that brackets in strings, nested objects and surrounding prose are handled."""
+    text = (
+        'Here are the "best" moments:\n'
+        '[{"description": "he says \\"}]{[\\" and laughs", "meta": {"tags": ["a", "b"]}},\n'
+        ' {"description": "second"}]\nHope this helps!'
+    )
+
+    items = [item for _, item in feed_in_chunks(text, 5)]
+
+    assert items == [
+        {"description": 'he says "}]{[" and laughs', "meta": {"tags": ["a", "b"]}},
+        {"description": "second"},
+    ]
+
+
+def test_invalid_items_are_skipped():
+    """Test that a malformed item does not stop the ones after it."""
+    parser = JSONObjectStream()
+
+    items = parser.feed('[{"start_segment": 1,}, {"start_segment": 2}]')
+
+    assert items == [{"start_segment": 2}]
+
+
+def test_cut_off_item_is_truncated():
+    """Test that output ending inside an item is reported as truncated."""
+    parser = JSONObjectStream()
+
+    parser.feed('{"highlights": [{"start_segment": 1}, {"start_')
+    assert parser.truncated
+
+    parser.feed('segment": 2}]}')
+    assert not parser.truncated
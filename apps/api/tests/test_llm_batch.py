@@ -0,0 +1,225 @@
+"""Tests for batch highlight detection."""
+import json
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import Mock, patch
+
+from app.services.episode_service import EpisodeService
+from app.core.config import settings
+from app.services.llm_batch import LocalBatchProvider, OpenAIBatchProvider, longest_lines, split_batches
+
+
+def test_longest_lines_is_deterministic():
+    """Test that the local answer picks the longest lines as ranges within the transcript."""
+    transcript = "Speakers: S0=Ana\n[4] S0: curta\n[5] S0: uma frase bem mais longa\n[6] S0: media frase"
+
+    highlights = longest_lines(transcript, count=2)
+
+    assert highlights == longest_lines(transcript, count=2)
+    assert [(h['start_segment'], h['end_segment']) for h in highlights] == [(5, 6), (6, 6)]
+
+
+@pytest.mark.asyncio
+async def test_local_batch_completes_after_delay(tmp_path):
+    """Test that a local batch is in progress until its delay passes, then answers every request."""
+    body = {"messages": [
+        {"role": "system", "content": "system"},
+        {"role": "user", "content": "Transcript:\n[0] S0: olá\n[1] S0: uma resposta longa"},
+        {"role": "user", "content": "Find highlights"},
+    ]}
+    waiting = LocalBatchProvider(str(tmp_path), delay_seconds=3600)
+    batch_id = await waiting.submit([("r0", body), ("r1", body)])
+    assert await waiting.status(batch_id) == "in_progress"
+
+    provider = LocalBatchProvider(str(tmp_path), delay_seconds=0)
+    assert await provider.status(batch_id) == "completed"
+    assert await provider.status("local_missing") == "failed"
+
+    results = await provider.results(batch_id)
+    assert set(results) == {"r0", "r1"}
+    highlights = json.loads(results["r0"].content)["highlights"]
+    assert [(h["start_segment"], h["end_segment"]) for h in highlights] == [(0, 1), (1, 1)]
+    assert results["r0"].input_tokens > 0
+
+
+def test_openai_batch_lines_are_parsed():
+    """Test that batch output lines give content and usage, and failed lines an error."""
+    ok = OpenAIBatchProvider._result({
+        "custom_id": "r0",
+        "response": {"status_code": 200, "body": {
+            "choices": [{"message": {"content": '{"highlights": []}'}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 30,
+                      "prompt_tokens_details": {"cached_tokens": 512}},
+        }},
+    })
+    failed = OpenAIBatchProvider._result({
+        "custom_id": "r1",
+        "response": {"status_code": 400, "body": {"error": {"message": "context too long"}}},
+    })
+
+    assert (ok.content, ok.input_tokens, ok.cached_input_tokens, ok.output_tokens) == (
+        '{"highlights": []}', 900, 512, 30,
+    )
+    assert failed.error == "context too long"
+
+
+def test_split_batches_by_count_and_size():
+    """Test that a batch ends when either its request count or its size would go over."""
+    requests = [(f"r{i}", {"text": "x" * 1000}) for i in range(10)]
+
+    assert [len(b) for b in split_batches(requests, 4, 10 ** 9)] == [4, 4, 2]
+    assert [len(b) for b in split_batches(requests, 100, 3000)] == [2] * 5
+    # An oversized request still goes out, alone
+    assert [len(b) for b in split_batches(requests, 100, 10)] == [1] * 10
+
+
+@pytest.fixture
+def batch_env(tmp_path):
+    """Episode service over mocked tables, with two transcribed episodes, two prompts and local batches."""
+    episode_service = EpisodeService()
+    segments = {
+        ep: [
+            {'id': f'{ep}-seg-{i}', 'start_s': i * 10.0, 'end_s': i * 10.0 + 10.0,
+             'text': 'palavra ' * (i + 1), 'speakers': ['Ana']}
+            for i in range(8)
+        ]
+        for ep in ('ep-1', 'ep-2')
+    }
+    prompts = [
+        {'id': 'p-funny', 'name': 'funny', 'template_text': 'Funny: {transcript}'},
+        {'id': 'p-deep', 'name': 'deep', 'template_text': 'Deep: {transcript}'},
+    ]
+    env = SimpleNamespace(service=episode_service, tables={}, batches={}, stored=[])
+
+    def table(name):
+        return env.tables.setdefault(name, Mock(name=name))
+
+    async def get_segments(episode_id):
+        return segments[episode_id]
+
+    def insert_highlights(rows):
+        env.stored.extend(rows)
+        return Mock(execute=Mock(return_value=Mock(data=[{'id': f'h-{i}'} for i, _ in enumerate(rows)])))
+
+    def insert_batch(row):
+        batch_id = f'batch-{len(env.batches) + 1}'
+        env.batches[batch_id] = {**row, 'id': batch_id, 'provider_batch_id': None,
+                                 'created_at': '2026-01-01T00:00:00+00:00'}
+        return Mock(execute=Mock(return_value=Mock(data=[dict(env.batches[batch_id])])))
+
+    def update_batch(values):
+        filters = {}
+
+        def eq(column, value):
+            filters[column] = value
+            return query
+
+        def execute():
+            matched = [b for b in env.batches.values() if all(b[c] == v for c, v in filters.items())]
+            for batch in matched:
+                batch.update(values)
+            return Mock(data=[dict(b) for b in matched])
+
+        query = Mock(eq=Mock(side_effect=eq), execute=Mock(side_effect=execute))
+        return query
+
+    with patch('app.services.episode_service.supabase') as mock_supabase, \
+            patch('app.services.llm_service.llm_metrics') as mock_metrics, \
+            patch.object(episode_service, 'get_segments', side_effect=get_segments), \
+            patch('app.services.llm_batch.settings') as batch_settings:
+        batch_settings.LLM_LOCAL_BATCH_DIR = str(tmp_path)
+        batch_settings.LLM_LOCAL_BATCH_SECONDS = 0
+        mock_supabase.table.side_effect = table
+        table('prompts').select.return_value.in_.return_value.execute.return_value.data = prompts
+        table('llm_batches').select.return_value.like.return_value.execute.side_effect = lambda: Mock(
+            data=[dict(b) for b in env.batches.values()]
+        )
+        table('llm_batches').select.return_value.eq.return_value.execute.side_effect = lambda: Mock(
+            data=[dict(b) for b in env.batches.values()]
+        )
+        table('llm_batches').insert.side_effect = insert_batch
+        table('llm_batches').update.side_effect = update_batch
+        table('highlight_runs').select.return_value.eq.return_value.execute.return_value.data = []
+        table('highlights').insert.side_effect = insert_highlights
+        env.metrics = mock_metrics
+        yield env
+
+
+@pytest.mark.asyncio
+async def test_batch_is_submitted_polled_and_ingested(batch_env):
+    """Test the whole batch flow offline with the local provider."""
+    [batch] = await batch_env.service.submit_highlight_batch(
+        ['ep-1', 'ep-2'], ['p-funny', 'p-deep'], provider='local', submission_key='job-1'
+    )
+    assert batch['request_count'] == 4
+    assert (batch['status'], batch['submission_key']) == ('in_progress', 'job-1:0')
+    assert {(i['episode_id'], i['prompt_id']) for i in batch['items'].values()} == {
+        ('ep-1', 'p-funny'), ('ep-1', 'p-deep'), ('ep-2', 'p-funny'), ('ep-2', 'p-deep'),
+    }
+
+    assert await batch_env.service.poll_highlight_batch('batch-1') is True
+
+    # The longest lines are the last ones
+    assert len(batch_env.stored) == 4 * 2
+    assert {(h['episode_id'], h['start_s'], h['end_s']) for h in batch_env.stored} >= {('ep-1', 50.0, 70.0)}
+    runs = batch_env.tables['highlight_runs']
+    assert runs.upsert.call_count == 4
+    run = runs.upsert.call_args.args[0]
+    assert run['batch_id'] == 'batch-1' and run['status'] == 'completed'
+    batch = batch_env.batches['batch-1']
+    assert batch['status'] == 'completed'
+    assert batch['highlights_count'] == 8 and batch['failed_requests'] == 0
+    calls = [c.args[0] for c in batch_env.metrics.record.call_args_list]
+    assert len(calls) == 4 and all(c.batch for c in calls)
+
+
+@pytest.mark.asyncio
+async def test_batch_submission_is_retried_once(batch_env):
+    """Test that a retried submission reuses its recorded batch and submits it only if needed."""
+    llm_service = batch_env.service.llm_service
+    with patch.object(llm_service, 'submit_batch', side_effect=RuntimeError('upload failed')):
+        with pytest.raises(RuntimeError):
+            await batch_env.service.submit_highlight_batch(['ep-1'], ['p-funny'], 'local', submission_key='job-1')
+    assert batch_env.batches['batch-1']['status'] == 'failed'
+
+    [batch] = await batch_env.service.submit_highlight_batch(['ep-1'], ['p-funny'], 'local', submission_key='job-1')
+    with patch.object(llm_service, 'submit_batch') as submit:
+        [again] = await batch_env.service.submit_highlight_batch(['ep-1'], ['p-funny'], 'local', submission_key='job-1')
+
+    submit.assert_not_called()
+    assert batch_env.tables['llm_batches'].insert.call_count == 1
+    assert batch['status'] == 'in_progress' and batch['error'] is None
+    assert again['provider_batch_id'] == batch['provider_batch_id']
+
+
+@pytest.mark.asyncio
+async def test_interrupted_ingest_resumes(batch_env):
+    """Test that an episode and prompt ingested before an interruption is not stored again."""
+    await batch_env.service.submit_highlight_batch(
+        ['ep-1', 'ep-2'], ['p-funny', 'p-deep'], provider='local', submission_key='job-1'
+    )
+    batch_env.batches['batch-1']['status'] = 'ingesting'
+    batch_env.tables['highlight_runs'].select.return_value.eq.return_value.execute.return_value.data = [
+        {'episode_id': 'ep-1', 'prompt_id': 'p-funny', 'highlights_count': 2},
+    ]
+
+    assert await batch_env.service.poll_highlight_batch('batch-1') is True
+
+    assert len(batch_env.stored) == 3 * 2
+    assert batch_env.tables['highlight_runs'].upsert.call_count == 3
+    assert batch_env.batches['batch-1']['highlights_count'] == 8
+
+
+@pytest.mark.asyncio
+async def test_large_submission_is_split_by_size(batch_env):
+    """Test that requests over the size budget are spread over several batches."""
+    with patch.object(settings, 'LLM_BATCH_MAX_MB', 0.001):
+        batches = await batch_env.service.submit_highlight_batch(
+            ['ep-1', 'ep-2'], ['p-funny', 'p-deep'], provider='local', submission_key='job-1'
+        )
+
+    assert len(batches) == 4
+    assert [b['submission_key'] for b in batches] == [f'job-1:{n}' for n in range(4)]
+    assert sum(b['request_count'] for b in batches) == 4
+    assert len({b['provider_batch_id'] for b in batches}) == 4
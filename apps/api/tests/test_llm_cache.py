@@ -0,0 +1,52 @@
+"""Tests for the LLM response cache."""
+import time
+
+import pytest
+
+from app.services.llm_cache import LLMCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a cache limited to 200 bytes."""
+    return LLMCache(str(tmp_path / "llm.sqlite3"), max_bytes=200)
+
+
+def test_key_covers_every_input():
+    """Test that any change to the request inputs changes the key."""
+    base = LLMCache.key("openai", "gpt-4o-mini", 0.7, "system", "prompt")
+
+    assert base == LLMCache.key("openai", "gpt-4o-mini", 0.7, "system", "prompt")
+    assert base != LLMCache.key("anthropic", "gpt-4o-mini", 0.7, "system", "prompt")
+    assert base != LLMCache.key("openai", "gpt-4o", 0.7, "system", "prompt")
+    assert base != LLMCache.key("openai", "gpt-4o-mini", 0.0, "system", "prompt")
+    assert base != LLMCache.key("openai", "gpt-4o-mini", 0.7, "other", "prompt")
+    assert base != LLMCache.key("openai", "gpt-4o-mini", 0.7, "system", "prompt 2")
+
+
+def test_get_put_and_stats(cache):
+    """Test a miss, a stored completion, a hit, and the counters."""
+    assert cache.get("k") is None
+    cache.put("k", "openai", "gpt-4o-mini", {"content": "[]"})
+
+    assert cache.get("k") == {"content": "[]"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["models"][0]["hits"] == 1
+
+
+def test_evicts_least_recently_used(cache):
+    """Test that going over the size limit drops the least recently used entries."""
+    for key in ("a", "b", "c"):
+        cache.put(key, "openai", "m", {"content": "x" * 50})  # 65 bytes stored
+        time.sleep(0.01)
+    cache.get("a")  # Now the most recently used
+    time.sleep(0.01)
+    cache.put("d", "openai", "m", {"content": "x" * 50})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+    assert cache.stats()["used_bytes"] <= 200
+    assert cache.stats()["evictions"] >= 1
@@ -0,0 +1,96 @@
+"""Tests for LLM call accounting."""
+import pytest
+from unittest.mock import patch
+
+from app.services.llm_metrics import LLMCall, LLMMetrics, call_labels, estimate_cost
+
+
+@pytest.fixture
+def settings():
+    """Prices for one model, and calls stored through a mocked database."""
+    with patch('app.services.llm_metrics.settings') as mock_settings:
+        mock_settings.LLM_PRICES = {"openai:small": {"input": 1.0, "cached_input": 0.5, "output": 4.0}}
+        mock_settings.LLM_METRICS_WINDOW = 100
+        mock_settings.LLM_CALL_LOGGING = True
+        yield mock_settings
+
+
+def test_estimate_cost(settings):
+    """Test that cached input is billed at its own price."""
+    assert estimate_cost("openai", "small", 1_000_000, 400_000, 250_000) == pytest.approx(0.6 + 0.2 + 1.0)
+    assert estimate_cost("openai", "unpriced", 1000, 0, 1000) is None
+
+
+def test_snapshot_totals_and_percentiles(settings):
+    """Test per-model totals, error rate and latency percentiles."""
+    metrics = LLMMetrics()
+
+    with patch('app.services.llm_metrics.supabase'):
+        for latency in range(100, 1100, 100):
+            metrics.record(LLMCall("openai", "small", input_tokens=1000, output_tokens=100,
+                                   latency_ms=latency, first_token_ms=latency // 2, retries=1))
+        metrics.record(LLMCall("openai", "small", status="error", latency_ms=50))
+        metrics.record(LLMCall("openai", "small", status="cached", highlights_count=3))
+        metrics.flush()
+
+    [model] = metrics.snapshot()
+    assert (model["calls"], model["errors"], model["cached"], model["retries"]) == (12, 1, 1, 10)
+    assert model["error_rate"] == pytest.approx(1 / 11)
+    assert model["input_tokens"] == 10_000
+    assert model["cost_usd"] == pytest.approx(10 * (1000 * 1.0 + 100 * 4.0) / 1_000_000)
+    assert model["latency_p50_ms"] == 500
+    assert model["latency_p95_ms"] == 1000
+    assert model["first_token_p50_ms"] == 300
+
+
+def test_calls_are_stored_with_labels(settings):
+    """Test that stored rows carry the episode and prompt they were made for."""
+    metrics = LLMMetrics()
+
+    with patch('app.services.llm_metrics.supabase') as mock_supabase:
+        with call_labels(episode_id="ep-1", prompt_id="p-1"):
+            metrics.record(LLMCall("openai", "small", input_tokens=10))
+        metrics.record(LLMCall("openai", "small"))
+        metrics.flush()
+
+    first, second = [row for c in mock_supabase.table.return_value.insert.call_args_list for row in c.args[0]]
+    assert (first["episode_id"], first["prompt_id"]) == ("ep-1", "p-1")
+    assert first["cost_usd"] == pytest.approx(10 / 1_000_000)
+    assert second["episode_id"] is None
+
+
+def test_failed_store_does_not_affect_recording(settings):
+    """Test that a database error is logged by the writer and later calls are still stored."""
+    metrics = LLMMetrics()
+
+    with patch('app.services.llm_metrics.supabase') as mock_supabase:
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.side_effect = [RuntimeError("down"), None]
+        metrics.record(LLMCall("openai", "small"))
+        metrics.flush()
+        metrics.record(LLMCall("openai", "small"))
+        metrics.flush()
+
+    assert insert.call_count == 2
+    assert metrics.snapshot()[0]["calls"] == 2
+
+
+def test_episode_summary_groups_by_prompt(settings):
+    """Test the per-episode summary of stored calls."""
+    base = {"retries": 0, "parse_failures": 0, "input_tokens": 100, "cached_input_tokens": 0,
+            "output_tokens": 10, "cost_usd": 0.01}
+    rows = [
+        {**base, "prompt_id": "p-1", "status": "ok", "latency_ms": 1000},
+        {**base, "prompt_id": "p-1", "status": "cached", "latency_ms": 0},
+        {**base, "prompt_id": "p-2", "status": "error", "latency_ms": 3000, "retries": 2},
+    ]
+    metrics = LLMMetrics()
+
+    with patch('app.services.llm_metrics.supabase') as mock_supabase:
+        mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = rows
+        summary = metrics.episode_summary("ep-1")
+
+    assert (summary["calls"], summary["errors"], summary["cached"], summary["retries"]) == (3, 1, 1, 2)
+    assert summary["cost_usd"] == pytest.approx(0.03)
+    assert summary["latency_p95_ms"] == 3000
+    assert {p["prompt_id"]: p["calls"] for p in summary["prompts"]} == {"p-1": 2, "p-2": 1}
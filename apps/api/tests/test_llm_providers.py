@@ -0,0 +1,173 @@
+"""Tests for LLM providers."""
+import asyncio
+import time
+
+import pytest
+from unittest.mock import patch
+
+from app.services.llm_providers import LLMProvider, LocalProvider, LocalProviderError
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter, is_retryable
+
+TRANSCRIPT = "Speakers: S0=Ana\n[0] S0: olá\n[1] S0: uma resposta bem longa\n[2] S0: curta"
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    """Keep call accounting in memory."""
+    with patch('app.services.llm_service.llm_metrics') as mock_metrics:
+        yield mock_metrics
+
+
+@pytest.fixture
+def llm_service():
+    """Create LLM service instance with a fast local provider."""
+    service = LLMService()
+    service.register_provider(LocalProvider(latency_ms=0, stream_ms=0, error_rate=0))
+    return service
+
+
+@pytest.mark.asyncio
+async def test_local_provider_answers_without_keys(llm_service):
+    """Test that detection runs on the local provider and counts cached prefix tokens."""
+    usage = {}
+    with patch('app.services.llm_service.settings') as mock_settings:
+        mock_settings.LLM_CACHE_ENABLED = False
+        mock_settings.LLM_PROMPT_CACHING = False
+        first = await llm_service.detect_highlights(TRANSCRIPT, "Find: {transcript}", provider="local",
+                                                    usage=usage)
+        second = await llm_service.detect_highlights(TRANSCRIPT, "Other: {transcript}", provider="local",
+                                                     usage=usage)
+
+    assert first == second
+    assert [(h['start_segment'], h['end_segment']) for h in first] == [(0, 1), (1, 2), (2, 2)]
+    assert usage['calls'] == 2
+    assert 0 < usage['cached_input_tokens'] < usage['input_tokens']
+
+
+@pytest.mark.asyncio
+async def test_local_provider_injects_errors_reproducibly():
+    """Test that failures depend only on the seed, request and attempt, and are retryable."""
+    async def attempts(provider):
+        results = []
+        for i in range(20):
+            request = provider.request("local", f"[0] S0: frase {i}", "Find")
+            for _ in range(3):
+                try:
+                    stream = await provider.create(request)
+                    await stream.aclose()
+                    results.append('ok')
+                except LocalProviderError as e:
+                    assert is_retryable(e)
+                    results.append('error')
+        return results
+
+    first = await attempts(LocalProvider(latency_ms=0, stream_ms=0, error_rate=0.5, seed=7))
+    again = await attempts(LocalProvider(latency_ms=0, stream_ms=0, error_rate=0.5, seed=7))
+    other = await attempts(LocalProvider(latency_ms=0, stream_ms=0, error_rate=0.5, seed=8))
+
+    assert first == again
+    assert first != other
+    assert 'ok' in first and 'error' in first
+
+
+@pytest.mark.asyncio
+async def test_local_provider_state_is_bounded():
+    """Test that a long run does not keep state for every request it has seen."""
+    provider = LocalProvider(latency_ms=0, stream_ms=0, error_rate=0.5, seed=7)
+    provider.MAX_TRACKED = 5
+
+    for i in range(50):
+        request = provider.request("local", f"[0] S0: frase {i}", "Find")
+        for _ in range(10):
+            try:
+                stream = await provider.create(request)
+            except LocalProviderError:
+                continue
+            async for _ in stream:
+                pass
+            break
+
+    assert len(provider._attempts) <= 5
+    assert len(provider._prefixes) == 5
+
+
+def test_unknown_provider_is_rejected(llm_service):
+    """Test that only registered providers can be used."""
+    with pytest.raises(ValueError, match="Unknown provider: mistral"):
+        llm_service.provider("mistral")
+    assert llm_service.default_model("local") == "local"
+
+
+@pytest.mark.asyncio
+async def test_streams_hold_their_concurrency_slot(llm_service):
+    """Test that LLM_MAX_CONCURRENCY bounds calls until their stream is read."""
+    llm_service.register_provider(LocalProvider(latency_ms=0, stream_ms=100, error_rate=0))
+    with patch('app.services.llm_service.settings') as mock_settings, \
+            patch('app.services.llm_service.rate_limiter', RateLimiter()), \
+            patch('app.services.rate_limiter.settings') as limiter_settings:
+        mock_settings.LLM_CACHE_ENABLED = False
+        mock_settings.LLM_PROMPT_CACHING = False
+        limiter_settings.LLM_MAX_CONCURRENCY = 1
+        limiter_settings.LLM_RATE_LIMITS = {}
+        limiter_settings.LLM_DEFAULT_RPM = 10000
+        limiter_settings.LLM_DEFAULT_TPM = 10000000
+        started = time.monotonic()
+        await asyncio.gather(*(
+            llm_service.detect_highlights(f"[0] S0: frase {i}", "Find: {transcript}", provider="local")
+            for i in range(4)
+        ))
+
+    # Each stream takes at least half of stream_ms, one at a time
+    assert time.monotonic() - started >= 4 * 0.05
+
+
+class FailingStreamProvider(LocalProvider):
+    """Local provider whose first stream fails before its first text."""
+
+    failures = 1
+
+    async def create(self, request):
+        stream = await super().create(request)
+        if not self.failures:
+            return stream
+        self.failures -= 1
+        await stream.aclose()
+
+        async def failing():
+            raise LocalProviderError("Stream reset")
+            yield
+
+        return failing()
+
+
+@pytest.mark.asyncio
+async def test_stream_errors_before_any_highlight_are_retried(llm_service):
+    """Test that an error while reading the stream is retried if nothing was emitted yet."""
+    llm_service.register_provider(FailingStreamProvider(latency_ms=0, stream_ms=0, error_rate=0))
+    emitted = []
+
+    async def on_highlight(highlight):
+        emitted.append(highlight)
+
+    with patch('app.services.llm_service.settings') as mock_settings, \
+            patch('app.services.rate_limiter.backoff_delay', return_value=0):
+        mock_settings.LLM_CACHE_ENABLED = False
+        mock_settings.LLM_PROMPT_CACHING = False
+        highlights = await llm_service.detect_highlights(TRANSCRIPT, "Find: {transcript}", provider="local",
+                                                         on_highlight=on_highlight)
+
+    assert len(highlights) == 3
+    assert emitted == highlights
+
+
+def test_provider_must_implement_the_api():
+    """Test that a provider missing part of the interface cannot be created."""
+    class Incomplete(LLMProvider):
+        name = "incomplete"
+
+        def request(self, model, transcript, instructions):
+            return {}
+
+    with pytest.raises(TypeError, match="abstract"):
+        Incomplete()
@@ -1,10 +1,33 @@
 """Tests for LLM service."""
+import asyncio
+from types import SimpleNamespace
+
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 from app.services.llm_service import LLMService
 
 
+async def anthropic_stream(text, input_tokens=100, output_tokens=20, cache_creation=0, cache_read=0,
+                           chunk_size=8, delay=0.0):
+    """Stand-in for an Anthropic message stream sending ``text`` in small deltas."""
+    usage = SimpleNamespace(input_tokens=input_tokens, cache_creation_input_tokens=cache_creation,
+                            cache_read_input_tokens=cache_read)
+    yield SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage))
+    for i in range(0, len(text), chunk_size):
+        await asyncio.sleep(delay)
+        yield SimpleNamespace(type="content_block_delta",
+                              delta=SimpleNamespace(type="text_delta", text=text[i:i + chunk_size]))
+    yield SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=output_tokens))
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    """Keep call accounting in memory."""
+    with patch('app.services.llm_service.llm_metrics') as mock_metrics:
+        yield mock_metrics
+
+
 @pytest.fixture
 def llm_service():
     """Create LLM service instance."""
@@ -14,37 +37,225 @@ def llm_service():
         return LLMService()
 
 
-def test_time_to_seconds(llm_service):
-    """Test time string to seconds conversion."""
-    assert llm_service._time_to_seconds("00:01:30") == 90.0
-    assert llm_service._time_to_seconds("01:00") == 60.0
-    assert llm_service._time_to_seconds("30") == 30.0
-    assert llm_service._time_to_seconds("01:30:45") == 5445.0
-
-
 def test_parse_highlights(llm_service):
-    """Test parsing highlights from LLM response."""
+    """Test parsing segment ranges from LLM response."""
     raw_highlights = [
-        {
-            "start_time": "00:01:00",
-            "end_time": "00:02:00",
-            "transcript": "This is a test highlight",
-            "description": "Test description",
-        },
-        {
-            "start_time": "00:05:30",
-            "end_time": "00:06:00",
-            "transcript": "Another highlight",
-            "description": "Another description",
-        },
+        {"start_segment": 12, "end_segment": 15, "description": "Test description"},
+        {"start_segment": "40", "description": "Single segment"},
+        {"start_segment": 9, "end_segment": 3, "description": "Backwards"},
+        {"start_time": "00:01:00", "end_time": "00:02:00", "description": "Old format"},
     ]
     
     parsed = llm_service._parse_highlights(raw_highlights)
     
-    assert len(parsed) == 2
-    assert parsed[0]['start_s'] == 60.0
-    assert parsed[0]['end_s'] == 120.0
-    assert parsed[0]['transcript'] == "This is a test highlight"
-    assert parsed[1]['start_s'] == 330.0
-    assert parsed[1]['end_s'] == 360.0
+    assert parsed == [
+        {'start_segment': 12, 'end_segment': 15, 'description': 'Test description'},
+        {'start_segment': 40, 'end_segment': 40, 'description': 'Single segment'},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_detect_highlights_windowed(llm_service):
+    """Test that windows run concurrently and overlapping finds are merged."""
+    segments = [
+        {'start_s': i * 10.0, 'end_s': i * 10.0 + 10.0, 'text': ' '.join(['palavra'] * 40)}
+        for i in range(100)
+    ]
+
+    def detect(transcript, prompt_template, provider, model, usage, on_highlight):
+        # Every window reports the same moment plus one inside itself
+        first = int(transcript[1:transcript.index(']')])
+        return [
+            {'start_segment': 20, 'end_segment': 23, 'description': 'same'},
+            {'start_segment': first, 'end_segment': first, 'description': 'own'},
+        ]
+
+    with patch('app.services.llm_service.settings') as mock_settings, \
+            patch.object(llm_service, 'detect_highlights', AsyncMock(side_effect=detect)) as mock_detect:
+        mock_settings.LLM_WINDOW_MAX_TOKENS = 1000
+        mock_settings.LLM_WINDOW_OVERLAP_TOKENS = 100
+        mock_settings.LLM_WINDOW_CONCURRENCY = 4
+        mock_settings.HIGHLIGHT_MERGE_IOU = 0.5
+        highlights = await llm_service.detect_highlights_windowed(segments, "Find: {transcript}")
+
+    assert mock_detect.call_count > 1
+    assert [h['description'] for h in highlights].count('same') == 1
+    assert [h['start_s'] for h in highlights] == sorted(h['start_s'] for h in highlights)
+    same = next(h for h in highlights if h['description'] == 'same')
+    assert (same['start_s'], same['end_s']) == (200.0, 240.0)
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_is_served_from_cache(llm_service, tmp_path):
+    """Test that the same prompt over the same transcript calls the provider once."""
+    from app.services.llm_cache import LLMCache
+
+    text = '{"highlights": [{"start_segment": 6, "end_segment": 8, "description": "d"}]}'
+    llm_service.anthropic_client = Mock()
+    llm_service.anthropic_client.messages.create = AsyncMock(side_effect=lambda **_: anthropic_stream(text))
+
+    with patch('app.services.llm_service.llm_cache', LLMCache(str(tmp_path / 'llm.sqlite3'))), \
+            patch('app.services.llm_service.settings') as mock_settings:
+        mock_settings.LLM_CACHE_ENABLED = True
+        first = await llm_service.detect_highlights_anthropic("transcript", "Find: {transcript}")
+        second = await llm_service.detect_highlights_anthropic("transcript", "Find: {transcript}")
+        await llm_service.detect_highlights_anthropic("other transcript", "Find: {transcript}")
+
+    assert first == second == [{'start_segment': 6, 'end_segment': 8, 'description': 'd'}]
+    assert llm_service.anthropic_client.messages.create.await_count == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('text', [
+    '{"highlights": [{"start_segment": 6, "end_segment": 8}, {"start_segment": 9, "end_',
+    'Sorry, I cannot find any highlights.',
+])
+async def test_unparsed_response_is_not_cached(llm_service, tmp_path, text):
+    """Test that truncated responses and responses without a JSON array are asked again."""
+    from app.services.llm_cache import LLMCache
+
+    llm_service.anthropic_client = Mock()
+    llm_service.anthropic_client.messages.create = AsyncMock(side_effect=lambda **_: anthropic_stream(text))
+
+    with patch('app.services.llm_service.llm_cache', LLMCache(str(tmp_path / 'llm.sqlite3'))), \
+            patch('app.services.llm_service.settings') as mock_settings:
+        mock_settings.LLM_CACHE_ENABLED = True
+        await llm_service.detect_highlights_anthropic("transcript", "Find: {transcript}")
+        await llm_service.detect_highlights_anthropic("transcript", "Find: {transcript}")
+
+    assert llm_service.anthropic_client.messages.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_transcript_is_a_cached_prefix(llm_service):
+    """Test that prompts share the transcript prefix and cache reads are counted."""
+    transcript = "[00:00:00] Ana: " + "palavra " * 2000
+    order = []
+
+    async def create(**request):
+        warm = bool(order)
+        order.append(request["messages"][0]["content"])
+        stream = anthropic_stream("[]", input_tokens=50, output_tokens=10,
+                                  cache_creation=0 if warm else 5000, cache_read=5000 if warm else 0,
+                                  delay=0.01)
+        async for event in stream:
+            if event.type == "content_block_delta":
+                order.append("first text")
+            yield event
+
+    llm_service.anthropic_client = Mock()
+    llm_service.anthropic_client.messages.create = AsyncMock(side_effect=lambda **kw: create(**kw))
+    usage = {}
+
+    with patch('app.services.llm_service.settings') as mock_settings:
+        mock_settings.LLM_CACHE_ENABLED = False
+        mock_settings.LLM_PROMPT_CACHING = True
+        await asyncio.gather(*(
+            llm_service.detect_highlights_anthropic(transcript, f"Prompt {i}: {{transcript}}", usage=usage)
+            for i in range(3)
+        ))
+
+    # The first request warms the cache before the others are sent
+    assert order[1] == "first text"
+    assert order.count("first text") == 3
+    assert usage["calls"] == 3
+    assert usage["input_tokens"] == 3 * 5050
+    assert usage["cached_input_tokens"] == 2 * 5000
+
+
+@pytest.mark.asyncio
+async def test_anthropic_request_puts_instructions_after_transcript(llm_service):
+    """Test that the transcript is marked cacheable and the prompt follows it."""
+    llm_service.anthropic_client = Mock()
+    llm_service.anthropic_client.messages.create = AsyncMock(side_effect=lambda **_: anthropic_stream("[]"))
+
+    with patch('app.services.llm_service.settings') as mock_settings:
+        mock_settings.LLM_CACHE_ENABLED = False
+        await llm_service.detect_highlights_anthropic("the transcript", "Find jokes in {transcript}.")
+
+    request = llm_service.anthropic_client.messages.create.await_args.kwargs
+    assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert request["system"][0]["text"].endswith("the transcript")
+    instructions = request["messages"][0]["content"]
+    assert instructions.startswith("Find jokes in (the transcript above).")
+    assert "the transcript\n" not in instructions
+
+
+@pytest.mark.asyncio
+async def test_highlights_are_handed_on_while_streaming(llm_service):
+    """Test that each highlight reaches the callback before the response ends."""
+    text = ('{"highlights": [{"start_segment": 1, "end_segment": 3, "description": "a"}, '
+            '{"start_segment": 9, "end_segment": 9, "description": "b"}]}')
+    streamed = []
+    received = []
+
+    async def stream(**_):
+        async for event in anthropic_stream(text, chunk_size=4):
+            if event.type == "content_block_delta":
+                streamed.append(event.delta.text)
+            yield event
+
+    async def on_highlight(highlight):
+        received.append((highlight['description'], len("".join(streamed))))
+
+    llm_service.anthropic_client = Mock()
+    llm_service.anthropic_client.messages.create = AsyncMock(side_effect=lambda **kw: stream(**kw))
+    usage = {}
+
+    async def call(provider, model, reserve_tokens, request, stats=None, retryable=None):
+        return await request()
+
+    with patch('app.services.llm_service.settings') as mock_settings, \
+            patch('app.services.llm_service.rate_limiter') as mock_limiter:
+        mock_settings.LLM_CACHE_ENABLED = False
+        mock_limiter.call = call
+        highlights = await llm_service.detect_highlights_anthropic(
+            "the transcript", "{transcript}", usage=usage, on_highlight=on_highlight
+        )
+
+    assert [h['description'] for h in highlights] == ['a', 'b']
+    assert received[0][0] == 'a'
+    assert received[0][1] < len(text) - 20
+    assert usage == {'calls': 1, 'cached_calls': 0, 'input_tokens': 100,
+                     'cached_input_tokens': 0, 'output_tokens': 20}
+    mock_limiter.settle.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_calls_are_recorded(llm_service, metrics):
+    """Test that each call is recorded with its tokens, timings and parse failures."""
+    text = '[{"start_segment": 1, "end_segment": 2}, {"start_segment": "x"}, {"oops": }]'
+    llm_service.anthropic_client = Mock()
+    llm_service.anthropic_client.messages.create = AsyncMock(
+        side_effect=lambda **_: anthropic_stream(text, input_tokens=300, output_tokens=40, cache_read=200)
+    )
+
+    with patch('app.services.llm_service.settings') as mock_settings:
+        mock_settings.LLM_CACHE_ENABLED = False
+        mock_settings.LLM_PROMPT_CACHING = False
+        await llm_service.detect_highlights_anthropic("the transcript", "{transcript}")
+
+    call = metrics.record.call_args.args[0]
+    assert call.status == "ok"
+    assert call.estimated_input_tokens > 0
+    assert (call.input_tokens, call.cached_input_tokens, call.output_tokens) == (500, 200, 40)
+    assert call.first_token_ms is not None and call.latency_ms >= call.first_token_ms
+    assert call.highlights_count == 1
+    assert call.parse_failures == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_calls_are_recorded(llm_service, metrics):
+    """Test that a call that raises is recorded as an error."""
+    llm_service.anthropic_client = Mock()
+    llm_service.anthropic_client.messages.create = AsyncMock(side_effect=ValueError("bad request"))
+
+    with patch('app.services.llm_service.settings') as mock_settings:
+        mock_settings.LLM_CACHE_ENABLED = False
+        mock_settings.LLM_PROMPT_CACHING = False
+        with pytest.raises(ValueError):
+            await llm_service.detect_highlights_anthropic("the transcript", "{transcript}")
 
+    call = metrics.record.call_args.args[0]
+    assert call.status == "error"
+    assert call.error == "ValueError: bad request"
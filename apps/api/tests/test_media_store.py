@@ -0,0 +1,74 @@
+"""Tests for the media store."""
+import os
+import time
+
+import pytest
+
+from app.services.media_store import MediaStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a media store with a 100-byte quota."""
+    return MediaStore(str(tmp_path / "media"), quota_bytes=100)
+
+
+def write(store, kind, key, size):
+    """Write a file of ``size`` bytes and register it."""
+    path = store.path_for(kind, key, "bin")
+    path.write_bytes(b"x" * size)
+    return store.put(kind, key, str(path))
+
+
+def test_get_reuses_stored_file(store):
+    """Test that a stored file is found again and counted as a hit."""
+    path = write(store, "audio", "vid", 10)
+
+    assert store.get("audio", "vid") == path
+    assert store.get("audio", "other") is None
+    assert store.stats()["kinds"] == [{"kind": "audio", "files": 1, "size_bytes": 10, "hits": 1}]
+
+
+def test_evicts_least_recently_used(store):
+    """Test that going over quota deletes the least recently used file."""
+    old = write(store, "audio", "old", 40)
+    time.sleep(0.01)
+    recent = write(store, "audio", "recent", 40)
+    time.sleep(0.01)
+    store.get("audio", "old")  # Now the most recently used
+    write(store, "video", "new", 40)
+
+    assert os.path.exists(old)
+    assert not os.path.exists(recent)
+    assert store.get("audio", "recent") is None
+    assert store.stats()["used_bytes"] == 80
+
+
+def test_pinned_files_are_not_evicted(store):
+    """Test that files pinned by a job survive eviction until released."""
+    pinned = write(store, "audio", "pinned", 60)
+
+    with store.pinned([("audio", "pinned")], "job-1"):
+        write(store, "audio", "other", 60)
+        assert os.path.exists(pinned)
+        assert store.stats()["pinned_files"] == 1
+
+    write(store, "audio", "third", 30)
+    assert not os.path.exists(pinned)
+
+
+def test_put_file_is_content_addressed(store, tmp_path):
+    """Test that identical content is stored once under its hash."""
+    first = tmp_path / "a.mp4"
+    second = tmp_path / "b.mp4"
+    first.write_bytes(b"same")
+    second.write_bytes(b"same")
+
+    key_a, path_a = store.put_file("video", str(first))
+    key_b, path_b = store.put_file("video", str(second))
+
+    assert key_a == key_b
+    assert path_a == path_b
+    assert path_a.endswith(".mp4")
+    assert not second.exists()
+    assert store.stats()["files"] == 1
@@ -0,0 +1,181 @@
+"""Tests for the checkpointed processing pipeline."""
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock, patch
+
+import numpy as np
+import pytest
+
+from app.services.media_store import MediaStore
+from app.services.processing_pipeline import ProcessingPipeline
+
+
+@pytest.fixture
+def episode_service():
+    """Mocked episode service with in-memory episode state."""
+    service = Mock()
+    state = {'id': 'ep1', 'youtube_url': 'https://youtu.be/x', 'completed_stages': []}
+
+    async def get_episode(episode_id):
+        return dict(state)
+
+    async def update_episode(episode_id, data):
+        state.update(data)
+        return state
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def insert_segments(rows):
+        return [{**row, 'id': f"seg-{row['start_s']}"} for row in rows]
+
+    service.state = state
+    service.get_episode = get_episode
+    service.update_episode = update_episode
+    service._set_progress = noop
+    service._persist_speakers = noop
+    service._insert_segments = insert_segments
+    service.youtube_service.download_audio.return_value = '/tmp/ep1.webm'
+    service.transcription_service.format_segments.side_effect = lambda chunk: [
+        {'start_s': s['start'], 'end_s': s['end'], 'text': s['text'], 'confidence': 0.9}
+        for s in chunk['segments']
+    ]
+    service.diarization_service.diarize.return_value = {'speakers': []}
+    service.fingerprint_service.find_match.return_value = None
+    service.copy_processed_episode = AsyncMock(return_value=0)
+    service.diarization_service.assign_speakers_to_segments.side_effect = (
+        lambda segments, diarization: [{**s, 'speakers': []} for s in segments]
+    )
+    return service
+
+
+@pytest.fixture
+def pipeline(episode_service, tmp_path):
+    """Pipeline writing checkpoints to a temporary directory."""
+    with patch('app.services.processing_pipeline.settings') as mock_settings, \
+            patch('app.services.processing_pipeline.supabase'), \
+            patch('app.services.processing_pipeline.media_store', MediaStore(str(tmp_path / 'media'))), \
+            patch('app.services.processing_pipeline.fingerprint_wav', return_value=np.zeros(0, np.uint32)), \
+            patch('app.services.processing_pipeline.subprocess') as mock_subprocess:
+        # Stand in for ffmpeg by creating its output file
+        mock_subprocess.run.side_effect = lambda cmd, **kwargs: Path(cmd[-1]).touch()
+        mock_settings.PIPELINE_WORK_DIR = str(tmp_path)
+        mock_settings.TRANSCRIPTION_CHUNK_SECONDS = 600.0
+        mock_settings.AUDIO_INGEST_MODE = 'file'
+        yield ProcessingPipeline(episode_service)
+
+
+def chunk(index, start):
+    """A one-segment transcription chunk."""
+    return {
+        'index': index,
+        'progress': 1.0,
+        'segments': [{'start': start, 'end': start + 5.0, 'text': f'chunk {index}'}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_records_every_stage(pipeline, episode_service):
+    """Test a fresh run executes and records each checkpointed stage."""
+    episode_service.transcription_service.transcribe_chunks.return_value = iter(
+        [chunk(0, 0.0), chunk(1, 600.0)]
+    )
+
+    await pipeline.run('ep1', until='persist')
+
+    assert episode_service.state['completed_stages'] == [
+        'download', 'decode', 'fingerprint', 'transcribe', 'diarize', 'merge_speakers', 'persist'
+    ]
+    merge = json.loads((pipeline.work_dir('ep1') / 'merge_speakers.json').read_text())
+    assert [a['segment_id'] for a in merge['assignments']] == ['seg-0.0', 'seg-600.0']
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_completed_stages(pipeline, episode_service, tmp_path):
+    """Test that a rerun resumes transcription after the last checkpointed chunk."""
+    work_dir = pipeline.work_dir('ep1')
+    (work_dir / 'transcribe').mkdir(parents=True)
+    (tmp_path / 'ep1.webm').touch()
+    (tmp_path / 'ep1.wav').touch()
+    (work_dir / 'download.json').write_text(json.dumps({'path': str(tmp_path / 'ep1.webm')}))
+    (work_dir / 'decode.json').write_text(json.dumps({'path': str(tmp_path / 'ep1.wav')}))
+    (work_dir / 'transcribe' / 'chunk_00000.json').write_text(json.dumps({
+        'segments': [{'id': 'seg-0.0', 'start_s': 0.0, 'end_s': 5.0, 'text': 'chunk 0'}],
+        'raw': [{'start': 0.0, 'end': 5.0, 'text': 'chunk 0'}],
+    }))
+    episode_service.state['completed_stages'] = ['download', 'decode']
+    episode_service.transcription_service.transcribe_chunks.return_value = iter([chunk(1, 600.0)])
+
+    await pipeline.run('ep1', until='persist')
+
+    episode_service.youtube_service.download_audio.assert_not_called()
+    _, kwargs = episode_service.transcription_service.transcribe_chunks.call_args
+    assert kwargs['start_chunk'] == 1
+    transcribe = json.loads((work_dir / 'transcribe.json').read_text())
+    assert [s['id'] for s in transcribe['segments']] == ['seg-0.0', 'seg-600.0']
+
+
+@pytest.mark.asyncio
+async def test_uploaded_source_is_not_downloaded(pipeline, episode_service, tmp_path):
+    """Test that an uploaded file is decoded in place instead of downloaded."""
+    source = tmp_path / 'studio.wav'
+    source.touch()
+    episode_service.state.update(
+        youtube_url=None, source_type='upload', source_path=str(source), source_key='abc'
+    )
+
+    await pipeline.run('ep1', until='decode')
+
+    episode_service.youtube_service.download_audio.assert_not_called()
+    download = json.loads((pipeline.work_dir('ep1') / 'download.json').read_text())
+    decode = json.loads((pipeline.work_dir('ep1') / 'decode.json').read_text())
+    assert download['path'] == str(source)
+    assert decode['path'].endswith('abc.wav')
+
+
+@pytest.mark.asyncio
+async def test_matching_fingerprint_reuses_episode(pipeline, episode_service):
+    """Test that a re-uploaded recording copies results instead of transcribing."""
+    episode_service.fingerprint_service.find_match.return_value = {
+        'episode_id': 'ep0', 'offset_s': 1.5, 'bit_error_rate': 0.05,
+    }
+
+    await pipeline.run('ep1', until='persist')
+
+    episode_service.copy_processed_episode.assert_awaited_once_with('ep0', 'ep1', 1.5)
+    episode_service.transcription_service.transcribe_chunks.assert_not_called()
+    episode_service.diarization_service.diarize.assert_not_called()
+    persist = json.loads((pipeline.work_dir('ep1') / 'persist.json').read_text())
+    assert persist == {'reused_from': 'ep0'}
+
+
+@pytest.mark.asyncio
+async def test_streamed_download_skips_decode(pipeline, episode_service, tmp_path):
+    """Test that a streamed download's WAV is reused instead of decoding again."""
+    def stream_audio(url, episode_id):
+        wav_path = tmp_path / 'ep1.wav'
+        wav_path.touch()
+        return {'path': '/tmp/ep1.audio', 'wav_path': str(wav_path)}
+
+    episode_service.youtube_service.stream_audio.side_effect = stream_audio
+    with patch('app.services.processing_pipeline.settings') as mock_settings, \
+            patch('app.services.processing_pipeline.subprocess') as mock_subprocess:
+        mock_settings.AUDIO_INGEST_MODE = 'stream'
+        await pipeline.run('ep1', until='decode')
+
+    mock_subprocess.run.assert_not_called()
+    decode = json.loads((pipeline.work_dir('ep1') / 'decode.json').read_text())
+    assert decode['path'] == str(tmp_path / 'ep1.wav')
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_with_evicted_media_reruns(pipeline, episode_service, tmp_path):
+    """Test that a stage re-runs when the media its checkpoint names is gone."""
+    work_dir = pipeline.work_dir('ep1')
+    work_dir.mkdir(parents=True)
+    (work_dir / 'download.json').write_text(json.dumps({'path': str(tmp_path / 'evicted.webm')}))
+    episode_service.state['completed_stages'] = ['download']
+
+    await pipeline.run('ep1', until='download')
+
+    episode_service.youtube_service.download_audio.assert_called_once()
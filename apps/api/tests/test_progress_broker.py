@@ -0,0 +1,93 @@
+"""Tests for the progress event broker."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.progress_broker import ProgressBroker, format_sse
+
+
+def test_format_sse():
+    """Test events are framed as SSE messages with their ID."""
+    message = format_sse({'id': 7, 'type': 'progress', 'data': {'percent': 40}})
+
+    assert message == 'id: 7\nevent: progress\ndata: {"percent": 40}\n\n'
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_one_poller():
+    """Test that every subscriber of an episode gets each event from one query loop."""
+    broker = ProgressBroker(poll_interval=0.01)
+    published = [
+        [{'id': 11, 'type': 'progress', 'data': {'percent': 50}}],
+        [{'id': 12, 'type': 'segments', 'data': {'count': 200}}],
+    ]
+    fetches = []
+
+    def fetch(episode_id, after_id, limit=500):
+        fetches.append(after_id)
+        return published.pop(0) if published else []
+
+    async def take(n):
+        stream = broker.subscribe('ep1', heartbeat_s=1)
+        events = [await stream.__anext__() for _ in range(n)]
+        await stream.aclose()
+        return events
+
+    with patch.object(broker, '_fetch', side_effect=fetch), \
+            patch.object(broker, '_latest_id', return_value=10), \
+            patch.object(broker, '_maybe_prune'):
+        first, second = await asyncio.gather(take(2), take(2))
+        await asyncio.sleep(0.05)
+
+    assert [e['id'] for e in first] == [e['id'] for e in second] == [11, 12]
+    assert fetches[:2] == [10, 10]
+    assert broker._subscribers == {}
+    assert broker._pollers == {}
+
+
+@pytest.mark.asyncio
+async def test_subscribe_replays_after_last_event_id():
+    """Test that a reconnecting client first gets the events it missed."""
+    broker = ProgressBroker(poll_interval=10)
+    missed = [{'id': 4, 'type': 'progress', 'data': {}}, {'id': 5, 'type': 'progress', 'data': {}}]
+
+    with patch.object(broker, '_fetch', side_effect=lambda e, after, limit=500: missed if after == 3 else []), \
+            patch.object(broker, '_latest_id', return_value=5), \
+            patch.object(broker, '_maybe_prune'):
+        stream = broker.subscribe('ep1', last_event_id=3, heartbeat_s=0.01)
+        events = [await stream.__anext__() for _ in range(3)]
+        await stream.aclose()
+
+    assert [e and e['id'] for e in events] == [4, 5, None]
+
+
+@pytest.mark.asyncio
+async def test_poller_survives_errors_and_late_commits():
+    """Test that a failed query is retried and a row committed after a higher ID is still delivered once."""
+    broker = ProgressBroker(poll_interval=0.001)
+    rows = {
+        1: [],
+        2: RuntimeError('connection reset'),
+        3: [{'id': 12, 'type': 'progress', 'data': {}}],
+        # Row 11 commits after row 12 was delivered
+        4: [{'id': 11, 'type': 'segments', 'data': {}}, {'id': 12, 'type': 'progress', 'data': {}}],
+    }
+    polls = []
+
+    def fetch(episode_id, after_id, limit=500):
+        polls.append(after_id)
+        result = rows.get(len(polls), [])
+        if isinstance(result, Exception):
+            raise result
+        return [row for row in result if row['id'] > after_id]
+
+    with patch.object(broker, '_fetch', side_effect=fetch), \
+            patch.object(broker, '_latest_id', return_value=10), \
+            patch.object(broker, '_maybe_prune'):
+        stream = broker.subscribe('ep1', heartbeat_s=0.05)
+        events = [await stream.__anext__() for _ in range(3)]
+        await stream.aclose()
+
+    assert [e and e['id'] for e in events] == [12, 11, None]
+    assert polls[:4] == [10, 10, 10, 10]
@@ -0,0 +1,158 @@
+"""Tests for LLM rate limiting and retries."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.rate_limiter import RateLimiter, TokenBucket, backoff_delay, is_retryable
+
+
+class FakeClock:
+    """Clock that only moves when the code under test sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class StatusError(Exception):
+    """Stand-in for an SDK error carrying an HTTP status."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = type("Response", (), {"headers": headers})()
+
+
+@pytest.fixture
+def limits():
+    """Small limits and fast retries."""
+    with patch("app.services.rate_limiter.settings") as mock_settings:
+        mock_settings.LLM_RATE_LIMITS = {"openai:small": {"rpm": 60, "tpm": 6000}}
+        mock_settings.LLM_DEFAULT_RPM = 1000
+        mock_settings.LLM_DEFAULT_TPM = 100000
+        mock_settings.LLM_MAX_CONCURRENCY = 4
+        mock_settings.LLM_MAX_RETRIES = 3
+        mock_settings.LLM_RETRY_BASE_SECONDS = 1.0
+        mock_settings.LLM_RETRY_MAX_SECONDS = 8.0
+        yield mock_settings
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_requests():
+    """Test that a bucket allows a burst of its capacity, then its rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock)  # one per second
+
+    with patch("app.services.rate_limiter.asyncio.sleep", clock.sleep):
+        for _ in range(60):
+            await bucket.acquire()
+        assert clock.now == 0.0
+        await bucket.acquire()
+        await bucket.acquire()
+
+    assert clock.now == pytest.approx(2.0)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refund_and_oversized_request():
+    """Test that unused tokens come back and large requests are not starved."""
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock)  # ten per second
+
+    with patch("app.services.rate_limiter.asyncio.sleep", clock.sleep):
+        await bucket.acquire(500)
+        bucket.refund(400)
+        await bucket.acquire(500)
+        assert clock.now == 0.0
+        await bucket.acquire(1000)  # Larger than the bucket: waits for it to fill
+
+    assert clock.now == pytest.approx(60.0)
+    assert bucket.available < 0
+
+
+@pytest.mark.asyncio
+async def test_call_retries_transient_errors(limits):
+    """Test that 429 and 5xx are retried, honoring Retry-After."""
+    limiter = RateLimiter()
+    errors = [StatusError(429, retry_after=5), StatusError(503)]
+    delays = []
+
+    async def request():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    with patch("app.services.rate_limiter.asyncio.sleep", sleep):
+        assert await limiter.call("openai", "small", 10, request) == "ok"
+
+    assert len(delays) == 2
+    assert delays[0] >= 5
+
+
+@pytest.mark.asyncio
+async def test_call_does_not_retry_client_errors(limits):
+    """Test that a bad request fails at once."""
+    limiter = RateLimiter()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        await limiter.call("openai", "small", 10, request)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_call_caps_concurrency(limits):
+    """Test that no more than LLM_MAX_CONCURRENCY calls are in flight."""
+    limiter = RateLimiter()
+    in_flight = []
+    peak = []
+
+    async def request():
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return "ok"
+
+    await asyncio.gather(*(limiter.call("anthropic", "big", 10, request) for _ in range(10)))
+
+    assert max(peak) == 4
+
+
+def test_retryable_errors_and_backoff(limits):
+    """Test retry classification and the jittered backoff ceiling."""
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(500))
+    assert not is_retryable(StatusError(401))
+    assert all(0 <= backoff_delay(10) <= 8.0 for _ in range(100))
+
+
+@pytest.mark.asyncio
+async def test_settle_returns_unused_stream_reservation(limits):
+    """Test that a finished stream gives back the tokens it did not use."""
+    limiter = RateLimiter()
+
+    async def request():
+        return "stream"
+
+    await limiter.call("openai", "small", 5000, request)
+    _, tokens = limiter._limits("openai", "small")
+    assert tokens.available == pytest.approx(1000, abs=1)
+
+    limiter.settle("openai", "small", 5000, 1200)
+
+    assert tokens.available == pytest.approx(4800, abs=1)
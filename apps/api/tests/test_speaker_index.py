@@ -0,0 +1,87 @@
+"""Tests for speaker identity index."""
+from unittest.mock import patch
+
+import pytest
+
+from app.services.speaker_index import SpeakerIndex
+
+
+@pytest.fixture
+def db():
+    """Mock the database with a known_speakers table of two people."""
+    with patch('app.services.speaker_index.supabase') as mock_supabase:
+        mock_supabase.table.return_value.select.return_value.execute.return_value.data = [
+            {'id': 'host', 'name': 'Ana', 'embedding': [1.0, 0.0, 0.0], 'sample_count': 3},
+            {'id': 'cohost', 'name': 'Bruno', 'embedding': [0.0, 1.0, 0.0], 'sample_count': 1},
+        ]
+        yield mock_supabase
+
+
+@pytest.fixture
+def speaker_index(db):
+    """Create a speaker index loaded from the mocked known_speakers table."""
+    index = SpeakerIndex()
+    index.load()
+    return index
+
+
+def test_match_many(speaker_index):
+    """Test nearest-neighbour matching with a similarity threshold."""
+    matches = speaker_index.match_many(
+        [[0.9, 0.1, 0.0], [0.0, 0.0, 1.0]], threshold=0.75
+    )
+
+    assert matches[0]['name'] == 'Ana'
+    assert matches[0]['similarity'] > 0.9
+    assert matches[1] is None
+
+
+def test_confirm_updates_running_mean(speaker_index, db):
+    """Test that confirming an existing person moves the mean toward the sample."""
+    db.rpc.return_value.execute.return_value.data = [
+        {'id': 'cohost', 'name': 'Bruno', 'embedding': [0.0, 0.5, 0.5], 'sample_count': 2}
+    ]
+
+    known_id = speaker_index.confirm('Bruno', [0.0, 0.0, 1.0])
+
+    assert known_id == 'cohost'
+    db.rpc.assert_called_once_with(
+        'confirm_known_speaker', {'p_name': 'Bruno', 'p_embedding': [0.0, 0.0, 1.0]}
+    )
+    match = speaker_index.match([0.0, 1.0, 1.0], threshold=0.99)
+    assert match['name'] == 'Bruno'
+
+
+def test_confirm_adds_new_person(speaker_index, db):
+    """Test that confirming an unknown name adds it to the index."""
+    db.rpc.return_value.execute.return_value.data = [
+        {'id': 'guest', 'name': 'Carla', 'embedding': [0.0, 0.0, 1.0], 'sample_count': 1}
+    ]
+
+    known_id = speaker_index.confirm('Carla', [0.0, 0.0, 1.0])
+
+    assert known_id == 'guest'
+    assert speaker_index.get_name('guest') == 'Carla'
+    assert speaker_index.match([0.0, 0.1, 1.0])['name'] == 'Carla'
+
+
+def test_index_is_reloaded_after_ttl(speaker_index, db):
+    """Test that people confirmed by other processes are picked up once the index expires."""
+    db.table.return_value.select.return_value.execute.return_value.data = [
+        {'id': 'guest', 'name': 'Carla', 'embedding': [0.0, 0.0, 1.0], 'sample_count': 1},
+    ]
+    assert speaker_index.get_name('guest') is None
+
+    with patch('app.services.speaker_index.settings') as mock_settings:
+        mock_settings.SPEAKER_INDEX_TTL_SECONDS = 0
+        assert speaker_index.get_name('guest') == 'Carla'
+
+
+def test_retract_reloads_the_index(speaker_index, db):
+    """Test that taking a renamed speaker's sample back out refreshes the index."""
+    speaker_index.retract('cohost', [0.0, 1.0, 0.0])
+
+    db.rpc.assert_called_once_with(
+        'retract_known_speaker', {'p_id': 'cohost', 'p_embedding': [0.0, 1.0, 0.0]}
+    )
+    assert speaker_index._loaded_at is None
@@ -0,0 +1,91 @@
+"""Tests for transcript windowing and highlight merging."""
+from app.services.transcript_windows import (
+    build_windows,
+    estimate_tokens,
+    format_segment,
+    merge_highlights,
+    render_transcript,
+)
+
+
+def segments(count, words=20):
+    """Ten-second segments of ``words`` words each."""
+    return [
+        {"start_s": i * 10.0, "end_s": i * 10.0 + 10.0, "text": " ".join(["palavra"] * words),
+         "speakers": ["SPEAKER_00"]}
+        for i in range(count)
+    ]
+
+
+def test_format_segment():
+    """Test that lines carry the segment index models answer with, and speaker tags."""
+    line = format_segment(372, {"start_s": 3725.4, "text": " Olá ", "speakers": ["Ana", "Rui"]},
+                          {"Ana": "S0", "Rui": "S1"})
+
+    assert line == "[372] S0,S1: Olá"
+
+
+def test_render_transcript_tags_speakers():
+    """Test that speakers are tagged in order of appearance and listed once."""
+    segs = [
+        {"start_s": 0.0, "end_s": 5.0, "text": "Bom dia", "speakers": ["Ana"]},
+        {"start_s": 5.0, "end_s": 9.0, "text": "Olá", "speakers": ["Rui"]},
+        {"start_s": 9.0, "end_s": 12.0, "text": "Música", "speakers": []},
+    ]
+
+    transcript = render_transcript(segs)
+
+    assert transcript.legend == "Speakers: S0=Ana, S1=Rui"
+    assert transcript.lines == ["[0] S0: Bom dia", "[1] S1: Olá", "[2] Música"]
+
+
+def test_windows_fit_budget_and_overlap():
+    """Test windows respect the budget, cover everything, and overlap."""
+    segs = segments(200)
+    windows = build_windows(segs, max_tokens=1000, overlap_tokens=150)
+
+    assert len(windows) > 1
+    assert windows[0].start_s == 0.0
+    assert windows[-1].end_s == segs[-1]["end_s"]
+    for window in windows:
+        assert estimate_tokens(window.text) <= 1000
+    for previous, current in zip(windows, windows[1:]):
+        assert previous.start_s < current.start_s < previous.end_s
+        assert previous.first_segment < current.first_segment <= previous.last_segment
+    for window in windows:
+        assert window.text.startswith("Speakers: S0=SPEAKER_00\n")
+
+
+def test_single_window_when_it_fits():
+    """Test that a short transcript is sent whole."""
+    windows = build_windows(segments(5), max_tokens=10000, overlap_tokens=500)
+
+    assert len(windows) == 1
+    assert len(windows[0].lines) == 5
+
+
+def test_oversized_segment_gets_own_window():
+    """Test that a segment over the budget still makes progress."""
+    segs = segments(3, words=10) + segments(1, words=2000) + segments(3, words=10)
+    for i, segment in enumerate(segs):
+        segment["start_s"], segment["end_s"] = i * 10.0, i * 10.0 + 10.0
+
+    windows = build_windows(segs, max_tokens=200, overlap_tokens=50)
+
+    assert any(len(w.lines) == 1 and w.start_s == 30.0 for w in windows)
+    assert windows[-1].end_s == 70.0
+
+
+def test_merge_highlights_dedupes_overlaps():
+    """Test that the same moment from two windows is kept once, the longer one."""
+    highlights = [
+        {"start_s": 100.0, "end_s": 160.0, "description": "a"},
+        {"start_s": 105.0, "end_s": 170.0, "description": "a again"},
+        {"start_s": 300.0, "end_s": 330.0, "description": "b"},
+        {"start_s": 10.0, "end_s": 10.0, "description": "empty"},
+    ]
+
+    merged = merge_highlights(highlights, iou_threshold=0.5)
+
+    assert [h["description"] for h in merged] == ["a again", "b"]
+
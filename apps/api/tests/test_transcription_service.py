@@ -0,0 +1,25 @@
+"""Tests for transcription."""
+from unittest.mock import Mock, patch
+
+from app.services.transcription_service import TranscriptionService
+
+
+def test_align_model_follows_the_detected_language():
+    """Test that each language is aligned with its own model, loaded once."""
+    service = TranscriptionService()
+    service.model = Mock()
+    service.model.transcribe.side_effect = [
+        {"language": "pt", "segments": []},
+        {"language": "en", "segments": []},
+        {"language": "pt", "segments": []},
+    ]
+
+    with patch("app.services.transcription_service.whisperx", create=True) as whisperx:
+        whisperx.load_align_model.side_effect = lambda language_code, device: (f"model-{language_code}", {})
+        whisperx.align.return_value = {"segments": []}
+        languages = [service._transcribe_audio(None)["language"] for _ in range(3)]
+        models = [c.args[1] for c in whisperx.align.call_args_list]
+
+    assert languages == ["pt", "en", "pt"]
+    assert models == ["model-pt", "model-en", "model-pt"]
+    assert whisperx.load_align_model.call_count == 2
@@ -0,0 +1,155 @@
+"""Tests for streamed and resumable uploads."""
+import asyncio
+import fcntl
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.services.upload_service import UploadService
+
+BOUNDARY = "testboundary"
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    """Upload service storing files in a temporary directory."""
+    with patch("app.services.upload_service.settings") as mock_settings:
+        mock_settings.UPLOAD_DIR = str(tmp_path / "uploads")
+        mock_settings.UPLOAD_MAX_GB = 1.0
+        mock_settings.UPLOAD_SESSION_TTL_HOURS = 24.0
+        mock_settings.LOCAL_INGEST_ROOTS = [str(tmp_path / "share")]
+        yield UploadService()
+
+
+async def stream(data, size=7):
+    """Yield ``data`` in small network-sized chunks."""
+    for i in range(0, len(data), size):
+        await asyncio.sleep(0)
+        yield data[i:i + size]
+
+
+def multipart_body(fields, filename, content):
+    """Encode form fields and one file as multipart/form-data."""
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields
+    ]
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: audio/wav\r\n\r\n".encode() + content + b"\r\n"
+    )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.mark.asyncio
+async def test_receive_multipart_streams_file_to_disk(uploads):
+    """Test that the file part lands on disk by content hash, with the form fields."""
+    content = os.urandom(5000)
+    body = multipart_body([("title", "Episode 1"), ("prompt_ids", "a,b")], "../studio.WAV", content)
+
+    fields, stored = await uploads.receive_multipart(
+        f"multipart/form-data; boundary={BOUNDARY}", stream(body)
+    )
+
+    assert fields == {"title": ["Episode 1"], "prompt_ids": ["a,b"]}
+    assert stored["filename"] == "studio.WAV"
+    assert Path(stored["path"]).read_bytes() == content
+    assert Path(stored["path"]).name == f"{stored['key']}.wav"
+    assert list((uploads.root / "sessions").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_receive_multipart_without_file_fails(uploads):
+    """Test that a form without a file part is rejected and leaves nothing behind."""
+    body = multipart_body([("title", "x")], "a.wav", b"")
+
+    with pytest.raises(ValueError):
+        await uploads.receive_multipart(f"multipart/form-data; boundary={BOUNDARY}", stream(body))
+    assert list((uploads.root / "sessions").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload(uploads):
+    """Test chunked upload, a rejected out-of-order chunk, and completion."""
+    content = os.urandom(1000)
+    session = uploads.create_session("show.mp3", len(content))
+    upload_id = session["upload_id"]
+
+    await uploads.append_chunk(upload_id, 0, stream(content[:400]))
+    with pytest.raises(ValueError, match="Offset mismatch"):
+        await uploads.append_chunk(upload_id, 0, stream(content[400:]))
+    with pytest.raises(ValueError, match="incomplete"):
+        uploads.complete_session(upload_id)
+
+    assert uploads.get_session(upload_id)["offset"] == 400
+    await uploads.append_chunk(upload_id, 400, stream(content[400:]))
+    stored = uploads.complete_session(upload_id)
+
+    assert Path(stored["path"]).read_bytes() == content
+    with pytest.raises(LookupError):
+        uploads.get_session(upload_id)
+
+
+@pytest.mark.asyncio
+async def test_chunk_past_declared_size_is_dropped(uploads):
+    """Test that an oversized chunk is rejected without moving the offset."""
+    session = uploads.create_session("show.mp3", 10)
+
+    with pytest.raises(ValueError, match="declared upload size"):
+        await uploads.append_chunk(session["upload_id"], 0, stream(b"x" * 20))
+    assert uploads.get_session(session["upload_id"])["offset"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_chunk_is_rejected(uploads):
+    """Test that a chunk arriving while another is being appended is rejected."""
+    session = uploads.create_session("show.mp3", 10)
+    part_path = uploads.root / "sessions" / f"{session['upload_id']}.part"
+
+    with open(part_path, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        with pytest.raises(ValueError, match="being received"):
+            await uploads.append_chunk(session["upload_id"], 0, stream(b"x" * 10))
+    assert uploads.get_session(session["upload_id"])["offset"] == 0
+
+
+def test_sweep_removes_abandoned_sessions(uploads):
+    """Test that sessions and partial multipart files idle past the TTL are deleted."""
+    stale = uploads.create_session("old.mp3", 10)["upload_id"]
+    fresh = uploads.create_session("new.mp3", 10)["upload_id"]
+    sessions = uploads.root / "sessions"
+    (sessions / "multipart.part").write_bytes(b"x")
+    two_days_ago = time.time() - 48 * 3600
+    for path in [*sessions.glob(f"{stale}.*"), sessions / "multipart.part"]:
+        os.utime(path, (two_days_ago, two_days_ago))
+
+    assert uploads.sweep_sessions() == 2
+    assert sorted(p.name for p in sessions.iterdir()) == [f"{fresh}.json", f"{fresh}.part"]
+    with pytest.raises(LookupError):
+        uploads.get_session(stale)
+
+
+def test_unknown_upload_id_is_not_a_path(uploads):
+    """Test that upload IDs cannot reach outside the sessions directory."""
+    with pytest.raises(LookupError):
+        uploads.get_session("../../etc/passwd")
+
+
+def test_resolve_local_path_stays_under_roots(uploads, tmp_path):
+    """Test that only files under LOCAL_INGEST_ROOTS are accepted."""
+    share = tmp_path / "share"
+    share.mkdir()
+    (share / "ep.wav").write_bytes(b"x")
+    (tmp_path / "secret.wav").write_bytes(b"x")
+    (share / "link.wav").symlink_to(tmp_path / "secret.wav")
+
+    assert uploads.resolve_local_path(str(share / "ep.wav")) == os.path.realpath(share / "ep.wav")
+    with pytest.raises(PermissionError):
+        uploads.resolve_local_path(str(share / ".." / "secret.wav"))
+    with pytest.raises(PermissionError):
+        uploads.resolve_local_path(str(share / "link.wav"))
+    with pytest.raises(FileNotFoundError):
+        uploads.resolve_local_path(str(share / "missing.wav"))
@@ -0,0 +1,70 @@
+"""Tests for word timing storage."""
+import pytest
+
+from app.services.word_timing_service import WordTimings
+
+
+@pytest.fixture
+def aligned_segments():
+    """Aligned WhisperX segments with one unaligned numeral."""
+    return [
+        {
+            'start': 0.0,
+            'end': 2.0,
+            'words': [
+                {'word': 'Olá', 'start': 0.0, 'end': 0.5, 'score': 0.9},
+                {'word': 'pessoal', 'start': 0.6, 'end': 1.2, 'score': 0.8},
+            ],
+        },
+        {
+            'start': 2.0,
+            'end': 4.0,
+            'words': [
+                {'word': 'episódio', 'start': 2.0, 'end': 2.8, 'score': 0.95},
+                {'word': '42'},
+                {'word': 'hoje', 'start': 3.0, 'end': 3.4, 'score': 0.7},
+            ],
+        },
+    ]
+
+
+def test_round_trip(aligned_segments):
+    """Test that packing and unpacking preserves every word."""
+    timings = WordTimings.from_segments(aligned_segments)
+
+    restored = WordTimings.from_bytes(timings.to_bytes())
+
+    assert len(restored) == 5
+    words = restored.words_between(0.0, 10.0)
+    assert [w['word'] for w in words] == ['Olá', 'pessoal', 'episódio', '42', 'hoje']
+    assert words[1]['start_s'] == pytest.approx(0.6)
+    assert words[3]['start_s'] == pytest.approx(2.8)  # inherits previous end
+
+
+def test_words_between(aligned_segments):
+    """Test range lookups only return overlapping words."""
+    timings = WordTimings.from_segments(aligned_segments)
+
+    words = timings.words_between(0.55, 2.1)
+
+    assert [w['word'] for w in words] == ['pessoal', 'episódio']
+
+
+def test_words_between_with_overlapping_alignments():
+    """Test that a word ending after its successors is still found, also after loading."""
+    segments = [{'words': [
+        {'word': 'longa', 'start': 0.0, 'end': 3.0},
+        {'word': 'curta', 'start': 1.0, 'end': 1.5},
+        {'word': 'fim', 'start': 3.5, 'end': 4.0},
+    ]}]
+    timings = WordTimings.from_segments(segments)
+
+    for loaded in (timings, WordTimings.from_bytes(timings.to_bytes())):
+        assert list(loaded.max_ends) == [3.0, 3.0, 4.0]
+        assert loaded.words_between(2.0, 3.2)[0]['word'] == 'longa'
+
+
+def test_rejects_foreign_blob():
+    """Test that unknown blobs are rejected."""
+    with pytest.raises(ValueError):
+        WordTimings.from_bytes(b"JUNK" + bytes(8))
@@ -0,0 +1,51 @@
+"""Tests for YouTube service."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.media_store import MediaStore
+from app.services.youtube_service import YouTubeService, extract_video_id
+
+
+@pytest.mark.parametrize('url', [
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=10s',
+    'https://m.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://youtu.be/dQw4w9WgXcQ?si=abc',
+    'https://www.youtube.com/shorts/dQw4w9WgXcQ',
+    'https://www.youtube.com/embed/dQw4w9WgXcQ',
+    'https://www.youtube.com/live/dQw4w9WgXcQ?feature=shared',
+    'www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'dQw4w9WgXcQ',
+])
+def test_extract_video_id(url):
+    """Test that every common URL form normalizes to the same video ID."""
+    assert extract_video_id(url) == 'dQw4w9WgXcQ'
+
+
+@pytest.mark.parametrize('url', [
+    'https://vimeo.com/123456789',
+    'https://www.youtube.com/playlist?list=PL1234567890',
+    'https://www.youtube.com/@somechannel',
+    'https://notyoutube.com/watch?v=dQw4w9WgXcQ',
+])
+def test_extract_video_id_rejects_non_videos(url):
+    """Test that non-video URLs have no video ID."""
+    assert extract_video_id(url) is None
+
+
+def test_stream_audio_stops_both_processes_on_error(tmp_path):
+    """Test that a failure while streaming kills yt-dlp and ffmpeg and removes partial files."""
+    downloader, decoder = MagicMock(), MagicMock()
+    downloader.stdout.read.side_effect = [b"audio", OSError("No space left on device")]
+    service = YouTubeService(MediaStore(str(tmp_path / "media")))
+
+    with patch("app.services.youtube_service.subprocess.Popen", side_effect=[downloader, decoder]):
+        with pytest.raises(OSError, match="No space left"):
+            service.stream_audio("https://youtu.be/dQw4w9WgXcQ", "ep1")
+
+    for process in (downloader, decoder):
+        process.kill.assert_called_once()
+        process.wait.assert_called_once()
+    decoder.stdin.close.assert_called_once()
+    assert not list((tmp_path / "media").rglob("*.part*"))
@@ -0,0 +1,178 @@
+"""
+Worker pool entry point.
+
+Runs queued episode processing jobs outside the API process:
+    python worker.py
+
+One process is started per concurrency slot: WORKER_CPU_CONCURRENCY for
+CPU-bound jobs (transcription, diarization) and WORKER_IO_CONCURRENCY for
+I/O-bound jobs (downloads, LLM calls). Each slot claims one job at a time.
+Clip rendering runs in a CPU slot and fans out to CLIP_RENDER_WORKERS
+ffmpeg processes of its own.
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import traceback
+from typing import Any, Awaitable, Callable
+
+from app.core.config import settings
+from app.services.episode_service import EpisodeService
+from app.services.job_queue import LeaseLostError, get_job_queue
+
+Handler = Callable[[EpisodeService, Any, dict[str, Any]], Awaitable[None]]
+
+
+async def handle_download_audio(service: EpisodeService, queue: Any, job: dict[str, Any]) -> None:
+    """Run the pipeline's download stage, then queue the rest of processing."""
+    await service.process_episode(job["episode_id"], until="download")
+    queue.enqueue("process_episode", job["episode_id"], job["payload"])
+
+
+async def handle_process_episode(service: EpisodeService, queue: Any, job: dict[str, Any]) -> None:
+    """Run (or resume) the pipeline through persist, then queue highlight detection."""
+    await service.process_episode(job["episode_id"], until="persist")
+    payload = job["payload"]
+    if payload.get("auto_detect_highlights") and payload.get("prompt_ids"):
+        queue.enqueue("detect_highlights", job["episode_id"], {"prompt_ids": payload["prompt_ids"]})
+
+
+async def handle_detect_highlights(service: EpisodeService, queue: Any, job: dict[str, Any]) -> None:
+    """Run highlight detection prompts."""
+    await service.detect_highlights(job["episode_id"], job["payload"]["prompt_ids"])
+
+
+async def handle_render_clips(service: EpisodeService, queue: Any, job: dict[str, Any]) -> None:
+    """Render highlight clips from the episode video."""
+    await service.clip_service.render_episode_clips(
+        job["episode_id"], job["payload"].get("highlight_ids")
+    )
+
+
+async def handle_submit_highlight_batch(
+    service: EpisodeService, queue: Any, job: dict[str, Any]
+) -> None:
+    """Submit highlight detection for many episodes as provider batches, then poll them."""
+    payload = job["payload"]
+    # Keyed by the job, so a retry skips the batches already submitted
+    batches = await service.submit_highlight_batch(
+        payload["episode_ids"], payload["prompt_ids"], payload.get("provider"), payload.get("model"),
+        submission_key=job["id"],
+    )
+    for batch in batches:
+        queue.enqueue(
+            "poll_highlight_batch", None, {"batch_id": batch["id"]},
+            delay_seconds=settings.LLM_BATCH_POLL_SECONDS,
+        )
+
+
+async def handle_poll_highlight_batch(
+    service: EpisodeService, queue: Any, job: dict[str, Any]
+) -> None:
+    """Ingest a finished highlight batch, or check it again later."""
+    if not await service.poll_highlight_batch(job["payload"]["batch_id"]):
+        queue.enqueue(
+            "poll_highlight_batch", None, job["payload"],
+            delay_seconds=settings.LLM_BATCH_POLL_SECONDS,
+        )
+
+
+# Jobs that run the processing pipeline, whose failures show on the episode
+PIPELINE_KINDS = {"download_audio", "process_episode"}
+
+HANDLERS: dict[str, Handler] = {
+    "download_audio": handle_download_audio,
+    "process_episode": handle_process_episode,
+    "detect_highlights": handle_detect_highlights,
+    "render_clips": handle_render_clips,
+    "submit_highlight_batch": handle_submit_highlight_batch,
+    "poll_highlight_batch": handle_poll_highlight_batch,
+}
+
+
+async def _heartbeat(queue: Any, job_id: str, worker_id: str) -> None:
+    """Keep a long-running job's lease alive."""
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+        await asyncio.to_thread(queue.heartbeat, job_id, worker_id)
+
+
+async def run_slot(resource: str, worker_id: str) -> None:
+    """Claim and run jobs for one resource class, one at a time."""
+    queue = get_job_queue()
+    service = EpisodeService()
+    print(f"👷 Worker {worker_id} serving '{resource}' jobs")
+
+    while True:
+        job = await asyncio.to_thread(queue.claim, resource, worker_id)
+        if job is None:
+            await asyncio.sleep(settings.WORKER_POLL_INTERVAL_SECONDS)
+            continue
+
+        print(f"▶️ {worker_id}: {job['kind']} for episode {job['episode_id']} "
+              f"(attempt {job['attempts']}/{job['max_attempts']})")
+        heartbeat = asyncio.create_task(_heartbeat(queue, job["id"], worker_id))
+        try:
+            await HANDLERS[job["kind"]](service, queue, job)
+            await asyncio.to_thread(queue.complete, job)
+            print(f"✅ {worker_id}: {job['kind']} done")
+        except LeaseLostError:
+            print(f"⚠️ {worker_id}: lease on {job['kind']} {job['id']} expired, result ignored")
+        except Exception as e:
+            traceback.print_exc()
+            try:
+                retry = await asyncio.to_thread(queue.fail, job, f"{type(e).__name__}: {e}")
+            except LeaseLostError:
+                print(f"⚠️ {worker_id}: lease on {job['kind']} {job['id']} expired, failure ignored")
+                continue
+            print(f"❌ {worker_id}: {job['kind']} failed ({'will retry' if retry else 'giving up'})")
+            if job["kind"] in PIPELINE_KINDS:
+                await service.record_processing_failure(job["episode_id"], retrying=retry)
+        finally:
+            heartbeat.cancel()
+
+
+def _slot_main(resource: str, slot: int) -> None:
+    worker_id = f"{socket.gethostname()}-{resource}-{slot}-{os.getpid()}"
+    asyncio.run(run_slot(resource, worker_id))
+
+
+def main() -> None:
+    """Start and supervise one process per concurrency slot."""
+    ctx = multiprocessing.get_context("spawn")
+    slots = [("cpu", i) for i in range(settings.WORKER_CPU_CONCURRENCY)]
+    slots += [("io", i) for i in range(settings.WORKER_IO_CONCURRENCY)]
+    # Not daemonic: slots start process pools of their own (diarization, clips)
+    processes = {slot: ctx.Process(target=_slot_main, args=slot, daemon=False) for slot in slots}
+    for process in processes.values():
+        process.start()
+
+    stopping = False
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Restart slots that crash; their jobs are reclaimed once the lease expires
+    while not stopping:
+        for slot, process in processes.items():
+            if not process.is_alive():
+                print(f"⚠️ Worker slot {slot} exited ({process.exitcode}), restarting")
+                processes[slot] = ctx.Process(target=_slot_main, args=slot, daemon=False)
+                processes[slot].start()
+        time.sleep(1)
+
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
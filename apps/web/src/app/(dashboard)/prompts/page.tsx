@@ -116,8 +116,7 @@ export default function PromptsPage() {
             <ul className="list-disc list-inside text-sm text-muted-foreground space-y-1">
               <li>Be specific about what kind of moments you want to find</li>
               <li>Provide examples of good highlights</li>
-              <li>Request timestamps in your prompt</li>
-              <li>Ask for JSON format for structured output</li>
+              <li>Segment ranges and the JSON output format are requested automatically</li>
             </ul>
           </div>
         </CardContent>
@@ -0,0 +1,28 @@
+-- Migration 008: Cross-episode speaker identity index
+-- This migration:
+-- 1. Creates known_speakers, one voice embedding per recurring person
+-- 2. Stores each episode speaker's diarization embedding
+-- 3. Links confirmed episode speakers to the person they were mapped to
+
+CREATE TABLE IF NOT EXISTS known_speakers (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    name TEXT UNIQUE NOT NULL,
+    embedding REAL[] NOT NULL,
+    sample_count INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+DROP TRIGGER IF EXISTS update_known_speakers_updated_at ON known_speakers;
+CREATE TRIGGER update_known_speakers_updated_at BEFORE UPDATE ON known_speakers
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+ALTER TABLE speakers ADD COLUMN IF NOT EXISTS embedding REAL[];
+ALTER TABLE speakers ADD COLUMN IF NOT EXISTS known_speaker_id UUID
+    REFERENCES known_speakers(id) ON DELETE SET NULL;
+
+COMMENT ON TABLE known_speakers IS 'Mean voice embedding of each recurring person, used to pre-fill speaker names';
+COMMENT ON COLUMN known_speakers.embedding IS 'Running mean of confirmed speaker embeddings';
+COMMENT ON COLUMN known_speakers.sample_count IS 'Number of confirmed speakers averaged into the embedding';
+COMMENT ON COLUMN speakers.embedding IS 'Centroid voice embedding from diarization';
+COMMENT ON COLUMN speakers.known_speaker_id IS 'Known person this speaker was confirmed as';
@@ -0,0 +1,14 @@
+-- Migration 009: Word-level timings
+-- Stores WhisperX word alignments per episode as one packed binary blob
+-- (word text offsets plus float arrays of starts, ends and scores) instead
+-- of one JSON object or row per word.
+
+CREATE TABLE IF NOT EXISTS word_timings (
+    episode_id UUID PRIMARY KEY REFERENCES episodes(id) ON DELETE CASCADE,
+    word_count INTEGER NOT NULL DEFAULT 0,
+    data BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+COMMENT ON TABLE word_timings IS 'Packed word-level alignment per episode';
+COMMENT ON COLUMN word_timings.data IS 'Columnar blob: header, offsets, starts, ends, scores, UTF-8 words';
@@ -0,0 +1,13 @@
+-- Migration 010: Processing progress
+-- Lets the pipeline report which stage an episode is in and how far along
+-- it is, so segments can be reviewed while transcription is still running.
+
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS processing_stage TEXT;
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS progress_percent SMALLINT NOT NULL DEFAULT 0
+    CHECK (progress_percent BETWEEN 0 AND 100);
+
+COMMENT ON COLUMN episodes.processing_stage IS 'Current pipeline stage while status is processing';
+COMMENT ON COLUMN episodes.progress_percent IS 'Overall processing progress, 0-100';
+
+-- Segments are read back ordered by time while new batches are appended
+CREATE INDEX IF NOT EXISTS idx_segments_episode_start ON segments(episode_id, start_s);
@@ -0,0 +1,71 @@
+-- Migration 011: Durable job queue
+-- Episode processing runs in a separate worker pool instead of inside the
+-- API process. Workers claim jobs per resource class (cpu, io) with
+-- SELECT ... FOR UPDATE SKIP LOCKED, so many workers can poll safely, and a
+-- lease lets another worker pick up jobs whose worker died.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'job_status') THEN
+        CREATE TYPE job_status AS ENUM ('queued', 'running', 'succeeded', 'failed');
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    kind TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    episode_id UUID REFERENCES episodes(id) ON DELETE CASCADE,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status job_status NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_by TEXT,
+    locked_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(resource, run_after)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_jobs_episode_id ON jobs(episode_id);
+
+DROP TRIGGER IF EXISTS update_jobs_updated_at ON jobs;
+CREATE TRIGGER update_jobs_updated_at BEFORE UPDATE ON jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Atomically claim the next runnable job for a resource class.
+-- A running job whose lease expired (no heartbeat) is claimable again.
+CREATE OR REPLACE FUNCTION claim_job(p_resource TEXT, p_worker TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF jobs AS $$
+    UPDATE jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_by = p_worker,
+        locked_at = NOW()
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE resource = p_resource
+          AND (
+            (status = 'queued' AND run_after <= NOW())
+            OR (status = 'running' AND locked_at < NOW() - make_interval(secs => p_lease_seconds))
+          )
+        ORDER BY run_after
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$ LANGUAGE sql;
+
+-- Queue depth per resource and status, for monitoring
+CREATE OR REPLACE VIEW job_queue_depth AS
+SELECT resource, kind, status, COUNT(*) AS count
+FROM jobs
+WHERE status IN ('queued', 'running')
+GROUP BY resource, kind, status;
+
+COMMENT ON TABLE jobs IS 'Durable queue of episode processing jobs served by the worker pool';
+COMMENT ON COLUMN jobs.resource IS 'Resource class the job competes for (cpu, io)';
+COMMENT ON COLUMN jobs.locked_at IS 'Last claim or heartbeat time; stale leases are reclaimed';
@@ -0,0 +1,8 @@
+-- Migration 012: Pipeline stage checkpoints
+-- Records which processing stages have finished for an episode. Together
+-- with the checkpoint files the worker writes, this lets processing resume
+-- from the last completed stage after a crash or redeploy.
+
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS completed_stages TEXT[] NOT NULL DEFAULT '{}';
+
+COMMENT ON COLUMN episodes.completed_stages IS 'Processing pipeline stages with a saved checkpoint';
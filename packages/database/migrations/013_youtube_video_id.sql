@@ -0,0 +1,45 @@
+-- Migration 013: Deduplicate episodes by YouTube video ID
+-- The same video can be linked in many URL forms (watch?v=, youtu.be/,
+-- shorts/, extra query parameters). Episodes are now matched on the
+-- normalized 11-character video ID instead of the raw URL string.
+
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS youtube_video_id TEXT;
+
+-- Backfill from existing URLs
+UPDATE episodes
+SET youtube_video_id = substring(
+    youtube_url FROM '(?:v=|youtu\.be/|shorts/|embed/|live/)([A-Za-z0-9_-]{11})'
+)
+WHERE youtube_video_id IS NULL;
+
+-- Episodes used to be matched on the raw URL, so a video may already have
+-- several. The oldest keeps the video ID; the others lose it (and so stay
+-- out of the unique index) and are reported, to be merged or deleted by hand.
+DO $$
+DECLARE
+    duplicate RECORD;
+BEGIN
+    FOR duplicate IN
+        SELECT id, youtube_video_id, kept_id
+        FROM (
+            SELECT id, youtube_video_id,
+                   first_value(id) OVER same_video AS kept_id,
+                   row_number() OVER same_video AS position
+            FROM episodes
+            WHERE youtube_video_id IS NOT NULL
+            WINDOW same_video AS (PARTITION BY youtube_video_id ORDER BY created_at, id)
+        ) ranked
+        WHERE position > 1
+    LOOP
+        UPDATE episodes SET youtube_video_id = NULL WHERE id = duplicate.id;
+        RAISE NOTICE 'Episode % duplicates episode % (video %); its video ID was cleared',
+            duplicate.id, duplicate.kept_id, duplicate.youtube_video_id;
+    END LOOP;
+END $$;
+
+-- Partial so episodes whose URL is not a recognizable video keep working
+CREATE UNIQUE INDEX IF NOT EXISTS idx_episodes_youtube_video_id
+    ON episodes(youtube_video_id)
+    WHERE youtube_video_id IS NOT NULL;
+
+COMMENT ON COLUMN episodes.youtube_video_id IS 'Normalized YouTube video ID used to deduplicate ingests';
@@ -0,0 +1,94 @@
+-- Migration 014: Episode progress events
+-- An append-only log of processing events per episode, written by
+-- triggers so every writer (API, workers, SQL) publishes them. The API
+-- tails it once per watched episode and pushes events to dashboards over
+-- Server-Sent Events, instead of every dashboard polling the episode.
+
+CREATE TABLE IF NOT EXISTS episode_events (
+    id BIGSERIAL PRIMARY KEY,
+    episode_id UUID NOT NULL REFERENCES episodes(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    data JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_episode_events_episode_id ON episode_events(episode_id, id);
+CREATE INDEX IF NOT EXISTS idx_episode_events_created_at ON episode_events(created_at);
+
+-- Stage, percent and status changes
+CREATE OR REPLACE FUNCTION publish_episode_progress()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO episode_events (episode_id, type, data)
+    VALUES (NEW.id, 'progress', jsonb_build_object(
+        'status', NEW.status,
+        'stage', NEW.processing_stage,
+        'percent', NEW.progress_percent,
+        'completed_stages', NEW.completed_stages
+    ));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS episodes_publish_progress ON episodes;
+CREATE TRIGGER episodes_publish_progress AFTER UPDATE ON episodes
+    FOR EACH ROW
+    WHEN (
+        OLD.status IS DISTINCT FROM NEW.status
+        OR OLD.processing_stage IS DISTINCT FROM NEW.processing_stage
+        OR OLD.progress_percent IS DISTINCT FROM NEW.progress_percent
+        OR OLD.completed_stages IS DISTINCT FROM NEW.completed_stages
+    )
+    EXECUTE FUNCTION publish_episode_progress();
+
+-- One event per insert statement (segments are inserted in batches)
+CREATE OR REPLACE FUNCTION publish_segments_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO episode_events (episode_id, type, data)
+    SELECT episode_id, 'segments', jsonb_build_object(
+        'count', COUNT(*),
+        'end_s', MAX(end_s)
+    )
+    FROM new_rows
+    GROUP BY episode_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS segments_publish_inserted ON segments;
+CREATE TRIGGER segments_publish_inserted AFTER INSERT ON segments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION publish_segments_inserted();
+
+CREATE OR REPLACE FUNCTION publish_highlights_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO episode_events (episode_id, type, data)
+    SELECT episode_id, 'highlights', jsonb_build_object(
+        'count', COUNT(*),
+        'highlights', jsonb_agg(jsonb_build_object(
+            'id', id, 'start_s', start_s, 'end_s', end_s, 'prompt_id', prompt_id
+        ) ORDER BY start_s)
+    )
+    FROM new_rows
+    GROUP BY episode_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS highlights_publish_inserted ON highlights;
+CREATE TRIGGER highlights_publish_inserted AFTER INSERT ON highlights
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION publish_highlights_inserted();
+
+-- Events are only needed while someone may be watching
+CREATE OR REPLACE FUNCTION prune_episode_events(p_older_than INTERVAL DEFAULT '1 day')
+RETURNS VOID AS $$
+    DELETE FROM episode_events WHERE created_at < NOW() - p_older_than;
+$$ LANGUAGE sql;
+
+COMMENT ON TABLE episode_events IS 'Append-only processing events per episode, streamed to clients over SSE';
+COMMENT ON COLUMN episode_events.type IS 'Event type: progress, segments or highlights';
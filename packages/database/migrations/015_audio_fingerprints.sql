@@ -0,0 +1,30 @@
+-- Migration 015: Audio fingerprints
+-- The same recording is often uploaded again under another URL. Each
+-- episode's audio fingerprint is stored as one packed blob, and a sample of
+-- its sub-fingerprints is indexed so a new ingest can find a processed
+-- episode with the same audio and copy its results instead of re-running
+-- transcription and diarization.
+
+CREATE TABLE IF NOT EXISTS audio_fingerprints (
+    episode_id UUID PRIMARY KEY REFERENCES episodes(id) ON DELETE CASCADE,
+    frame_count INTEGER NOT NULL DEFAULT 0,
+    hop_s REAL NOT NULL,
+    data BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS fingerprint_hashes (
+    hash INTEGER NOT NULL,
+    episode_id UUID NOT NULL REFERENCES episodes(id) ON DELETE CASCADE,
+    frame INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_fingerprint_hashes_hash ON fingerprint_hashes(hash);
+CREATE INDEX IF NOT EXISTS idx_fingerprint_hashes_episode_id ON fingerprint_hashes(episode_id);
+
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS reused_from_episode_id UUID
+    REFERENCES episodes(id) ON DELETE SET NULL;
+
+COMMENT ON TABLE audio_fingerprints IS 'Packed 32-bit sub-fingerprints per episode, one per hop';
+COMMENT ON TABLE fingerprint_hashes IS 'Sampled sub-fingerprint keys used to look up matching recordings';
+COMMENT ON COLUMN episodes.reused_from_episode_id IS 'Episode with the same audio whose transcript and speakers were copied';
@@ -0,0 +1,24 @@
+-- Migration 016: Uploaded and server-local episode sources
+-- Episodes can now come from an uploaded file or a file on the server
+-- (e.g. the studio share) instead of a YouTube URL. Such episodes have no
+-- youtube_url; the pipeline reads source_path instead of downloading.
+
+ALTER TABLE episodes ALTER COLUMN youtube_url DROP NOT NULL;
+
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS source_type TEXT NOT NULL DEFAULT 'youtube'
+    CHECK (source_type IN ('youtube', 'upload', 'local'));
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS source_path TEXT;
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS source_key TEXT;
+
+-- The same uploaded content creates one episode
+CREATE UNIQUE INDEX IF NOT EXISTS idx_episodes_source_key
+    ON episodes(source_key)
+    WHERE source_key IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_episodes_source_path
+    ON episodes(source_path)
+    WHERE source_path IS NOT NULL;
+
+COMMENT ON COLUMN episodes.source_type IS 'Where the media came from: youtube, upload or local';
+COMMENT ON COLUMN episodes.source_path IS 'Server path of an uploaded or local media file';
+COMMENT ON COLUMN episodes.source_key IS 'SHA-256 of an uploaded file, used to deduplicate uploads';
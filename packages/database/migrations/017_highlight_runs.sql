@@ -0,0 +1,26 @@
+-- Migration 017: Highlight detection runs
+-- Highlight detection runs several prompts over an episode concurrently.
+-- Each prompt's run is recorded with its outcome, duration and token
+-- usage, to compare prompts by cost and latency.
+
+CREATE TABLE IF NOT EXISTS highlight_runs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    episode_id UUID NOT NULL REFERENCES episodes(id) ON DELETE CASCADE,
+    prompt_id UUID REFERENCES prompts(id) ON DELETE SET NULL,
+    status TEXT NOT NULL CHECK (status IN ('completed', 'failed')),
+    error TEXT,
+    highlights_count INTEGER NOT NULL DEFAULT 0,
+    duration_ms INTEGER NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    cached_calls INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_highlight_runs_episode_id ON highlight_runs(episode_id);
+CREATE INDEX IF NOT EXISTS idx_highlight_runs_prompt_id ON highlight_runs(prompt_id);
+
+COMMENT ON TABLE highlight_runs IS 'One row per prompt per highlight detection, with timing and token usage';
+COMMENT ON COLUMN highlight_runs.calls IS 'LLM calls made, one per transcript window';
+COMMENT ON COLUMN highlight_runs.cached_calls IS 'Calls answered from the LLM response cache';
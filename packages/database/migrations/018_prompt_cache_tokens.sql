@@ -0,0 +1,8 @@
+-- Migration 018: Provider prompt cache usage
+-- Prompts run over the same episode share the transcript as a prompt
+-- prefix that the LLM providers cache. Record how many input tokens of
+-- each run were read from that cache.
+
+ALTER TABLE highlight_runs ADD COLUMN IF NOT EXISTS cached_input_tokens INTEGER NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN highlight_runs.cached_input_tokens IS 'Input tokens read from the provider''s prompt cache (included in input_tokens)';
@@ -0,0 +1,35 @@
+-- Migration 019: LLM call log
+-- Every highlight detection call to an LLM provider is recorded with its
+-- estimated and actual token usage, latency, retries and parse failures,
+-- to size concurrency and find slow or expensive prompts.
+
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    episode_id UUID REFERENCES episodes(id) ON DELETE CASCADE,
+    prompt_id UUID REFERENCES prompts(id) ON DELETE SET NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('ok', 'error', 'cached')),
+    error TEXT,
+    estimated_input_tokens INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd DOUBLE PRECISION,
+    queue_ms INTEGER NOT NULL DEFAULT 0,
+    first_token_ms INTEGER,
+    latency_ms INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    parse_failures INTEGER NOT NULL DEFAULT 0,
+    highlights_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_calls_episode_id ON llm_calls(episode_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_prompt_id ON llm_calls(prompt_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_created_at ON llm_calls(created_at DESC);
+
+COMMENT ON TABLE llm_calls IS 'One row per LLM call, with token usage, latency and outcome';
+COMMENT ON COLUMN llm_calls.status IS 'ok, error, or cached when answered by the local response cache';
+COMMENT ON COLUMN llm_calls.cost_usd IS 'Estimated from configured prices; NULL for models without prices';
+COMMENT ON COLUMN llm_calls.queue_ms IS 'Time spent waiting for rate limits and a shared prompt prefix';
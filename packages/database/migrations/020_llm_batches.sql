@@ -0,0 +1,36 @@
+-- Migration 020: Batch highlight detection
+-- Back-catalog detection is submitted to the providers' batch APIs, which
+-- answer within hours at a lower price. Each provider batch is tracked
+-- until its results are ingested; items maps every request in it to the
+-- episode, prompt and transcript window it covers.
+
+CREATE TABLE IF NOT EXISTS llm_batches (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    provider_batch_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'in_progress'
+        CHECK (status IN ('in_progress', 'completed', 'failed')),
+    error TEXT,
+    request_count INTEGER NOT NULL,
+    failed_requests INTEGER NOT NULL DEFAULT 0,
+    highlights_count INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    items JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_batches_created_at ON llm_batches(created_at DESC);
+
+ALTER TABLE highlight_runs
+ADD COLUMN IF NOT EXISTS batch_id UUID REFERENCES llm_batches(id) ON DELETE SET NULL;
+
+ALTER TABLE llm_calls
+ADD COLUMN IF NOT EXISTS batch BOOLEAN NOT NULL DEFAULT FALSE;
+
+COMMENT ON TABLE llm_batches IS 'Highlight detection requests submitted together to a provider batch API';
+COMMENT ON COLUMN llm_batches.items IS 'custom_id -> episode_id, prompt_id and the window''s first_segment and last_segment';
+COMMENT ON COLUMN highlight_runs.batch_id IS 'Batch the run''s results came from; NULL for interactive runs';
+COMMENT ON COLUMN llm_calls.batch IS 'Answered through a provider batch API, at the batch price';
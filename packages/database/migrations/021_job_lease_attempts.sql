@@ -0,0 +1,37 @@
+-- Migration 021: Give up on jobs whose leases keep expiring
+-- claim_job() reclaimed running jobs with an expired lease whatever their
+-- attempts, so a job that kills its worker (e.g. out of memory) was retried
+-- forever. Such a job is now reclaimed only while attempts remain, and is
+-- otherwise marked failed.
+
+CREATE OR REPLACE FUNCTION claim_job(p_resource TEXT, p_worker TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF jobs AS $$
+    UPDATE jobs
+    SET status = 'failed',
+        locked_by = NULL,
+        last_error = 'Lease expired after ' || attempts || ' attempts'
+    WHERE resource = p_resource
+      AND status = 'running'
+      AND locked_at < NOW() - make_interval(secs => p_lease_seconds)
+      AND attempts >= max_attempts;
+
+    UPDATE jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_by = p_worker,
+        locked_at = NOW()
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE resource = p_resource
+          AND (
+            (status = 'queued' AND run_after <= NOW())
+            OR (status = 'running'
+                AND locked_at < NOW() - make_interval(secs => p_lease_seconds)
+                AND attempts < max_attempts)
+          )
+        ORDER BY run_after
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$ LANGUAGE sql;
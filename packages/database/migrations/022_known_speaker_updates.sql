@@ -0,0 +1,40 @@
+-- Migration 022: Atomic known speaker updates
+-- The running mean of a person's voice embedding was computed in the API
+-- and written back, so two confirmations at once could lose one. Both
+-- folding a sample in and taking it back out (when a confirmed speaker is
+-- renamed) now happen in a single statement.
+
+-- Fold a confirmed speaker's embedding into a person's running mean,
+-- adding the person if the name is new
+CREATE OR REPLACE FUNCTION confirm_known_speaker(p_name TEXT, p_embedding REAL[])
+RETURNS SETOF known_speakers AS $$
+    INSERT INTO known_speakers (name, embedding, sample_count)
+    VALUES (p_name, p_embedding, 1)
+    ON CONFLICT (name) DO UPDATE
+    SET embedding = ARRAY(
+            SELECT mean + (sample - mean) / (known_speakers.sample_count + 1)
+            FROM unnest(known_speakers.embedding, EXCLUDED.embedding)
+                WITH ORDINALITY AS t(mean, sample, position)
+            ORDER BY position
+        ),
+        sample_count = known_speakers.sample_count + 1
+    RETURNING *;
+$$ LANGUAGE sql;
+
+-- Take a sample back out of a person's running mean; the person is
+-- removed with their last sample
+CREATE OR REPLACE FUNCTION retract_known_speaker(p_id UUID, p_embedding REAL[])
+RETURNS SETOF known_speakers AS $$
+    DELETE FROM known_speakers WHERE id = p_id AND sample_count <= 1;
+
+    UPDATE known_speakers
+    SET embedding = ARRAY(
+            SELECT (mean * known_speakers.sample_count - sample) / (known_speakers.sample_count - 1)
+            FROM unnest(known_speakers.embedding, p_embedding)
+                WITH ORDINALITY AS t(mean, sample, position)
+            ORDER BY position
+        ),
+        sample_count = sample_count - 1
+    WHERE id = p_id AND sample_count > 1
+    RETURNING *;
+$$ LANGUAGE sql;
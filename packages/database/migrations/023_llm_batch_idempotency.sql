@@ -0,0 +1,22 @@
+-- Migration 023: Idempotent batch submission and ingest
+-- A batch row is now recorded before its requests are submitted, so a
+-- retried submission job skips the chunks the provider already has; rows
+-- are keyed by the job and chunk. Ingest marks the batch ingesting and
+-- records at most one run per episode and prompt, so an interrupted ingest
+-- resumes where it stopped instead of storing highlights twice.
+
+ALTER TABLE llm_batches ALTER COLUMN provider_batch_id DROP NOT NULL;
+ALTER TABLE llm_batches ADD COLUMN IF NOT EXISTS submission_key TEXT;
+
+ALTER TABLE llm_batches DROP CONSTRAINT IF EXISTS llm_batches_status_check;
+ALTER TABLE llm_batches ADD CONSTRAINT llm_batches_status_check
+    CHECK (status IN ('submitting', 'in_progress', 'ingesting', 'completed', 'failed'));
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_llm_batches_submission_key ON llm_batches(submission_key);
+
+-- Interactive runs have no batch_id, and NULLs never conflict
+CREATE UNIQUE INDEX IF NOT EXISTS idx_highlight_runs_batch
+    ON highlight_runs(batch_id, episode_id, prompt_id);
+
+COMMENT ON COLUMN llm_batches.submission_key IS 'Submitting job and chunk number; a retried job reuses the rows it recorded';
+COMMENT ON COLUMN llm_batches.provider_batch_id IS 'Provider''s batch ID; NULL until the chunk is accepted';
@@ -0,0 +1,14 @@
+-- Migration 024: Ask the seeded prompts for segment ranges
+-- Highlights are requested as the first and last segment numbers of the
+-- numbered transcript, but the prompts seeded by 002 still asked for
+-- "approximate start and end timestamps", contradicting the response
+-- format. Prompts that still have the seeded wording are reworded; edited
+-- prompts are left alone.
+
+UPDATE prompts
+SET template_text = replace(
+    template_text,
+    'provide the approximate start and end timestamps',
+    'provide the first and last segment numbers it spans'
+)
+WHERE template_text LIKE '%provide the approximate start and end timestamps%';
@@ -8,12 +8,21 @@ SET session_replication_role = 'replica';
 -- Delete all data (order matters due to foreign key constraints)
 -- Start with the most dependent tables first
 
+DELETE FROM episode_events;
+DELETE FROM jobs;
+DELETE FROM highlight_runs;
+DELETE FROM llm_calls;
+DELETE FROM llm_batches;
 DELETE FROM highlight_comments;
 DELETE FROM highlight_segments;
 DELETE FROM segment_speakers;
+DELETE FROM word_timings;
+DELETE FROM fingerprint_hashes;
+DELETE FROM audio_fingerprints;
 DELETE FROM highlights;
 DELETE FROM segments;
 DELETE FROM speakers;
+DELETE FROM known_speakers;
 DELETE FROM episode_comments;
 DELETE FROM episodes;
 DELETE FROM prompts;
@@ -29,14 +38,30 @@ VACUUM FULL;
 -- Verify all tables are empty
 SELECT 'episodes' as table_name, COUNT(*) as count FROM episodes
 UNION ALL
+SELECT 'jobs', COUNT(*) FROM jobs
+UNION ALL
+SELECT 'episode_events', COUNT(*) FROM episode_events
+UNION ALL
 SELECT 'segments', COUNT(*) FROM segments
 UNION ALL
+SELECT 'audio_fingerprints', COUNT(*) FROM audio_fingerprints
+UNION ALL
 SELECT 'speakers', COUNT(*) FROM speakers
 UNION ALL
+SELECT 'known_speakers', COUNT(*) FROM known_speakers
+UNION ALL
 SELECT 'segment_speakers', COUNT(*) FROM segment_speakers
 UNION ALL
+SELECT 'word_timings', COUNT(*) FROM word_timings
+UNION ALL
 SELECT 'highlights', COUNT(*) FROM highlights
 UNION ALL
+SELECT 'highlight_runs', COUNT(*) FROM highlight_runs
+UNION ALL
+SELECT 'llm_calls', COUNT(*) FROM llm_calls
+UNION ALL
+SELECT 'llm_batches', COUNT(*) FROM llm_batches
+UNION ALL
 SELECT 'highlight_comments', COUNT(*) FROM highlight_comments
 UNION ALL
 SELECT 'highlight_segments', COUNT(*) FROM highlight_segments